@@ -0,0 +1,57 @@
+"""
+Storage direccionado por contenido para las imágenes de productos.
+Cada archivo se guarda como <carpeta>/<sha256>.<ext>: subir dos veces la misma
+foto reutiliza el archivo existente en lugar de crear manzana_ZKRES4X.jpeg.
+Como un archivo puede quedar compartido entre varios productos, nunca se borra
+al eliminar o reemplazar una imagen: el comando limpiar_medios recorre las
+referencias y retira los archivos huérfanos.
+"""
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# Caracteres del hash en el nombre (128 bits)
+LARGO_HASH = 32
+
+
+def hash_contenido(contenido):
+    """SHA-256 de un archivo leído por bloques (no se carga entero en memoria)"""
+    sha = hashlib.sha256()
+    if hasattr(contenido, "seek"):
+        contenido.seek(0)
+    for bloque in contenido.chunks():
+        sha.update(bloque)
+    if hasattr(contenido, "seek"):
+        contenido.seek(0)
+    return sha.hexdigest()
+
+
+class AlmacenamientoContenido(FileSystemStorage):
+    """FileSystemStorage que nombra los archivos por el hash de su contenido"""
+
+    def nombre_por_contenido(self, name, contenido):
+        carpeta = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(carpeta, hash_contenido(contenido)[:LARGO_HASH] + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        nombre = self.nombre_por_contenido(name, content)
+        # Mismo contenido ya guardado: no se escribe de nuevo
+        if self.exists(nombre):
+            return nombre
+        return super().save(nombre, content, max_length=max_length)
+
+
+almacenamiento_imagenes = AlmacenamientoContenido()
+
+
+def obtener_almacenamiento_imagenes():
+    """Callable para el parámetro storage de los ImageField (no se serializa la instancia)"""
+    return almacenamiento_imagenes
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Registrar las señales de Producto
+        from . import signals  # noqa: F401
+
+        # Mediciones para Server-Timing y el log de requests lentos
+        from django.conf import settings
+        if settings.INSTRUMENTACION_ACTIVA:
+            from . import instrumentacion
+            instrumentacion.instalar()
@@ -0,0 +1,196 @@
+"""
+Búsqueda de productos para Natural Home.
+En SQLite usa una tabla virtual FTS5 (core_producto_fts) sobre título,
+descripción y categoría, con plegado de acentos y mayúsculas, búsqueda por
+prefijo y orden por relevancia (bm25). En otras bases de datos se usa un
+filtro icontains equivalente como respaldo, sin relevancia. En PostgreSQL el
+respaldo también ignora los acentos si está instalada la extensión unaccent
+(CREATE EXTENSION unaccent, ver docs/base_de_datos.md); sin ella, "jabon" no
+encuentra "jabón".
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Func, Q, TextField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.db.models.lookups import Contains
+
+TABLA_FTS = "core_producto_fts"
+
+# "remove_diacritics 2" hace que "platano" coincida con "plátano"
+SQL_CREAR_TABLA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+    "titulo, descripcion, categoria, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+# Peso de cada columna en bm25 (título > categoría > descripción)
+PESOS_BM25 = (10.0, 1.0, 4.0)
+
+MAX_TERMINOS = 8
+
+_fts_disponible = None
+_unaccent_disponible = None
+
+
+def normalizar(texto):
+    """Pasa a minúsculas y elimina acentos: 'Plátano' -> 'platano'"""
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def palabras(query):
+    """Divide la búsqueda en palabras en minúsculas, sin quitar los acentos"""
+    return re.findall(r"\w+", (query or "").lower())[:MAX_TERMINOS]
+
+
+def terminos(query):
+    """Divide la búsqueda en términos normalizados"""
+    return re.findall(r"\w+", normalizar(query))[:MAX_TERMINOS]
+
+
+def fts_disponible():
+    """True si la base es SQLite y la tabla FTS5 existe (se consulta una vez por proceso)"""
+    global _fts_disponible
+    if _fts_disponible is None:
+        if connection.vendor != "sqlite":
+            _fts_disponible = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [TABLA_FTS],
+                )
+                _fts_disponible = cursor.fetchone() is not None
+    return _fts_disponible
+
+
+def unaccent_disponible():
+    """True si la base es PostgreSQL con la extensión unaccent (se consulta una vez por proceso)"""
+    global _unaccent_disponible
+    if _unaccent_disponible is None:
+        if connection.vendor != "postgresql":
+            _unaccent_disponible = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'unaccent'")
+                _unaccent_disponible = cursor.fetchone() is not None
+    return _unaccent_disponible
+
+
+def _contiene(campo, termino):
+    """campo contiene el término (ya normalizado), sin distinguir acentos si se puede"""
+    if unaccent_disponible():
+        return Q(Contains(Func(Lower(campo), function="UNACCENT", output_field=TextField()), termino))
+    return Q(**{f"{campo}__icontains": termino})
+
+
+def _etiqueta_categoria(producto):
+    """Texto indexado para la categoría: clave y etiqueta ('frutas Frutas')"""
+    return f"{producto.categoria} {producto.get_categoria_display()}"
+
+
+def indexar_producto(producto):
+    """Inserta o reemplaza un producto en el índice FTS"""
+    if not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [producto.pk])
+        cursor.execute(
+            f"INSERT INTO {TABLA_FTS} (rowid, titulo, descripcion, categoria) VALUES (%s, %s, %s, %s)",
+            [producto.pk, producto.titulo, producto.descripcion or "", _etiqueta_categoria(producto)],
+        )
+
+
+def desindexar_producto(producto_id):
+    """Quita un producto del índice FTS"""
+    if not fts_disponible():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS} WHERE rowid = %s", [producto_id])
+
+
+def reindexar_todo():
+    """Reconstruye el índice completo. Devuelve la cantidad de productos indexados."""
+    from .models import Producto
+
+    if not fts_disponible():
+        return 0
+    total = 0
+
+    def filas():
+        # Generador: executemany consume las filas a medida que el iterador las trae
+        nonlocal total
+        for p in Producto.objects.only("id", "titulo", "descripcion", "categoria").iterator(chunk_size=2000):
+            total += 1
+            yield (p.pk, p.titulo, p.descripcion or "", _etiqueta_categoria(p))
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLA_FTS}")
+        cursor.executemany(
+            f"INSERT INTO {TABLA_FTS} (rowid, titulo, descripcion, categoria) VALUES (%s, %s, %s, %s)",
+            filas(),
+        )
+    return total
+
+
+def _expresion_match(lista_terminos):
+    """Arma la expresión MATCH: todos los términos, cada uno como prefijo"""
+    return " ".join(f'"{t}"*' for t in lista_terminos)
+
+
+def _filtro_respaldo(query):
+    """Filtro equivalente con icontains para bases sin FTS5"""
+    from .models import Producto
+
+    # Sin unaccent la base compara con acentos: se buscan las palabras tal como se escribieron
+    filtro = Q()
+    for termino in terminos(query) if unaccent_disponible() else palabras(query):
+        categorias = [
+            clave for clave, etiqueta in Producto.CATEGORIAS
+            if normalizar(termino) in normalizar(etiqueta) or normalizar(termino) in clave
+        ]
+        filtro &= (
+            _contiene("titulo", termino)
+            | _contiene("descripcion", termino)
+            | Q(categoria__in=categorias)
+        )
+    return filtro
+
+
+def filtrar(queryset, query):
+    """
+    Solo el filtro de la búsqueda, sin la columna de relevancia ni el orden
+    (para conteos y GROUP BY, ver core/facetas.py).
+    """
+    lista_terminos = terminos(query)
+    if not lista_terminos:
+        return queryset
+    if not fts_disponible():
+        return queryset.filter(_filtro_respaldo(query))
+    expresion = _expresion_match(lista_terminos)
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {TABLA_FTS} WHERE {TABLA_FTS} MATCH %s", [expresion])
+    )
+
+
+def buscar(queryset, query):
+    """
+    Filtra un queryset de Producto por la búsqueda y lo ordena por relevancia.
+    Devuelve un queryset normal, así que funciona con Paginator y más filtros.
+    """
+    lista_terminos = terminos(query)
+    if not lista_terminos or not fts_disponible():
+        return filtrar(queryset, query)
+
+    expresion = _expresion_match(lista_terminos)
+    pesos = ", ".join(str(p) for p in PESOS_BM25)
+    return filtrar(queryset, query).annotate(
+        relevancia=RawSQL(
+            f"SELECT bm25({TABLA_FTS}, {pesos}) FROM {TABLA_FTS} "
+            f"WHERE {TABLA_FTS} MATCH %s AND rowid = core_producto.id",
+            [expresion],
+        )
+    ).order_by("relevancia", "-id")
@@ -0,0 +1,128 @@
+"""
+Caché del catálogo para Natural Home.
+Las páginas del storefront se guardan bajo una clave que incluye la versión
+global del catálogo; cualquier cambio en los productos incrementa la versión,
+con lo que todas las páginas anteriores dejan de usarse al instante.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+CLAVE_VERSION = "catalogo:version"
+CLAVE_ACIERTOS = "catalogo:aciertos"
+CLAVE_FALLOS = "catalogo:fallos"
+
+
+def version_catalogo():
+    """Devuelve la versión actual del catálogo (la crea si no existe)"""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Valor basado en la hora: si la caché se vació, nunca se reutiliza una versión vieja
+        version = int(time.time() * 1000)
+        if not cache.add(CLAVE_VERSION, version, timeout=None):
+            version = cache.get(CLAVE_VERSION, version)
+    return version
+
+
+def cache_en_memoria():
+    """
+    LocMemCache no hace I/O: desde código async se llama directo, sin el salto
+    a un hilo que hacen sus métodos a* (aget, aset...).
+    """
+    return isinstance(caches["default"], LocMemCache)
+
+
+async def aversion_catalogo():
+    """Versión async de version_catalogo"""
+    if cache_en_memoria():
+        return version_catalogo()
+    version = await cache.aget(CLAVE_VERSION)
+    if version is None:
+        version = int(time.time() * 1000)
+        if not await cache.aadd(CLAVE_VERSION, version, timeout=None):
+            version = await cache.aget(CLAVE_VERSION, version)
+    return version
+
+
+def invalidar_catalogo():
+    """Incrementa la versión del catálogo; las páginas cacheadas quedan obsoletas"""
+    try:
+        return cache.incr(CLAVE_VERSION)
+    except ValueError:
+        version = int(time.time() * 1000)
+        cache.set(CLAVE_VERSION, version, timeout=None)
+        return version
+
+
+def _clave(nombre, version, partes):
+    parametros = "\x1f".join(str(p) for p in partes)
+    digest = hashlib.md5(parametros.encode("utf-8")).hexdigest()
+    return f"pagina:{nombre}:{version}:{digest}"
+
+
+def clave_pagina(nombre, *partes):
+    """Clave de caché para una página: nombre + versión + hash de los parámetros"""
+    return _clave(nombre, version_catalogo(), partes)
+
+
+async def aclave_pagina(nombre, *partes):
+    if cache_en_memoria():
+        return clave_pagina(nombre, *partes)
+    return _clave(nombre, await aversion_catalogo(), partes)
+
+
+def obtener_pagina(clave):
+    """Devuelve el HTML cacheado (bytes) o None, y actualiza los contadores"""
+    contenido = cache.get(clave)
+    _contar(CLAVE_ACIERTOS if contenido is not None else CLAVE_FALLOS)
+    return contenido
+
+
+async def aobtener_pagina(clave):
+    if cache_en_memoria():
+        return obtener_pagina(clave)
+    contenido = await cache.aget(clave)
+    await _acontar(CLAVE_ACIERTOS if contenido is not None else CLAVE_FALLOS)
+    return contenido
+
+
+def guardar_pagina(clave, contenido):
+    cache.set(clave, contenido, timeout=settings.CACHE_HOME_SEGUNDOS)
+
+
+async def aguardar_pagina(clave, contenido):
+    if cache_en_memoria():
+        return guardar_pagina(clave, contenido)
+    await cache.aset(clave, contenido, timeout=settings.CACHE_HOME_SEGUNDOS)
+
+
+def _contar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, 0, timeout=None)
+        cache.incr(clave)
+
+
+async def _acontar(clave):
+    try:
+        await cache.aincr(clave)
+    except ValueError:
+        await cache.aadd(clave, 0, timeout=None)
+        await cache.aincr(clave)
+
+
+def estadisticas():
+    """Contadores de aciertos/fallos de la caché de páginas"""
+    aciertos = cache.get(CLAVE_ACIERTOS, 0)
+    fallos = cache.get(CLAVE_FALLOS, 0)
+    total = aciertos + fallos
+    return {
+        "version": version_catalogo(),
+        "aciertos": aciertos,
+        "fallos": fallos,
+        "tasa_aciertos": round(aciertos / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,139 @@
+"""
+Snapshot del catálogo y sincronización incremental para Natural Home.
+El snapshot es un JSON compacto con todos los productos, nombrado por el hash
+de su contenido (catalogo/catalog.<hash>.json), así que puede servirse como
+archivo inmutable. Los clientes que ya lo tienen piden solo los cambios con
+/api/productos/cambios/?desde=<version>.
+
+La versión es la fecha de la última modificación expresada en microsegundos
+desde epoch (Producto.fecha_actualizacion o ProductoEliminado.fecha_eliminacion).
+"""
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Max
+
+from .models import Producto, ProductoEliminado
+from .serializacion import datos_producto
+
+CARPETA_SNAPSHOT = "catalogo/"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def fecha_a_version(fecha):
+    """datetime -> entero en microsegundos (0 si no hay fecha)"""
+    if fecha is None:
+        return 0
+    delta = fecha - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def version_a_fecha(version):
+    """Entero en microsegundos -> datetime UTC"""
+    return EPOCH + timedelta(microseconds=version)
+
+
+def version_actual():
+    """Versión más reciente del catálogo (última modificación o eliminación)"""
+    ultima_modificacion = Producto.objects.aggregate(m=Max("fecha_actualizacion"))["m"]
+    ultima_eliminacion = ProductoEliminado.objects.aggregate(m=Max("fecha_eliminacion"))["m"]
+    return max(fecha_a_version(ultima_modificacion), fecha_a_version(ultima_eliminacion))
+
+
+def registrar_eliminacion(producto_id):
+    """Guarda la marca de eliminación de un producto"""
+    ProductoEliminado.objects.get_or_create(producto_id=producto_id)
+
+
+def regenerar_snapshot():
+    """Regenera el snapshot sin interrumpir el request si algo falla"""
+    try:
+        generar_snapshot()
+    except Exception as e:
+        print(f"Error generando snapshot del catálogo: {e}")
+
+
+def generar_snapshot():
+    """
+    Escribe el snapshot del catálogo si su contenido cambió.
+    Devuelve (ruta en el storage, versión).
+    """
+    version = version_actual()
+    productos = [
+        datos_producto(p)
+        for p in Producto.objects.con_galeria().order_by("id").iterator(chunk_size=500)
+    ]
+    contenido = json.dumps(
+        {"version": version, "productos": productos},
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    hash_contenido = hashlib.sha256(contenido).hexdigest()[:16]
+    ruta = f"{CARPETA_SNAPSHOT}catalog.{hash_contenido}.json"
+
+    # Mismo contenido -> mismo archivo: no se reescribe
+    if not default_storage.exists(ruta):
+        default_storage.save(ruta, ContentFile(contenido))
+        _limpiar_snapshots_viejos(ruta)
+
+    return ruta, version
+
+
+def snapshot_actual():
+    """Ruta del snapshot más reciente o None si todavía no se generó"""
+    snapshots = _listar_snapshots()
+    return snapshots[0] if snapshots else None
+
+
+def _listar_snapshots():
+    """Snapshots existentes, del más nuevo al más viejo"""
+    try:
+        _, archivos = default_storage.listdir(CARPETA_SNAPSHOT)
+    except FileNotFoundError:
+        return []
+    rutas = [
+        f"{CARPETA_SNAPSHOT}{nombre}" for nombre in archivos
+        if nombre.startswith("catalog.") and nombre.endswith(".json")
+    ]
+    return sorted(rutas, key=default_storage.get_modified_time, reverse=True)
+
+
+def _limpiar_snapshots_viejos(ruta_actual):
+    """Conserva los últimos CATALOGO_SNAPSHOTS_CONSERVAR archivos (clientes que aún los descargan)"""
+    for ruta in _listar_snapshots()[settings.CATALOGO_SNAPSHOTS_CONSERVAR:]:
+        if ruta != ruta_actual:
+            try:
+                default_storage.delete(ruta)
+            except Exception as e:
+                print(f"Error eliminando snapshot {ruta}: {e}")
+
+
+def cambios_desde(version):
+    """
+    Productos modificados y eliminados después de una versión.
+    Devuelve (lista de productos, lista de IDs eliminados, nueva versión).
+    """
+    fecha = version_a_fecha(version)
+
+    modificados = list(
+        Producto.objects.con_galeria().filter(fecha_actualizacion__gt=fecha).order_by("id")
+    )
+    eliminados = list(
+        ProductoEliminado.objects.filter(fecha_eliminacion__gt=fecha).values_list(
+            "producto_id", "fecha_eliminacion"
+        )
+    )
+
+    # La nueva versión es el cambio más reciente visto (o la misma si no hubo cambios)
+    nueva_version = max(
+        [version]
+        + [fecha_a_version(p.fecha_actualizacion) for p in modificados]
+        + [fecha_a_version(f) for _, f in eliminados]
+    )
+    return modificados, [pk for pk, _ in eliminados], nueva_version
@@ -0,0 +1,181 @@
+"""
+Compresión de respuestas dinámicas (HTML, JSON, CSV...) para Natural Home.
+CompresionMiddleware comprime con brotli (si está instalado el paquete) o
+gzip según Accept-Encoding, también las respuestas en streaming (exportación
+del catálogo) bloque por bloque. Los estáticos precomprimidos por
+collectstatic (ver core/estaticos.py) ya llegan con Content-Encoding y no se tocan.
+
+Cada codificación es una representación distinta, así que el ETag fuerte
+recibe un sufijo ("-gz", "-br") en lugar de volverse débil como en el
+GZipMiddleware de Django. Al llegar, If-None-Match se traduce de vuelta
+al ETag base: las vistas (condition(), revalidar_catalogo) comparan siempre
+contra el ETag sin comprimir.
+"""
+import re
+import zlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import parse_etags
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete solo se usa gzip
+    brotli = None
+
+TIPOS_COMPRIMIBLES = (
+    "text/html", "text/plain", "text/css", "text/csv", "text/javascript",
+    "application/json", "application/javascript", "application/x-ndjson", "image/svg+xml",
+)
+
+# Por debajo de este tamaño la cabecera gzip ocupa más de lo que se ahorra
+MIN_BYTES = 200
+
+SUFIJOS_ETAG = {"br": "-br", "gzip": "-gz"}
+
+NIVEL_GZIP = 6
+# Calidad baja: en respuestas dinámicas importa más la CPU que el último byte
+CALIDAD_BROTLI = 5
+
+_PATRON_CODIFICACION = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*")
+
+
+def codificaciones_aceptadas(request):
+    """Accept-Encoding como {codificación: q}; 'br;q=0' queda con 0 (rechazada)"""
+    aceptadas = {}
+    for parte in request.headers.get("Accept-Encoding", "").split(","):
+        coincidencia = _PATRON_CODIFICACION.fullmatch(parte)
+        if coincidencia:
+            try:
+                aceptadas[coincidencia.group(1).lower()] = float(coincidencia.group(2) or 1)
+            except ValueError:
+                continue
+    return aceptadas
+
+
+def codificacion_preferida(request):
+    """'br', 'gzip' o None según Accept-Encoding (se respetan los q=0)"""
+    aceptadas = codificaciones_aceptadas(request)
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class Compresor:
+    """Compresor incremental con la misma interfaz para gzip y brotli"""
+
+    def __init__(self, codificacion):
+        if codificacion == "br":
+            self._objeto = brotli.Compressor(quality=CALIDAD_BROTLI)
+            self._comprimir = self._objeto.process
+            self._terminar = self._objeto.finish
+        else:
+            # wbits=31: formato gzip (cabecera y CRC), no zlib crudo
+            self._objeto = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+            self._comprimir = self._objeto.compress
+            self._terminar = self._objeto.flush
+
+    def comprimir(self, datos):
+        return self._comprimir(datos)
+
+    def terminar(self):
+        return self._terminar()
+
+
+def comprimir_bloques(bloques, codificacion):
+    compresor = Compresor(codificacion)
+    for bloque in bloques:
+        comprimido = compresor.comprimir(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.terminar()
+
+
+async def acomprimir_bloques(bloques, codificacion):
+    compresor = Compresor(codificacion)
+    async for bloque in bloques:
+        comprimido = compresor.comprimir(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.terminar()
+
+
+def _es_comprimible(response):
+    if response.status_code != 200 or response.has_header("Content-Encoding"):
+        return False
+    if "no-transform" in response.get("Cache-Control", ""):
+        return False
+    tipo = response.get("Content-Type", "").split(";")[0].strip().lower()
+    if tipo not in TIPOS_COMPRIMIBLES:
+        return False
+    return response.streaming or len(response.content) >= MIN_BYTES
+
+
+def _etag_con_sufijo(etag, codificacion):
+    if not etag or etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return etag[:-1] + SUFIJOS_ETAG[codificacion] + '"'
+
+
+class CompresionMiddleware(MiddlewareMixin):
+    """
+    Va arriba en MIDDLEWARE, para comprimir el cuerpo final. Los tokens CSRF
+    del admin se enmascaran en cada request, lo que evita ataques tipo BREACH.
+    """
+
+    def process_request(self, request):
+        cabecera = request.META.get("HTTP_IF_NONE_MATCH")
+        if not cabecera:
+            return
+        etags = parse_etags(cabecera)
+        originales = {}
+        base = []
+        for etag in etags:
+            for sufijo in SUFIJOS_ETAG.values():
+                if etag.endswith(sufijo + '"'):
+                    sin_sufijo = etag[:-len(sufijo) - 1] + '"'
+                    originales[sin_sufijo] = etag
+                    etag = sin_sufijo
+                    break
+            base.append(etag)
+        if originales:
+            # Para devolver en el 304 el mismo ETag que tiene el cliente
+            request.etags_comprimidos = originales
+            request.META["HTTP_IF_NONE_MATCH"] = ", ".join(base)
+
+    def process_response(self, request, response):
+        if response.status_code == 304:
+            originales = getattr(request, "etags_comprimidos", {})
+            if response.get("ETag") in originales:
+                response["ETag"] = originales[response["ETag"]]
+            return response
+
+        if not _es_comprimible(response):
+            return response
+        # Aunque este cliente no comprima, un proxy no debe darle esta versión a otro que sí
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        codificacion = codificacion_preferida(request)
+        if codificacion is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acomprimir_bloques(response.streaming_content, codificacion)
+            else:
+                response.streaming_content = comprimir_bloques(response.streaming_content, codificacion)
+            # El largo final no se conoce hasta terminar
+            response.headers.pop("Content-Length", None)
+        else:
+            comprimido = b"".join(comprimir_bloques([response.content], codificacion))
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response["Content-Length"] = str(len(comprimido))
+
+        if response.has_header("ETag"):
+            response["ETag"] = _etag_con_sufijo(response["ETag"], codificacion)
+        response["Content-Encoding"] = codificacion
+        return response
@@ -0,0 +1,273 @@
+"""
+Pipeline de archivos estáticos para Natural Home.
+Al ejecutar collectstatic con ESTATICOS_OPTIMIZADOS=True:
+  1. se arma un bundle minificado por página (BUNDLES) con el CSS y el JS que usa,
+  2. ManifestStaticFilesStorage les agrega el hash del contenido al nombre,
+  3. se escriben hermanos .gz (y .br si está instalado el paquete brotli).
+servir_estatico entrega esos archivos con caché inmutable de un año y elige
+la versión comprimida según Accept-Encoding.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from .compresion import codificaciones_aceptadas
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin el paquete solo se generan .gz
+    brotli = None
+
+# Bundle -> archivos fuente, en el mismo orden en que los cargaba cada página
+BUNDLES = {
+    "css/tienda.min.css": ["css/style.css", "css/home.css", "css/modal.css"],
+    "js/tienda.min.js": ["js/carrito.js", "js/producto.js", "js/carrusel.js", "js/filtros.js", "js/envio.js"],
+    "css/admin.min.css": ["css/style.css", "css/admin.css", "css/admin_header.css", "css/admin_dynamic.css"],
+    "js/admin_lista.min.js": ["js/admin.js"],
+    "js/admin_formulario.min.js": ["js/admin_forms.js"],
+    "css/login.min.css": ["css/admin_login.css"],
+    "js/login.min.js": ["js/admin_login.js"],
+}
+
+EXTENSIONES_COMPRIMIBLES = (".css", ".js", ".svg", ".json", ".txt", ".html")
+TAMANO_MINIMO_COMPRESION = 512
+
+# Un año: el nombre cambia con el contenido, así que el navegador nunca revalida
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+_PATRON_HASH = re.compile(r"\.[0-9a-f]{12}\.")
+
+
+# ---------------------------------------------------------------------------
+# Minificación
+# ---------------------------------------------------------------------------
+
+def minificar_css(codigo):
+    """Quita comentarios y espacios sobrantes (sin tocar el contenido de las reglas)"""
+    codigo = re.sub(r"/\*.*?\*/", "", codigo, flags=re.S)
+    codigo = re.sub(r"\s+", " ", codigo)
+    codigo = re.sub(r"\s*([{};,>])\s*", r"\1", codigo)
+    codigo = codigo.replace(";}", "}")
+    return codigo.strip()
+
+
+def _fin_cadena(codigo, i):
+    """Índice siguiente al cierre de la cadena ('...', "..." o `...`) que empieza en i"""
+    comilla = codigo[i]
+    i += 1
+    while i < len(codigo):
+        c = codigo[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == comilla:
+            return i + 1
+        if comilla != "`" and c == "\n":
+            return i
+        i += 1
+    return i
+
+
+def _fin_regex(codigo, i):
+    """Índice siguiente al cierre de un literal /regex/flags que empieza en i"""
+    i += 1
+    en_clase = False
+    while i < len(codigo):
+        c = codigo[i]
+        if c == "\\":
+            i += 2
+            continue
+        if c == "\n":
+            return i
+        if c == "[":
+            en_clase = True
+        elif c == "]":
+            en_clase = False
+        elif c == "/" and not en_clase:
+            i += 1
+            while i < len(codigo) and codigo[i].isalpha():
+                i += 1
+            return i
+        i += 1
+    return i
+
+
+def minificar_js(codigo):
+    """
+    Minificación conservadora: elimina comentarios, sangrías y líneas vacías.
+    Mantiene los saltos de línea para no alterar la inserción automática de ';'.
+    Respeta cadenas, template literals y expresiones regulares.
+    """
+    salida = []
+    ultimo = ""  # último carácter significativo emitido
+    i, n = 0, len(codigo)
+
+    while i < n:
+        c = codigo[i]
+
+        if c in "'\"`":
+            fin = _fin_cadena(codigo, i)
+            salida.append(codigo[i:fin])
+            ultimo = c
+            i = fin
+            continue
+
+        if c == "/" and i + 1 < n:
+            siguiente = codigo[i + 1]
+            if siguiente == "/":
+                fin = codigo.find("\n", i)
+                i = n if fin == -1 else fin
+                continue
+            if siguiente == "*":
+                fin = codigo.find("*/", i + 2)
+                i = n if fin == -1 else fin + 2
+                if salida and not salida[-1][-1:].isspace():
+                    salida.append(" ")
+                continue
+            if ultimo == "" or ultimo in "(,=:[!&|?{};+-*%<>~^":
+                fin = _fin_regex(codigo, i)
+                salida.append(codigo[i:fin])
+                ultimo = "/"
+                i = fin
+                continue
+
+        if c == "\n":
+            while salida and salida[-1] in (" ", "\t", "\r"):
+                salida.pop()
+            if salida and salida[-1] != "\n":
+                salida.append("\n")
+            i += 1
+            while i < n and codigo[i] in " \t\r":
+                i += 1
+            continue
+
+        if c in " \t\r":
+            if salida and salida[-1] not in (" ", "\n"):
+                salida.append(" ")
+            i += 1
+            continue
+
+        salida.append(c)
+        ultimo = c
+        i += 1
+
+    return "".join(salida).strip() + "\n"
+
+
+def construir_bundle(nombre, leer):
+    """Concatena y minifica los archivos de un bundle. leer(ruta) devuelve el texto"""
+    partes = [leer(ruta) for ruta in BUNDLES[nombre]]
+    if nombre.endswith(".css"):
+        return "\n".join(minificar_css(p) for p in partes)
+    # ';' entre archivos por si alguno termina sin punto y coma
+    return ";\n".join(minificar_js(p) for p in partes)
+
+
+# ---------------------------------------------------------------------------
+# Storage para collectstatic
+# ---------------------------------------------------------------------------
+
+class AlmacenamientoEstaticos(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que además arma los bundles y precomprime"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for nombre in BUNDLES:
+                contenido = construir_bundle(nombre, self._leer)
+                if self.exists(nombre):
+                    self.delete(nombre)
+                self._save(nombre, ContentFile(contenido.encode("utf-8")))
+                paths[nombre] = (self, nombre)
+
+        procesados = []
+        for original, procesado, hecho in super().post_process(paths, dry_run, **options):
+            if hecho and not isinstance(hecho, Exception) and procesado:
+                procesados.append(procesado)
+            yield original, procesado, hecho
+
+        if not dry_run:
+            for nombre in procesados:
+                self._comprimir(nombre)
+
+    def _leer(self, ruta):
+        with self.open(ruta) as archivo:
+            return archivo.read().decode("utf-8")
+
+    def _comprimir(self, nombre):
+        """Escribe nombre.gz y nombre.br al lado del archivo con hash"""
+        if not nombre.endswith(EXTENSIONES_COMPRIMIBLES):
+            return
+        with self.open(nombre) as archivo:
+            datos = archivo.read()
+        if len(datos) < TAMANO_MINIMO_COMPRESION:
+            return
+
+        variantes = [(".gz", gzip.compress(datos, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variantes.append((".br", brotli.compress(datos, quality=11)))
+
+        for extension, comprimido in variantes:
+            if len(comprimido) >= len(datos):
+                continue
+            if self.exists(nombre + extension):
+                self.delete(nombre + extension)
+            self._save(nombre + extension, ContentFile(comprimido))
+
+
+# ---------------------------------------------------------------------------
+# Servir estáticos
+# ---------------------------------------------------------------------------
+
+def _es_inmutable(ruta):
+    """True si es un archivo con hash del manifest (su contenido nunca cambia)"""
+    if not _PATRON_HASH.search(posixpath.basename(ruta)):
+        return False
+    hashed_files = getattr(staticfiles_storage, "hashed_files", {})
+    return ruta in hashed_files.values()
+
+
+@require_safe
+def servir_estatico(request, path):
+    """
+    Entrega un archivo de STATIC_ROOT. Los archivos con hash llevan caché
+    inmutable de un año; si el cliente acepta br/gzip y existe el hermano
+    precomprimido, se envía ese con Content-Encoding.
+    """
+    ruta = posixpath.normpath(path).lstrip("/")
+    try:
+        completo = safe_join(settings.STATIC_ROOT, ruta)
+    except Exception:
+        raise Http404("Archivo no encontrado")
+    if not os.path.isfile(completo):
+        raise Http404("Archivo no encontrado")
+
+    tipo, _ = mimetypes.guess_type(completo)
+    # Mismo parser que la compresión dinámica (core/compresion.py): respeta q=0
+    aceptadas = codificaciones_aceptadas(request)
+    archivo, codificacion = completo, None
+    for extension, nombre_codificacion in ((".br", "br"), (".gz", "gzip")):
+        if aceptadas.get(nombre_codificacion, 0) > 0 and os.path.isfile(completo + extension):
+            archivo, codificacion = completo + extension, nombre_codificacion
+            break
+
+    response = FileResponse(open(archivo, "rb"), content_type=tipo or "application/octet-stream")
+    if codificacion:
+        response["Content-Encoding"] = codificacion
+    if ruta.endswith(EXTENSIONES_COMPRIMIBLES):
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+    if _es_inmutable(ruta):
+        response["Cache-Control"] = CACHE_INMUTABLE
+    else:
+        response["Cache-Control"] = "public, max-age=3600"
+    return response
@@ -0,0 +1,64 @@
+"""
+Conteos de la barra de filtros (facetas) para Natural Home.
+Cantidad de productos por categoría, por unidad y con descuento, para la
+búsqueda actual, en una sola consulta: GROUP BY (categoria, unidad) y el
+resto se suma en Python. El resultado se cachea con la versión del catálogo
+(ver core/cache_catalogo.py), así que se recalcula solo cuando cambia algún
+producto.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .busqueda import filtrar, palabras
+from .cache_catalogo import clave_pagina
+from .models import Producto
+
+# Mismo criterio que calcular_precio_final
+CON_DESCUENTO = Q(descuento_activo=True, porcentaje_descuento__gt=0)
+
+
+def _vacias(opciones):
+    return {valor: {"nombre": nombre, "total": 0, "con_descuento": 0} for valor, nombre in opciones}
+
+
+def calcular_facetas(query=""):
+    """
+    {'total', 'con_descuento', 'categorias': {valor: {nombre, total, con_descuento}},
+     'unidades': {...}}. Todas las categorías y unidades aparecen, aunque tengan 0.
+    """
+    filas = (
+        filtrar(Producto.objects.all(), query)
+        .order_by()
+        .values_list("categoria", "unidad")
+        .annotate(total=Count("id"), con_descuento=Count("id", filter=CON_DESCUENTO))
+    )
+
+    conteos = {
+        "total": 0,
+        "con_descuento": 0,
+        "categorias": _vacias(Producto.CATEGORIAS),
+        "unidades": _vacias(Producto.UNIDADES),
+    }
+    for categoria, unidad, total, con_descuento in filas:
+        conteos["total"] += total
+        conteos["con_descuento"] += con_descuento
+        for grupo, valor in (("categorias", categoria), ("unidades", unidad)):
+            # Valores cargados antes de que existieran las choices
+            conteo = conteos[grupo].setdefault(valor, {"nombre": valor, "total": 0, "con_descuento": 0})
+            conteo["total"] += total
+            conteo["con_descuento"] += con_descuento
+    return conteos
+
+
+def facetas(query=""):
+    """calcular_facetas cacheado por versión del catálogo y búsqueda"""
+    # "Manzana " y "manzana" dan los mismos resultados: comparten la entrada
+    # (los acentos se conservan: sin FTS5 ni unaccent cambian el resultado)
+    query = " ".join(palabras(query))
+    clave = clave_pagina("facetas", query)
+    resultado = cache.get(clave)
+    if resultado is None:
+        resultado = calcular_facetas(query)
+        cache.set(clave, resultado, timeout=settings.CONTEO_CACHE_SEGUNDOS)
+    return resultado
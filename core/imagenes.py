@@ -0,0 +1,215 @@
+"""
+Generación de imágenes derivadas (miniaturas responsivas) para Natural Home.
+A partir de la imagen original se crean versiones de ancho fijo en formatos
+modernos (WebP y AVIF si Pillow lo soporta), para servir con srcset.
+"""
+import hashlib
+import os
+import zipfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils._os import safe_join
+from PIL import Image, ImageOps, features
+
+# Anchos fijos de las variantes (px)
+ANCHOS_DERIVADOS = (320, 640, 1024)
+
+# Formatos en orden de preferencia para <picture>: el primero que soporte
+# el navegador es el que se descarga
+FORMATOS_DERIVADOS = [
+    fmt for fmt in ("avif", "webp") if features.check(fmt)
+]
+
+CALIDAD = {
+    "avif": 55,
+    "webp": 78,
+}
+
+CARPETA_DERIVADOS = "productos/derivados/"
+
+
+def ruta_derivado(nombre_original, ancho, formato, contenido=None):
+    """
+    Devuelve la ruta en el storage de una variante de la imagen.
+    Con el contenido, el nombre lleva un hash corto: si la variante cambia,
+    cambia la URL y puede servirse con caché inmutable (ver core/medios.py).
+    """
+    base = os.path.splitext(os.path.basename(nombre_original))[0]
+    if contenido is None:
+        return f"{CARPETA_DERIVADOS}{base}_{ancho}w.{formato}"
+    huella = hashlib.sha256(contenido).hexdigest()[:10]
+    return f"{CARPETA_DERIVADOS}{base}_{ancho}w.{huella}.{formato}"
+
+
+def preparar_imagen(img):
+    """Aplica la orientación EXIF y pasa la imagen a RGB/RGBA"""
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info else "RGB")
+    return img
+
+
+def _abrir_imagen(nombre_original):
+    """Abre la imagen desde el storage aplicando la orientación EXIF"""
+    with default_storage.open(nombre_original, "rb") as f:
+        img = Image.open(f)
+        img.load()
+    return preparar_imagen(img)
+
+
+def codificar_variantes(img):
+    """
+    Redimensiona y codifica las variantes de una imagen ya preparada, sin
+    tocar el storage (se puede ejecutar en otro proceso).
+    Devuelve (ancho_original, alto_original, [{'ancho', 'alto', 'formato', 'contenido'}]).
+    """
+    ancho_original, alto_original = img.size
+
+    # Nunca ampliar: los anchos mayores que el original se sustituyen por el original
+    anchos = sorted({min(ancho, ancho_original) for ancho in ANCHOS_DERIVADOS})
+
+    codificadas = []
+    for ancho in anchos:
+        alto = max(1, round(alto_original * ancho / ancho_original))
+        redimensionada = img if ancho == ancho_original else img.resize((ancho, alto), Image.LANCZOS)
+
+        for formato in FORMATOS_DERIVADOS:
+            buffer = BytesIO()
+            redimensionada.save(buffer, format=formato.upper(), quality=CALIDAD[formato])
+            codificadas.append({
+                "ancho": ancho,
+                "alto": alto,
+                "formato": formato,
+                "contenido": buffer.getvalue(),
+            })
+
+    return ancho_original, alto_original, codificadas
+
+
+def guardar_variantes(nombre_original, ancho_original, alto_original, codificadas):
+    """
+    Escribe en el storage las variantes de codificar_variantes.
+    Devuelve un diccionario con las dimensiones originales y la lista de variantes:
+    {'ancho': 1200, 'alto': 900, 'variantes': [{'url', 'ancho', 'alto', 'formato'}]}
+    """
+    variantes = []
+    for variante in codificadas:
+        ruta = ruta_derivado(nombre_original, variante["ancho"], variante["formato"], variante["contenido"])
+        # El nombre lleva el hash del contenido: si ya existe, es el mismo archivo
+        if not default_storage.exists(ruta):
+            ruta = default_storage.save(ruta, ContentFile(variante["contenido"]))
+
+        variantes.append({
+            "url": ruta,
+            "ancho": variante["ancho"],
+            "alto": variante["alto"],
+            "formato": variante["formato"],
+        })
+
+    return {
+        "ancho": ancho_original,
+        "alto": alto_original,
+        "variantes": variantes,
+    }
+
+
+def generar_derivados(nombre_original):
+    """Genera y guarda las variantes de una imagen del storage (ver guardar_variantes)"""
+    return guardar_variantes(nombre_original, *codificar_variantes(_abrir_imagen(nombre_original)))
+
+
+def procesar_imagen_adicional(img, forzar=False, lanzar_errores=False):
+    """
+    Genera los derivados de una ProductoImagen y guarda solo esa fila.
+    Devuelve True si la imagen se procesó. Con lanzar_errores=True los errores
+    se propagan (la cola de tareas los reintenta) en lugar de solo imprimirse.
+    """
+    if img.get_derivados() and not forzar:
+        return False
+    try:
+        resultado = generar_derivados(img.imagen.name)
+    except Exception as e:
+        if lanzar_errores:
+            raise
+        print(f"Error generando derivados de {img.imagen.name}: {e}")
+        return False
+
+    img.ancho = resultado["ancho"]
+    img.alto = resultado["alto"]
+    img.set_derivados(resultado["variantes"])
+    img.save(update_fields=["ancho", "alto", "derivados"])
+    return True
+
+
+def procesar_producto(producto, forzar=False, lanzar_errores=False):
+    """
+    Genera los derivados de la imagen principal y de cada imagen adicional
+    de un producto. Solo procesa las imágenes que aún no tienen variantes,
+    salvo que se indique forzar=True. Las imágenes adicionales se guardan
+    una por una; el producto no se guarda, eso queda a cargo del llamador.
+    Devuelve la cantidad de imágenes procesadas. lanzar_errores: ver
+    procesar_imagen_adicional.
+    """
+    procesadas = 0
+
+    if producto.imagen and (forzar or not producto.get_derivados_imagen()):
+        try:
+            resultado = generar_derivados(producto.imagen.name)
+            producto.imagen_ancho = resultado["ancho"]
+            producto.imagen_alto = resultado["alto"]
+            producto.set_derivados_imagen(resultado["variantes"])
+            procesadas += 1
+        except Exception as e:
+            if lanzar_errores:
+                raise
+            print(f"Error generando derivados de {producto.imagen.name}: {e}")
+
+    for img in producto.get_imagenes_adicionales():
+        if procesar_imagen_adicional(img, forzar, lanzar_errores):
+            procesadas += 1
+
+    return procesadas
+
+
+# ---------------------------------------------------------------------------
+# Ingesta desde una carpeta o un .zip (importar_catalogo)
+# ---------------------------------------------------------------------------
+
+# Un ZipFile abierto por proceso y archivo
+_zips = {}
+
+
+def leer_imagen_origen(origen, nombre):
+    """Bytes de una imagen dentro de la carpeta o el .zip de origen"""
+    if origen.lower().endswith(".zip"):
+        if origen not in _zips:
+            _zips[origen] = zipfile.ZipFile(origen)
+        try:
+            return _zips[origen].read(nombre)
+        except KeyError:
+            raise FileNotFoundError(f"{nombre} no está en {os.path.basename(origen)}")
+    with open(safe_join(origen, nombre), "rb") as archivo:
+        return archivo.read()
+
+
+def procesar_imagen_origen(tarea):
+    """
+    Lee, valida y codifica las variantes de una imagen de origen. Se ejecuta
+    en los procesos del pool: solo usa Pillow, no toca la base ni el storage.
+    tarea = (origen, nombre, tamaño máximo en bytes, formatos permitidos).
+    Devuelve (nombre, resultado de codificar_variantes o None, error o None).
+    """
+    origen, nombre, tamano_maximo, formatos_permitidos = tarea
+    try:
+        datos = leer_imagen_origen(origen, nombre)
+        if len(datos) > tamano_maximo:
+            raise ValueError(f"supera el tamaño máximo ({len(datos)} bytes)")
+        img = Image.open(BytesIO(datos))
+        if img.format not in formatos_permitidos:
+            raise ValueError(f"formato {img.format} no permitido")
+        img.load()
+        return nombre, codificar_variantes(preparar_imagen(img)), None
+    except Exception as e:
+        return nombre, None, str(e) or e.__class__.__name__
@@ -0,0 +1,181 @@
+"""
+Importación y exportación masiva del catálogo de Natural Home.
+Formatos: CSV, JSON Lines (.jsonl, una fila por línea) y JSON (lista).
+Columnas (COLUMNAS): las imágenes adicionales van en una sola columna
+separadas por "|". Una fila con id actualiza ese producto o, si no existe,
+lo crea con ese mismo id. Las filas se leen y se escriben de a una con generadores,
+así el archivo completo nunca está en memoria (salvo JSON en forma de lista,
+que hay que leer entero para poder parsearlo: para archivos grandes usar .jsonl).
+"""
+import csv
+import json
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Prefetch
+
+from .models import Producto, ProductoImagen
+
+COLUMNAS = [
+    "id", "titulo", "precio", "unidad", "categoria", "descripcion",
+    "descuento_activo", "porcentaje_descuento", "fraccionado",
+    "imagen", "imagenes_adicionales",
+]
+SEPARADOR_IMAGENES = "|"
+
+FORMATOS = ("csv", "jsonl", "json")
+
+VERDADEROS = {"1", "true", "si", "sí", "s", "x", "yes", "y"}
+
+
+def formato_de_archivo(ruta):
+    """Deduce el formato por la extensión (.csv, .jsonl/.ndjson, .json)"""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".json":
+        return "json"
+    return "csv"
+
+
+# ---------------------------------------------------------------------------
+# Lectura y validación de filas
+# ---------------------------------------------------------------------------
+
+def leer_filas(archivo, formato):
+    """Genera (número de fila, dict) a partir de un archivo de texto abierto"""
+    if formato == "csv":
+        for numero, fila in enumerate(csv.DictReader(archivo), start=2):
+            yield numero, fila
+    elif formato == "jsonl":
+        for numero, linea in enumerate(archivo, start=1):
+            if linea.strip():
+                yield numero, json.loads(linea)
+    else:
+        for numero, fila in enumerate(json.load(archivo), start=1):
+            yield numero, fila
+
+
+def _texto(valor):
+    return "" if valor is None else str(valor).strip()
+
+
+def _booleano(valor):
+    if isinstance(valor, bool):
+        return valor
+    return _texto(valor).lower() in VERDADEROS
+
+
+def _opcion(valor, opciones, campo):
+    """Acepta la clave o la etiqueta de una opción del modelo (sin distinguir mayúsculas)"""
+    texto = _texto(valor).lower()
+    for clave, etiqueta in opciones:
+        if texto in (clave.lower(), etiqueta.lower()):
+            return clave
+    raise ValueError(f"{campo} '{valor}' no válido")
+
+
+def _lista_imagenes(valor):
+    if isinstance(valor, list):
+        return [_texto(v) for v in valor if _texto(v)]
+    return [v.strip() for v in _texto(valor).split(SEPARADOR_IMAGENES) if v.strip()]
+
+
+def normalizar_fila(fila):
+    """
+    Valida una fila y devuelve un dict con los campos del modelo más 'id',
+    'imagen' e 'imagenes_adicionales' (listas de nombres sin resolver).
+    Lanza ValueError con el motivo si la fila no es válida.
+    """
+    titulo = _texto(fila.get("titulo"))
+    if not titulo:
+        raise ValueError("falta el título")
+
+    try:
+        precio = Decimal(_texto(fila.get("precio")).replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"precio '{fila.get('precio')}' no válido")
+    if not precio.is_finite() or precio < 0:
+        raise ValueError(f"precio '{fila.get('precio')}' no válido")
+
+    id_texto = _texto(fila.get("id"))
+    if id_texto and not id_texto.isdigit():
+        raise ValueError(f"id '{id_texto}' no válido")
+
+    descuento_activo = _booleano(fila.get("descuento_activo"))
+    porcentaje_texto = _texto(fila.get("porcentaje_descuento")) or "0"
+    if not porcentaje_texto.isdigit() or int(porcentaje_texto) > 100:
+        raise ValueError(f"porcentaje_descuento '{porcentaje_texto}' no válido")
+
+    return {
+        "id": int(id_texto) if id_texto else None,
+        "titulo": titulo[:200],
+        "precio": precio.quantize(Decimal("0.01")),
+        "unidad": _opcion(fila.get("unidad") or "unidad", Producto.UNIDADES, "unidad"),
+        "categoria": _opcion(fila.get("categoria") or "otros", Producto.CATEGORIAS, "categoria"),
+        "descripcion": _texto(fila.get("descripcion")),
+        "descuento_activo": descuento_activo,
+        "porcentaje_descuento": int(porcentaje_texto) if descuento_activo else 0,
+        "fraccionado": _booleano(fila.get("fraccionado")),
+        "imagen": _texto(fila.get("imagen")),
+        "imagenes_adicionales": _lista_imagenes(fila.get("imagenes_adicionales")),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Exportación
+# ---------------------------------------------------------------------------
+
+def filas_exportacion(queryset=None, chunk_size=2000):
+    """Genera un dict por producto con las columnas de COLUMNAS"""
+    if queryset is None:
+        queryset = Producto.objects.all()
+    queryset = queryset.only(*[c for c in COLUMNAS if c != "imagenes_adicionales"]).prefetch_related(
+        Prefetch("imagenes", queryset=ProductoImagen.objects.only("producto_id", "imagen", "orden"))
+    ).order_by("id")
+
+    for p in queryset.iterator(chunk_size=chunk_size):
+        yield {
+            "id": p.id,
+            "titulo": p.titulo,
+            "precio": str(p.precio),
+            "unidad": p.unidad,
+            "categoria": p.categoria,
+            "descripcion": p.descripcion or "",
+            "descuento_activo": p.descuento_activo,
+            "porcentaje_descuento": p.porcentaje_descuento,
+            "fraccionado": p.fraccionado,
+            "imagen": p.imagen.name if p.imagen else "",
+            "imagenes_adicionales": [img.imagen.name for img in p.imagenes.all()],
+        }
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en lugar de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def exportar(formato, queryset=None):
+    """Genera el archivo exportado en trozos de texto (para escribir o hacer streaming)"""
+    filas = filas_exportacion(queryset)
+
+    if formato == "csv":
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(COLUMNAS)
+        for fila in filas:
+            fila["imagenes_adicionales"] = SEPARADOR_IMAGENES.join(fila["imagenes_adicionales"])
+            fila["descuento_activo"] = int(fila["descuento_activo"])
+            fila["fraccionado"] = int(fila["fraccionado"])
+            yield escritor.writerow([fila[c] for c in COLUMNAS])
+    elif formato == "jsonl":
+        for fila in filas:
+            yield json.dumps(fila, ensure_ascii=False) + "\n"
+    else:
+        yield "["
+        separador = "\n"
+        for fila in filas:
+            yield separador + json.dumps(fila, ensure_ascii=False)
+            separador = ",\n"
+        yield "\n]\n"
@@ -0,0 +1,250 @@
+"""
+Medición de rendimiento por request para Natural Home.
+InstrumentacionMiddleware mide el tiempo total, las consultas SQL (cantidad y
+tiempo), el render de plantillas y las llamadas al storage, y lo informa en
+la cabecera Server-Timing. Los requests más lentos que REQUEST_LENTO_MS se
+registran como JSON en el logger "core.lento", y los últimos minutos se
+agregan por endpoint para la vista admin_rendimiento.
+
+Las mediciones viven en una ContextVar, así funcionan igual en vistas sync y
+async (sync_to_async copia el contexto al hilo que ejecuta el ORM).
+"""
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.utils.functional import empty
+
+logger_lento = logging.getLogger("core.lento")
+
+_medicion_actual = contextvars.ContextVar("medicion_request", default=None)
+
+# Máximo de muestras por endpoint y minuto que se guardan para los percentiles
+MAX_MUESTRAS_MINUTO = 500
+
+METODOS_STORAGE = ("url", "open", "save", "exists", "delete", "size")
+
+# Endpoint de los requests que no coinciden con ninguna URL (404 de bots, escaneos):
+# todos comparten una entrada, si no cada ruta inventada agregaría una más
+SIN_RUTA = "<sin ruta>"
+
+
+class Medicion:
+    """Acumuladores de un request"""
+
+    __slots__ = ("sql_cantidad", "sql_ms", "plantillas_ms", "storage_cantidad", "storage_ms")
+
+    def __init__(self):
+        self.sql_cantidad = 0
+        self.sql_ms = 0.0
+        self.plantillas_ms = 0.0
+        self.storage_cantidad = 0
+        self.storage_ms = 0.0
+
+
+# ---------------------------------------------------------------------------
+# Puntos de medición
+# ---------------------------------------------------------------------------
+
+def _medir_sql(execute, sql, params, many, context):
+    """execute_wrapper: cuenta y mide cada consulta del request en curso"""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql_cantidad += 1
+        medicion.sql_ms += (time.perf_counter() - inicio) * 1000
+
+
+def _agregar_wrapper_sql(sender, connection, **kwargs):
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_sql)
+
+
+def _cronometrar(funcion, campo_ms, campo_cantidad=None):
+    """Envuelve funcion para sumar su duración a la medición del request"""
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return funcion(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            setattr(medicion, campo_ms, getattr(medicion, campo_ms) + (time.perf_counter() - inicio) * 1000)
+            if campo_cantidad:
+                setattr(medicion, campo_cantidad, getattr(medicion, campo_cantidad) + 1)
+    envoltura._instrumentada = True
+    return envoltura
+
+
+def instalar():
+    """
+    Activa los puntos de medición (se llama una vez desde CoreConfig.ready):
+    wrapper SQL en cada conexión nueva, render de plantillas del backend de
+    Django (una vez por render(), sin contar los include) y métodos del storage.
+    """
+    from django.core.files.storage import default_storage
+    from django.db import connections
+    from django.template.backends.django import Template
+
+    connection_created.connect(_agregar_wrapper_sql, dispatch_uid="core.instrumentacion.sql")
+    for conexion in connections.all(initialized_only=True):
+        _agregar_wrapper_sql(None, conexion)
+
+    if not getattr(Template.render, "_instrumentada", False):
+        Template.render = _cronometrar(Template.render, "plantillas_ms")
+
+    # default_storage es un objeto lazy: se instrumenta la clase del storage real
+    if default_storage._wrapped is empty:
+        default_storage._setup()
+    clase_storage = type(default_storage._wrapped)
+    for nombre in METODOS_STORAGE:
+        metodo = getattr(clase_storage, nombre, None)
+        if metodo is not None and not getattr(metodo, "_instrumentada", False):
+            setattr(clase_storage, nombre, _cronometrar(metodo, "storage_ms", "storage_cantidad"))
+
+
+# ---------------------------------------------------------------------------
+# Agregación por endpoint (ventana móvil en memoria del proceso)
+# ---------------------------------------------------------------------------
+
+_lock = threading.Lock()
+# {minuto: {endpoint: [muestras]}}, cada muestra = (total, sql_ms, sql_cantidad, plantillas, storage)
+_minutos = {}
+_lentos_por_minuto = defaultdict(lambda: defaultdict(int))
+
+
+def registrar(endpoint, total_ms, medicion, lento):
+    minuto = int(time.time() // 60)
+    muestra = (total_ms, medicion.sql_ms, medicion.sql_cantidad, medicion.plantillas_ms, medicion.storage_ms)
+    with _lock:
+        por_endpoint = _minutos.setdefault(minuto, defaultdict(list))
+        if len(por_endpoint[endpoint]) < MAX_MUESTRAS_MINUTO:
+            por_endpoint[endpoint].append(muestra)
+        if lento:
+            _lentos_por_minuto[minuto][endpoint] += 1
+
+        # Descartar minutos fuera de la ventana
+        limite = minuto - settings.RENDIMIENTO_VENTANA_MINUTOS
+        for viejo in [m for m in _minutos if m <= limite]:
+            del _minutos[viejo]
+            _lentos_por_minuto.pop(viejo, None)
+
+
+def _percentil(valores_ordenados, p):
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+def peores_endpoints(limite=10):
+    """Endpoints ordenados por p95 del tiempo total en la ventana configurada"""
+    desde = int(time.time() // 60) - settings.RENDIMIENTO_VENTANA_MINUTOS
+    muestras = defaultdict(list)
+    lentos = defaultdict(int)
+    with _lock:
+        for minuto, por_endpoint in _minutos.items():
+            if minuto > desde:
+                for endpoint, lista in por_endpoint.items():
+                    muestras[endpoint].extend(lista)
+                for endpoint, cantidad in _lentos_por_minuto.get(minuto, {}).items():
+                    lentos[endpoint] += cantidad
+
+    resumen = []
+    for endpoint, lista in muestras.items():
+        totales = sorted(m[0] for m in lista)
+        n = len(lista)
+        resumen.append({
+            "endpoint": endpoint,
+            "requests": n,
+            "lentos": lentos[endpoint],
+            "p50_ms": round(_percentil(totales, 50), 1),
+            "p95_ms": round(_percentil(totales, 95), 1),
+            "max_ms": round(totales[-1], 1),
+            "sql_ms_promedio": round(sum(m[1] for m in lista) / n, 1),
+            "consultas_promedio": round(sum(m[2] for m in lista) / n, 1),
+            "plantillas_ms_promedio": round(sum(m[3] for m in lista) / n, 1),
+            "storage_ms_promedio": round(sum(m[4] for m in lista) / n, 1),
+        })
+    resumen.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return resumen[:limite]
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+
+class InstrumentacionMiddleware:
+    """Agrega Server-Timing a cada respuesta y registra los requests lentos"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.es_async = iscoroutinefunction(get_response)
+        if self.es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.es_async:
+            return self.__acall__(request)
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return self._finalizar(request, response, medicion, inicio)
+
+    async def __acall__(self, request):
+        medicion = Medicion()
+        token = _medicion_actual.set(medicion)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicion_actual.reset(token)
+        return self._finalizar(request, response, medicion, inicio)
+
+    def _finalizar(self, request, response, medicion, inicio):
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        response["Server-Timing"] = ", ".join([
+            f'sql;dur={medicion.sql_ms:.1f};desc="{medicion.sql_cantidad} consultas"',
+            f"tpl;dur={medicion.plantillas_ms:.1f}",
+            f'storage;dur={medicion.storage_ms:.1f};desc="{medicion.storage_cantidad} llamadas"',
+            f"total;dur={total_ms:.1f}",
+        ])
+
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.view_name if match else SIN_RUTA
+        lento = total_ms >= settings.REQUEST_LENTO_MS
+        if lento:
+            logger_lento.warning(json.dumps({
+                "endpoint": endpoint,
+                "metodo": request.method,
+                "ruta": request.get_full_path(),
+                "estado": response.status_code,
+                "total_ms": round(total_ms, 1),
+                "sql_ms": round(medicion.sql_ms, 1),
+                "consultas": medicion.sql_cantidad,
+                "plantillas_ms": round(medicion.plantillas_ms, 1),
+                "storage_ms": round(medicion.storage_ms, 1),
+                "storage_llamadas": medicion.storage_cantidad,
+            }, ensure_ascii=False))
+
+        registrar(endpoint, total_ms, medicion, lento)
+        return response
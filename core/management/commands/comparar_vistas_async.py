@@ -0,0 +1,104 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncRequestFactory, override_settings
+
+from core import views, views_async
+from core.cache_catalogo import invalidar_catalogo
+from core.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el throughput de home y /api/producto/<id>/ en sus versiones sync y async "
+        "con requests concurrentes, igual que las ejecuta un servidor ASGI"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=400, help="Requests por escenario")
+        parser.add_argument("--concurrencia", type=int, default=50, help="Requests simultáneos")
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=8,
+            help="Hilos que ejecutan las vistas sync, como los threads de un servidor WSGI",
+        )
+        parser.add_argument(
+            "--sin-cache",
+            action="store_true",
+            help="No guarda las páginas de home en caché (cada request consulta la base)",
+        )
+
+    def handle(self, *args, **options):
+        ids = list(Producto.objects.values_list("id", flat=True)[:200])
+        if not ids:
+            raise CommandError("No hay productos cargados para medir")
+
+        escenarios = [
+            ("home", lambda n: ("/", {}), views.home, views_async.home_async),
+            (
+                "api_producto",
+                lambda n: (f"/api/producto/{ids[n % len(ids)]}/", {"id": ids[n % len(ids)]}),
+                views.api_producto,
+                views_async.api_producto_async,
+            ),
+        ]
+
+        segundos_cache = 0 if options["sin_cache"] else 600
+        if options["sin_cache"]:
+            # Descarta las páginas que ya estaban en caché
+            invalidar_catalogo()
+        self.stdout.write(
+            f"{options['requests']} requests por escenario, concurrencia {options['concurrencia']}, "
+            f"{options['hilos']} hilos para las vistas sync, "
+            f"caché de páginas {'desactivada' if options['sin_cache'] else 'activada'}"
+        )
+        self.stdout.write(f"{'escenario':<14}{'modo':<7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}")
+
+        # AsyncRequestFactory siempre manda "testserver" como host (no se puede cambiar por header)
+        allowed_hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+        # Las vistas sync corren en un pool de hilos propio: con el sync_to_async por defecto
+        # (thread_sensitive) se ejecutarían de a una en un solo hilo y la comparación no sería justa
+        with (
+            override_settings(CACHE_HOME_SEGUNDOS=segundos_cache, ALLOWED_HOSTS=allowed_hosts),
+            ThreadPoolExecutor(max_workers=options["hilos"], thread_name_prefix="wsgi") as pool,
+        ):
+            for nombre, armar, vista_sync, vista_async in escenarios:
+                sync = sync_to_async(vista_sync, thread_sensitive=False, executor=pool)
+                for modo, vista in (("sync", sync), ("async", vista_async)):
+                    por_segundo, p50, p95 = asyncio.run(
+                        self._medir(vista, armar, options["requests"], options["concurrencia"])
+                    )
+                    self.stdout.write(f"{nombre:<14}{modo:<7}{por_segundo:>10.1f}{p50:>10.1f}{p95:>10.1f}")
+
+    async def _medir(self, vista, armar, total, concurrencia):
+        """Ejecuta total requests con como máximo concurrencia a la vez"""
+        factory = AsyncRequestFactory()
+        semaforo = asyncio.Semaphore(concurrencia)
+        duraciones = []
+
+        async def un_request(n):
+            ruta, kwargs = armar(n)
+            async with semaforo:
+                inicio = time.perf_counter()
+                response = await vista(factory.get(ruta), **kwargs)
+                duraciones.append(time.perf_counter() - inicio)
+                if response.status_code != 200:
+                    raise CommandError(f"{ruta} respondió {response.status_code}")
+
+        # Un request previo para calentar cachés de proceso (FTS, plantillas)
+        await un_request(0)
+        duraciones.clear()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(un_request(n) for n in range(total)))
+        transcurrido = time.perf_counter() - inicio
+
+        duraciones.sort()
+        p50 = duraciones[len(duraciones) // 2] * 1000
+        p95 = duraciones[int(len(duraciones) * 0.95) - 1] * 1000
+        return total / transcurrido, p50, p95
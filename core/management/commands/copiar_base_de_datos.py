@@ -0,0 +1,101 @@
+import time
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia los datos entre dos bases de DATABASES (por ejemplo de SQLite a PostgreSQL) "
+        "en lotes con bulk_create, conservando los ids. La base de destino ya debe estar "
+        "migrada (python manage.py migrate --database destino). Ver docs/base_de_datos.md"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", default=DEFAULT_DB_ALIAS, help="Alias de origen (por defecto: default)")
+        parser.add_argument("--hacia", default="destino", help="Alias de destino (por defecto: destino, con DB_DESTINO_*)")
+        parser.add_argument(
+            "--apps",
+            nargs="+",
+            default=["core"],
+            help="Apps a copiar (por defecto solo core; las sesiones del admin se pueden omitir)",
+        )
+        parser.add_argument("--lote", type=int, default=1000, help="Filas por INSERT")
+        parser.add_argument(
+            "--vaciar",
+            action="store_true",
+            help="Borra antes las filas que ya tengan esas tablas en el destino",
+        )
+
+    def handle(self, *args, **options):
+        desde, hacia = options["desde"], options["hacia"]
+        for alias in (desde, hacia):
+            if alias not in connections.settings:
+                raise CommandError(f"No existe la base '{alias}' en DATABASES (configurar DB_DESTINO_MOTOR y demás)")
+        if desde == hacia:
+            raise CommandError("El origen y el destino deben ser bases distintas")
+
+        destino = connections[hacia]
+        ejecutor = MigrationExecutor(destino)
+        if ejecutor.migration_plan(ejecutor.loader.graph.leaf_nodes()):
+            raise CommandError(f"La base '{hacia}' tiene migraciones pendientes: python manage.py migrate --database {hacia}")
+
+        modelos = self._modelos(options["apps"])
+        ocupados = [m._meta.label for m in modelos if m._base_manager.using(hacia).exists()]
+        if ocupados and not options["vaciar"]:
+            raise CommandError(f"El destino ya tiene datos en {', '.join(ocupados)} (usar --vaciar para reemplazarlos)")
+
+        inicio = time.perf_counter()
+        lote = max(1, options["lote"])
+        with transaction.atomic(using=hacia):
+            # DELETE directo: delete() dispararía las señales (índice, caché) sobre la base default.
+            # Primero los que dependen de otros, para no violar claves foráneas
+            with destino.cursor() as cursor:
+                for modelo in reversed(modelos):
+                    cursor.execute(f"DELETE FROM {destino.ops.quote_name(modelo._meta.db_table)}")
+
+            for modelo in modelos:
+                copiadas = 0
+                filas = []
+                for fila in modelo._base_manager.using(desde).order_by("pk").iterator(chunk_size=lote):
+                    filas.append(fila)
+                    if len(filas) == lote:
+                        copiadas += len(modelo._base_manager.using(hacia).bulk_create(filas))
+                        filas = []
+                if filas:
+                    copiadas += len(modelo._base_manager.using(hacia).bulk_create(filas))
+                self.stdout.write(f"  {modelo._meta.label}: {copiadas} filas")
+
+            # Los ids se copiaron tal cual: las secuencias (PostgreSQL) siguen desde el mayor
+            with destino.cursor() as cursor:
+                for sql in destino.ops.sequence_reset_sql(no_style(), modelos):
+                    cursor.execute(sql)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Copia de '{desde}' a '{hacia}' terminada en {time.perf_counter() - inicio:.1f}s"
+        ))
+        if destino.vendor == "sqlite":
+            # La tabla FTS no es un modelo: se reconstruye al apuntar default a la nueva base
+            self.stdout.write("Con la nueva base como default, ejecutar: python manage.py reindexar_busqueda")
+
+    @staticmethod
+    def _modelos(etiquetas):
+        """Modelos de las apps (con las tablas intermedias de ManyToMany) ordenados por dependencias"""
+        try:
+            configs = [apps.get_app_config(etiqueta) for etiqueta in etiquetas]
+        except LookupError as e:
+            raise CommandError(str(e))
+        modelos = []
+        for modelo in serializers.sort_dependencies([(config, None) for config in configs]):
+            if not modelo._meta.managed or modelo._meta.proxy:
+                continue
+            modelos.append(modelo)
+            for campo in modelo._meta.local_many_to_many:
+                intermedio = campo.remote_field.through
+                if intermedio._meta.auto_created:
+                    modelos.append(intermedio)
+        return modelos
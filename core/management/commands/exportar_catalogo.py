@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from core.importacion import FORMATOS, exportar, formato_de_archivo
+from core.models import Producto
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta el catálogo a CSV, JSON Lines o JSON fila por fila "
+        "(el mismo formato que lee importar_catalogo)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--salida", default="-", help="Archivo de salida ('-' para la salida estándar)")
+        parser.add_argument("--formato", choices=FORMATOS, help="Por defecto se deduce de la extensión de --salida")
+        parser.add_argument("--categoria", help="Exporta solo esta categoría")
+
+    def handle(self, *args, **options):
+        salida = options["salida"]
+        formato = options["formato"] or ("csv" if salida == "-" else formato_de_archivo(salida))
+
+        productos = Producto.objects.all()
+        if options["categoria"]:
+            productos = productos.filter(categoria=options["categoria"])
+
+        if salida == "-":
+            for trozo in exportar(formato, productos):
+                sys.stdout.write(trozo)
+            return
+
+        with open(salida, "w", encoding="utf-8", newline="") as archivo:
+            for trozo in exportar(formato, productos):
+                archivo.write(trozo)
+        self.stdout.write(self.style.SUCCESS(f"Catálogo exportado en {salida}"))
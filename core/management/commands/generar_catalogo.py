@@ -0,0 +1,14 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.catalogo import generar_snapshot
+
+
+class Command(BaseCommand):
+    help = "Genera el snapshot JSON del catálogo (catalogo/catalog.<hash>.json)"
+
+    def handle(self, *args, **options):
+        ruta, version = generar_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {default_storage.url(ruta)} (versión {version}, {default_storage.size(ruta)} bytes)"
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from core.imagenes import FORMATOS_DERIVADOS, ANCHOS_DERIVADOS, procesar_producto
+from core.models import Producto
+
+
+class Command(BaseCommand):
+    help = "Genera las variantes responsivas (miniaturas WebP/AVIF) de las imágenes de productos existentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--forzar",
+            action="store_true",
+            help="Regenera también las imágenes que ya tienen variantes",
+        )
+        parser.add_argument(
+            "--ids",
+            nargs="+",
+            type=int,
+            help="Procesa solo los productos con estos IDs",
+        )
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.con_galeria()
+        if options["ids"]:
+            productos = productos.filter(id__in=options["ids"])
+
+        self.stdout.write(
+            f"Formatos: {', '.join(FORMATOS_DERIVADOS)} - Anchos: {', '.join(map(str, ANCHOS_DERIVADOS))}"
+        )
+
+        total_productos = 0
+        total_imagenes = 0
+        for producto in productos.iterator(chunk_size=200):
+            procesadas = procesar_producto(producto, forzar=options["forzar"])
+            if procesadas:
+                producto.save(update_fields=["imagen_ancho", "imagen_alto", "imagen_derivados"])
+                total_productos += 1
+                total_imagenes += procesadas
+                self.stdout.write(f"  {producto.id} - {producto.titulo}: {procesadas} imagen(es)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Listo: {total_imagenes} imágenes procesadas en {total_productos} productos"
+        ))
@@ -0,0 +1,318 @@
+import json
+import multiprocessing
+import os
+import posixpath
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils._os import safe_join
+
+from core.busqueda import reindexar_todo
+from core.cache_catalogo import invalidar_catalogo
+from core.catalogo import regenerar_snapshot
+from core.almacenamiento import almacenamiento_imagenes
+from core.imagenes import guardar_variantes, leer_imagen_origen, procesar_imagen_origen
+from core.importacion import FORMATOS, formato_de_archivo, leer_filas, normalizar_fila
+from core.models import Producto, ProductoImagen
+from core.uploads import FORMATOS_PERMITIDOS
+
+CARPETA_IMAGENES = "productos/"
+
+CAMPOS_PRODUCTO = [
+    "titulo", "precio", "unidad", "categoria", "descripcion",
+    "descuento_activo", "porcentaje_descuento", "fraccionado",
+]
+CAMPOS_IMAGEN = ["imagen", "imagen_ancho", "imagen_alto", "imagen_derivados"]
+
+# Errores que se listan al final (el resto solo se cuenta)
+MAX_ERRORES_MOSTRADOS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos desde CSV, JSON Lines o JSON en lotes (bulk_create/bulk_update). "
+        "Las filas con un id existente actualizan ese producto; el resto se crean, "
+        "conservando el id del archivo si lo trae (reimportar una exportación no renumera). "
+        "Las imágenes se toman de --imagenes (carpeta o .zip) y se procesan en paralelo"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="Archivo .csv, .jsonl o .json (columnas en core/importacion.py)")
+        parser.add_argument("--formato", choices=FORMATOS, help="Por defecto se deduce de la extensión")
+        parser.add_argument("--imagenes", help="Carpeta o .zip con las imágenes nombradas en el archivo")
+        parser.add_argument("--lote", type=int, default=500, help="Filas por transacción")
+        parser.add_argument(
+            "--procesos",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Procesos para decodificar y redimensionar imágenes (por defecto, uno por núcleo)",
+        )
+        parser.add_argument(
+            "--simular",
+            action="store_true",
+            help="Solo valida el archivo, sin guardar nada",
+        )
+
+    def handle(self, *args, **options):
+        archivo = options["archivo"]
+        if not os.path.isfile(archivo):
+            raise CommandError(f"No existe el archivo {archivo}")
+        origen = options["imagenes"]
+        if origen and not (os.path.isdir(origen) or zipfile.is_zipfile(origen)):
+            raise CommandError("--imagenes debe ser una carpeta o un archivo .zip")
+
+        formato = options["formato"] or formato_de_archivo(archivo)
+        inicio = time.perf_counter()
+
+        self.origen = os.path.abspath(origen) if origen else None
+        self.nombres_zip = (
+            set(zipfile.ZipFile(origen).namelist()) if origen and not os.path.isdir(origen) else None
+        )
+        self.imagenes = {}  # nombre en el origen -> campos de la imagen guardada (None si falló)
+        self.errores = []
+        creados = actualizados = validas = 0
+
+        # spawn: los procesos hijos no heredan las conexiones a la base
+        pool = None
+        if self.origen and options["procesos"] > 1 and not options["simular"]:
+            pool = ProcessPoolExecutor(
+                max_workers=options["procesos"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        try:
+            with open(archivo, encoding="utf-8-sig", newline="") as f:
+                for lote in self._lotes(leer_filas(f, formato), max(1, options["lote"])):
+                    filas = self._validar(lote)
+                    validas += len(filas)
+                    if options["simular"] or not filas:
+                        continue
+                    self._ingerir_imagenes(filas, pool)
+                    nuevos, modificados = self._guardar(filas)
+                    creados += nuevos
+                    actualizados += modificados
+                    self.stdout.write(f"  {creados + actualizados} productos guardados")
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CommandError(f"No se pudo leer {archivo}: {e}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        for error in self.errores[:MAX_ERRORES_MOSTRADOS]:
+            self.stderr.write(f"  {error}")
+        if len(self.errores) > MAX_ERRORES_MOSTRADOS:
+            self.stderr.write(f"  ... y {len(self.errores) - MAX_ERRORES_MOSTRADOS} errores más")
+
+        if options["simular"]:
+            self.stdout.write(f"Simulación: {validas} filas válidas, {len(self.errores)} con errores")
+            return
+
+        # Los ids explícitos no avanzan la secuencia en PostgreSQL (en SQLite no hace falta)
+        if creados:
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Producto]):
+                    cursor.execute(sql)
+
+        # bulk_create/bulk_update no disparan señales: índice, caché y snapshot a mano
+        reindexar_todo()
+        invalidar_catalogo()
+        if settings.CATALOGO_SNAPSHOT_AUTOMATICO:
+            regenerar_snapshot()
+
+        procesadas = sum(1 for campos in self.imagenes.values() if campos)
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación: {creados} productos creados, {actualizados} actualizados, "
+            f"{procesadas} imágenes procesadas, {len(self.errores)} errores "
+            f"en {time.perf_counter() - inicio:.1f}s"
+        ))
+
+    @staticmethod
+    def _lotes(filas, tamano):
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) == tamano:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def _validar(self, lote):
+        filas = []
+        for numero, fila in lote:
+            try:
+                filas.append((numero, normalizar_fila(fila)))
+            except (ValueError, AttributeError) as e:
+                self.errores.append(f"fila {numero}: {e}")
+        return filas
+
+    # -----------------------------------------------------------------------
+    # Imágenes
+    # -----------------------------------------------------------------------
+
+    def _en_origen(self, nombre):
+        if self.origen is None:
+            return False
+        if self.nombres_zip is not None:
+            return nombre in self.nombres_zip
+        try:
+            return os.path.isfile(safe_join(self.origen, nombre))
+        except Exception:
+            return False
+
+    def _ingerir_imagenes(self, filas, pool):
+        """Decodifica, valida y redimensiona en el pool las imágenes nuevas del lote"""
+        pendientes = {}  # dict como conjunto ordenado
+        for _, datos in filas:
+            for nombre in [datos["imagen"], *datos["imagenes_adicionales"]]:
+                if nombre and nombre not in self.imagenes and nombre not in pendientes and self._en_origen(nombre):
+                    pendientes[nombre] = True
+        if not pendientes:
+            return
+
+        tareas = [(self.origen, nombre, settings.MAX_TAMANO_IMAGEN, FORMATOS_PERMITIDOS) for nombre in pendientes]
+        if pool is None:
+            resultados = map(procesar_imagen_origen, tareas)
+        else:
+            resultados = pool.map(procesar_imagen_origen, tareas, chunksize=4)
+
+        # Las escrituras al storage quedan en este proceso
+        for nombre, codificadas, error in resultados:
+            if error:
+                self.errores.append(f"imagen {nombre}: {error}")
+                self.imagenes[nombre] = None
+                continue
+            ruta = almacenamiento_imagenes.save(
+                CARPETA_IMAGENES + posixpath.basename(nombre),
+                ContentFile(leer_imagen_origen(self.origen, nombre)),
+            )
+            resultado = guardar_variantes(ruta, *codificadas)
+            self.imagenes[nombre] = {
+                "imagen": ruta,
+                "ancho": resultado["ancho"],
+                "alto": resultado["alto"],
+                "derivados": json.dumps(resultado["variantes"]),
+            }
+
+    def _imagen(self, nombre, numero):
+        """
+        Campos de una imagen nombrada en el archivo: procesada desde el origen
+        o, si no está ahí, un archivo que ya existe en el storage (sin variantes).
+        """
+        if nombre in self.imagenes:
+            return self.imagenes[nombre]
+        if default_storage.exists(nombre):
+            return {"imagen": nombre, "ancho": None, "alto": None, "derivados": "[]"}
+        self.errores.append(f"fila {numero}: imagen {nombre} no encontrada")
+        return None
+
+    # -----------------------------------------------------------------------
+    # Base de datos
+    # -----------------------------------------------------------------------
+
+    def _guardar(self, filas):
+        ids = [datos["id"] for _, datos in filas if datos["id"]]
+        existentes = Producto.objects.prefetch_related("imagenes").in_bulk(ids)
+        ahora = timezone.now()
+
+        nuevos, modificados = [], []
+        ids_lote = set()
+        galerias = []  # (producto, número de fila, nombres de imágenes adicionales)
+        for numero, datos in filas:
+            if datos["id"]:
+                # Dos filas nuevas con el mismo id chocarían en el bulk_create
+                if datos["id"] in ids_lote:
+                    self.errores.append(f"fila {numero}: id {datos['id']} repetido en el lote")
+                    continue
+                ids_lote.add(datos["id"])
+            producto = existentes.get(datos["id"])
+            if producto is None:
+                # Id del archivo que no existe: se crea con ese id
+                producto = Producto(id=datos["id"])
+                nuevos.append(producto)
+            else:
+                producto.fecha_actualizacion = ahora
+                modificados.append(producto)
+
+            for campo in CAMPOS_PRODUCTO:
+                setattr(producto, campo, datos[campo])
+
+            actual = producto.imagen.name if producto.imagen else ""
+            if datos["imagen"] and datos["imagen"] != actual:
+                campos = self._imagen(datos["imagen"], numero)
+                if campos:
+                    producto.imagen = campos["imagen"]
+                    producto.imagen_ancho = campos["ancho"]
+                    producto.imagen_alto = campos["alto"]
+                    producto.imagen_derivados = campos["derivados"]
+
+            adicionales = datos["imagenes_adicionales"]
+            if adicionales and (
+                producto.pk is None
+                or adicionales != [img.imagen.name for img in producto.imagenes.all()]
+            ):
+                galerias.append((producto, numero, adicionales))
+
+        with transaction.atomic():
+            Producto.objects.bulk_create(nuevos)
+            if modificados:
+                self._actualizar(modificados)
+
+            if galerias:
+                # Galerías reemplazadas: se borran las filas anteriores de esos productos
+                ids_modificados = {p.pk for p in modificados}
+                ProductoImagen.objects.filter(
+                    producto_id__in=[p.pk for p, _, _ in galerias if p.pk in ids_modificados]
+                ).delete()
+                imagenes = []
+                for producto, numero, nombres in galerias:
+                    for orden, nombre in enumerate(nombres):
+                        campos = self._imagen(nombre, numero)
+                        if campos:
+                            imagenes.append(ProductoImagen(
+                                producto_id=producto.pk,
+                                imagen=campos["imagen"],
+                                ancho=campos["ancho"],
+                                alto=campos["alto"],
+                                derivados=campos["derivados"],
+                                alt=producto.titulo,
+                                orden=orden,
+                            ))
+                ProductoImagen.objects.bulk_create(imagenes)
+
+        return len(nuevos), len(modificados)
+
+    @staticmethod
+    def _actualizar(productos):
+        """
+        UPDATE por fila con executemany: bulk_update arma un CASE WHEN por campo
+        y por fila, que con lotes grandes tarda decenas de veces más en compilarse
+        que en ejecutarse. precio_final se calcula acá como en Producto.save().
+        """
+        campos = [
+            Producto._meta.get_field(nombre)
+            for nombre in CAMPOS_PRODUCTO + CAMPOS_IMAGEN + ["precio_final", "fecha_actualizacion"]
+        ]
+        qn = connection.ops.quote_name
+        sql = (
+            f"UPDATE {qn(Producto._meta.db_table)} SET "
+            + ", ".join(f"{qn(campo.column)} = %s" for campo in campos)
+            + f" WHERE {qn(Producto._meta.pk.column)} = %s"
+        )
+        parametros = []
+        for producto in productos:
+            producto.precio_final = producto.precio_con_descuento()
+            parametros.append(
+                [campo.get_db_prep_save(getattr(producto, campo.attname), connection) for campo in campos]
+                + [producto.pk]
+            )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, parametros)
@@ -0,0 +1,197 @@
+import json
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from core.almacenamiento import LARGO_HASH, almacenamiento_imagenes
+from core.cache_catalogo import invalidar_catalogo
+from core.catalogo import regenerar_snapshot
+from core.models import Producto, ProductoImagen
+
+# Carpeta de MEDIA_ROOT que se recorre (originales, adicionales y derivados)
+CARPETA_IMAGENES = "productos"
+
+# Oculta: core/medios.py no sirve rutas con componentes que empiezan con "."
+CARPETA_CUARENTENA = ".cuarentena"
+
+
+def _tamano_legible(bytes_):
+    for unidad in ("B", "KB", "MB", "GB"):
+        if bytes_ < 1024 or unidad == "GB":
+            return f"{bytes_:.1f} {unidad}" if unidad != "B" else f"{bytes_} B"
+        bytes_ /= 1024
+
+
+def _derivados(texto):
+    try:
+        return [v["url"] for v in json.loads(texto or "[]") if v.get("url")]
+    except (ValueError, TypeError, AttributeError):
+        return []
+
+
+def referencias():
+    """Marca: conjunto de rutas del storage usadas por algún producto o imagen adicional"""
+    usadas = set()
+    for imagen, derivados in Producto.objects.values_list("imagen", "imagen_derivados").iterator(chunk_size=2000):
+        if imagen:
+            usadas.add(imagen)
+        usadas.update(_derivados(derivados))
+    for imagen, derivados in ProductoImagen.objects.values_list("imagen", "derivados").iterator(chunk_size=2000):
+        if imagen:
+            usadas.add(imagen)
+        usadas.update(_derivados(derivados))
+    return usadas
+
+
+def archivos(raiz, carpeta):
+    """Genera (ruta relativa con "/", ruta absoluta, os.stat) de los archivos de la carpeta"""
+    for directorio, subdirectorios, nombres in os.walk(os.path.join(raiz, carpeta)):
+        subdirectorios[:] = [d for d in subdirectorios if not d.startswith(".")]
+        for nombre in nombres:
+            if nombre.startswith("."):
+                continue
+            absoluta = os.path.join(directorio, nombre)
+            relativa = os.path.relpath(absoluta, raiz).replace(os.sep, "/")
+            yield relativa, absoluta, os.stat(absoluta)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recolecta las imágenes huérfanas de media/productos/ (marca y barrido): "
+        "los archivos que ningún producto ni imagen adicional referencia se mueven "
+        "a media/.cuarentena/ (o se eliminan con --eliminar) y se informa el espacio liberado"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--gracia",
+            type=int,
+            default=60,
+            help="Minutos: no se tocan archivos más nuevos (subidas en curso, imports a medio guardar)",
+        )
+        parser.add_argument(
+            "--eliminar",
+            action="store_true",
+            help="Elimina los huérfanos en lugar de moverlos a cuarentena",
+        )
+        parser.add_argument(
+            "--simular",
+            action="store_true",
+            help="Solo informa qué se liberaría, sin mover ni eliminar nada",
+        )
+        parser.add_argument(
+            "--deduplicar",
+            action="store_true",
+            help="Antes de barrer, renombra por contenido las imágenes con nombre antiguo "
+                 "y apunta las filas duplicadas a un único archivo",
+        )
+        parser.add_argument(
+            "--vaciar-cuarentena",
+            type=int,
+            metavar="DIAS",
+            help="Elimina las tandas de la cuarentena con más de DIAS días",
+        )
+
+    def handle(self, *args, **options):
+        raiz = settings.MEDIA_ROOT
+        if not os.path.isdir(os.path.join(raiz, CARPETA_IMAGENES)):
+            raise CommandError(f"No existe {os.path.join(raiz, CARPETA_IMAGENES)}")
+        simular = options["simular"]
+
+        if options["deduplicar"]:
+            self._deduplicar(simular)
+
+        usadas = referencias()
+        limite = time.time() - options["gracia"] * 60
+        destino = os.path.join(raiz, CARPETA_CUARENTENA, timezone.now().strftime("%Y%m%d-%H%M%S"))
+
+        huerfanos = liberados = recientes = 0
+        for relativa, absoluta, estado in archivos(raiz, CARPETA_IMAGENES):
+            if relativa in usadas:
+                continue
+            if estado.st_mtime > limite:
+                recientes += 1
+                continue
+            huerfanos += 1
+            liberados += estado.st_size
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {relativa} ({_tamano_legible(estado.st_size)})")
+            if simular:
+                continue
+            if options["eliminar"]:
+                os.remove(absoluta)
+            else:
+                nueva = os.path.join(destino, *relativa.split("/"))
+                os.makedirs(os.path.dirname(nueva), exist_ok=True)
+                os.replace(absoluta, nueva)
+
+        accion = "se liberarían" if simular else ("eliminados" if options["eliminar"] else "en cuarentena")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(usadas)} archivos referenciados, {huerfanos} huérfanos {accion}: "
+            f"{_tamano_legible(liberados)}"
+            + (f" ({recientes} huérfanos dentro del período de gracia)" if recientes else "")
+        ))
+        if huerfanos and not simular and not options["eliminar"]:
+            self.stdout.write(f"Cuarentena: {destino}")
+
+        if options["vaciar_cuarentena"] is not None:
+            self._vaciar_cuarentena(raiz, options["vaciar_cuarentena"], simular)
+
+    def _deduplicar(self, simular):
+        """
+        Pasa los originales con nombre antiguo (manzana.jpg, manzana_ZKRES4X.jpg)
+        a su nombre por contenido: las copias de la misma foto quedan apuntando
+        a un solo archivo y los nombres viejos pasan a ser huérfanos.
+        """
+        nombres = set(Producto.objects.exclude(imagen="").exclude(imagen__isnull=True).values_list("imagen", flat=True))
+        nombres.update(ProductoImagen.objects.values_list("imagen", flat=True))
+
+        cambios = {}
+        for nombre in sorted(nombres):
+            base = os.path.splitext(os.path.basename(nombre))[0]
+            if len(base) == LARGO_HASH or not almacenamiento_imagenes.exists(nombre):
+                continue
+            with almacenamiento_imagenes.open(nombre) as archivo:
+                if simular:
+                    nuevo = almacenamiento_imagenes.nombre_por_contenido(nombre, archivo)
+                else:
+                    nuevo = almacenamiento_imagenes.save(nombre, archivo)
+            cambios[nombre] = nuevo
+
+        distintos = len(set(cambios.values()))
+        self.stdout.write(f"Deduplicación: {len(cambios)} imágenes renombradas en {distintos} archivos")
+        if simular or not cambios:
+            return
+
+        with transaction.atomic():
+            for viejo, nuevo in cambios.items():
+                Producto.objects.filter(imagen=viejo).update(imagen=nuevo, fecha_actualizacion=Now())
+                ProductoImagen.objects.filter(imagen=viejo).update(imagen=nuevo)
+
+        # update() no dispara señales: caché y snapshot a mano (el índice no guarda imágenes)
+        invalidar_catalogo()
+        if settings.CATALOGO_SNAPSHOT_AUTOMATICO:
+            regenerar_snapshot()
+
+    def _vaciar_cuarentena(self, raiz, dias, simular):
+        carpeta = os.path.join(raiz, CARPETA_CUARENTENA)
+        if not os.path.isdir(carpeta):
+            return
+        limite = time.time() - dias * 86400
+        tandas = liberados = 0
+        for tanda in os.scandir(carpeta):
+            if not tanda.is_dir() or tanda.stat().st_mtime > limite:
+                continue
+            tandas += 1
+            liberados += sum(estado.st_size for _, _, estado in archivos(carpeta, tanda.name))
+            if not simular:
+                shutil.rmtree(tanda.path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cuarentena: {tandas} tandas con más de {dias} días, {_tamano_legible(liberados)} liberados"
+        ))
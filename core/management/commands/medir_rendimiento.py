@@ -0,0 +1,133 @@
+import random
+import re
+import statistics
+import time
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.cache_catalogo import invalidar_catalogo
+from core.models import Producto
+from core.paginacion import SIGUIENTE, decodificar_cursor
+
+BUSQUEDAS = ["manzana", "tomate org", "platano", "canasta premium", "miel"]
+
+PATRON_CURSOR = re.compile(r'[?&]cursor=([^"&]+)')
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide home (filtros y páginas profundas), la búsqueda del admin y /api/producto/<id>/: "
+        "percentiles de latencia, consultas SQL y bytes generados"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=20, help="Requests por escenario")
+        parser.add_argument("--semilla", type=int, default=26, help="Semilla para elegir productos")
+        parser.add_argument(
+            "--con-cache",
+            action="store_true",
+            help="Deja activa la caché de páginas (por defecto se mide el render completo)",
+        )
+
+    def handle(self, *args, **options):
+        total = Producto.objects.count()
+        if not total:
+            raise CommandError("No hay productos: cargar un catálogo con manage.py sembrar_catalogo")
+
+        azar = random.Random(options["semilla"])
+        ids = list(Producto.objects.values_list("id", flat=True).order_by("?")[:500])
+
+        # El test client usa "testserver" como host: usar uno de ALLOWED_HOSTS
+        host = next(
+            (h for h in settings.ALLOWED_HOSTS if h != "*" and not h.startswith(".")),
+            "localhost",
+        )
+        cliente = Client(HTTP_HOST=host)
+        admin = Client(HTTP_HOST=host)
+        sesion = admin.session
+        sesion["admin_logged_in"] = True
+        sesion["admin_username"] = "benchmark"
+        sesion.save()
+
+        ultima_pagina = max(1, (total + 19) // 20)
+        escenarios = [
+            ("home", cliente, lambda: "/"),
+            ("home categoría", cliente, lambda: f"/?categoria={azar.choice(['frutas', 'verduras', 'canastas'])}"),
+            ("home orden precio", cliente, lambda: "/?orden=precio"),
+            ("home búsqueda", cliente, lambda: f"/?q={azar.choice(BUSQUEDAS)}"),
+            ("home página media", cliente, lambda: f"/?page={max(1, ultima_pagina // 2)}"),
+            ("home última página", cliente, lambda: f"/?page={ultima_pagina}"),
+            ("home cursor profundo", cliente, self._cursor_profundo(cliente, paginas=25)),
+            ("admin búsqueda", admin, lambda: f"/admin/productos/?q={azar.choice(BUSQUEDAS)}"),
+            ("api_producto", cliente, lambda: f"/api/producto/{azar.choice(ids)}/"),
+        ]
+
+        segundos_cache = None if options["con_cache"] else 0
+        self.stdout.write(
+            f"{total} productos, {options['repeticiones']} requests por escenario, "
+            f"caché de páginas {'activada' if options['con_cache'] else 'desactivada'}"
+        )
+        self.stdout.write(
+            f"{'escenario':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+            f"{'consultas':>11}{'KB':>9}"
+        )
+
+        ajustes = {} if segundos_cache is None else {"CACHE_HOME_SEGUNDOS": segundos_cache}
+        with override_settings(**ajustes):
+            if not options["con_cache"]:
+                invalidar_catalogo()
+            for nombre, cliente_escenario, armar_url in escenarios:
+                self._medir(nombre, cliente_escenario, armar_url, options["repeticiones"])
+
+    def _cursor_profundo(self, cliente, paginas):
+        """URL de la página N siguiendo cursores desde la primera (sin OFFSET)"""
+        url = "/"
+        with override_settings(CACHE_HOME_SEGUNDOS=0):
+            for _ in range(paginas):
+                html = cliente.get(url).content.decode()
+                siguiente = next(
+                    (c for c in PATRON_CURSOR.findall(html)
+                     if (datos := decodificar_cursor(unquote(c))) and datos[2] == SIGUIENTE),
+                    None,
+                )
+                if siguiente is None:
+                    break
+                url = f"/?cursor={siguiente}"
+        return lambda: url
+
+    def _medir(self, nombre, cliente, armar_url, repeticiones):
+        duraciones = []
+        consultas = []
+        tamanos = []
+
+        for _ in range(repeticiones):
+            url = armar_url()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                respuesta = cliente.get(url)
+                duraciones.append((time.perf_counter() - inicio) * 1000)
+            if respuesta.status_code != 200:
+                raise CommandError(f"{url} respondió {respuesta.status_code}")
+            consultas.append(len(capturadas.captured_queries))
+            tamanos.append(len(respuesta.content))
+
+        duraciones.sort()
+        self.stdout.write(
+            f"{nombre:<22}"
+            f"{self._percentil(duraciones, 50):>9.1f}"
+            f"{self._percentil(duraciones, 95):>9.1f}"
+            f"{self._percentil(duraciones, 99):>9.1f}"
+            f"{duraciones[-1]:>9.1f}"
+            f"{statistics.median(consultas):>6.0f}/{max(consultas):<4}"
+            f"{statistics.mean(tamanos) / 1024:>9.1f}"
+        )
+
+    @staticmethod
+    def _percentil(valores_ordenados, p):
+        indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados)) - 1))
+        return valores_ordenados[indice]
@@ -0,0 +1,136 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.cache_catalogo import cache_en_memoria
+from core.sesiones import purgar_si_corresponde
+from core.tareas import ejecutar_tarea, purgar_completadas, recuperar_abandonadas, tomar_tareas
+
+# Cada cuánto se buscan tareas abandonadas y se purgan las viejas y las sesiones vencidas (segundos)
+INTERVALO_MANTENIMIENTO = 300
+
+
+def _ejecutar(tarea_id):
+    """En cada hilo o proceso del pool, como en un request: conexión sana antes y después"""
+    close_old_connections()
+    try:
+        return ejecutar_tarea(tarea_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de tareas (core/tareas.py): toma las tareas pendientes de la "
+        "base y las ejecuta en un pool de hilos o de procesos. Ver docs/tareas.md"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hilos",
+            type=int,
+            default=None,
+            help="Tareas en paralelo en hilos (por defecto TAREAS_HILOS)",
+        )
+        parser.add_argument(
+            "--procesos",
+            type=int,
+            default=0,
+            help="Usar un pool de procesos en lugar de hilos (tareas de CPU: derivados de imágenes)",
+        )
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre consultas con la cola vacía")
+        parser.add_argument(
+            "--una-vez",
+            action="store_true",
+            help="Procesa las tareas disponibles y termina (cron, pruebas)",
+        )
+
+    def handle(self, *args, **options):
+        # Las tareas invalidan la caché del catálogo: con LocMemCache eso solo pasaría
+        # en la memoria del worker y los procesos web seguirían sirviendo las páginas viejas
+        if cache_en_memoria():
+            raise CommandError(
+                "El worker necesita una caché compartida con los procesos web: configurar CACHE_BACKEND "
+                "(p. ej. django.core.cache.backends.filebased.FileBasedCache) o usar TAREAS_INMEDIATAS=True"
+            )
+
+        nombre = f"{socket.gethostname()}:{os.getpid()}"
+        if options["procesos"]:
+            paralelo = options["procesos"]
+            # spawn: cada proceso arranca Django de cero, sin heredar las conexiones abiertas
+            pool = ProcessPoolExecutor(
+                max_workers=paralelo,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+            tipo = "procesos"
+        else:
+            paralelo = max(1, options["hilos"] or settings.TAREAS_HILOS)
+            pool = ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix="tarea")
+            tipo = "hilos"
+
+        self.detener = False
+        if not options["una_vez"]:
+            signal.signal(signal.SIGTERM, self._detener)
+            signal.signal(signal.SIGINT, self._detener)
+        self.stdout.write(f"Worker {nombre}: {paralelo} {tipo}")
+
+        en_curso = set()
+        completadas = fallidas = 0
+        ultimo_mantenimiento = 0
+        try:
+            while not self.detener:
+                close_old_connections()
+                if time.monotonic() - ultimo_mantenimiento > INTERVALO_MANTENIMIENTO:
+                    recuperadas = recuperar_abandonadas()
+                    if recuperadas:
+                        self.stdout.write(self.style.WARNING(f"{recuperadas} tareas abandonadas vuelven a la cola"))
+                    purgar_completadas()
+                    # Limitado por SESSION_PURGA_SEGUNDOS (varios workers: purga uno solo)
+                    purgar_si_corresponde()
+                    ultimo_mantenimiento = time.monotonic()
+
+                libres = paralelo - len(en_curso)
+                tareas = tomar_tareas(nombre, libres) if libres > 0 else []
+                for tarea in tareas:
+                    en_curso.add(pool.submit(_ejecutar, tarea.id))
+
+                if not en_curso:
+                    if options["una_vez"]:
+                        break
+                    time.sleep(options["intervalo"])
+                    continue
+
+                # Con el pool lleno se espera a que se libere un lugar; si no, se vuelve a mirar la cola
+                listas, en_curso = wait(
+                    en_curso,
+                    timeout=None if len(en_curso) >= paralelo else options["intervalo"],
+                    return_when=FIRST_COMPLETED,
+                )
+                for futuro in listas:
+                    try:
+                        if futuro.result():
+                            completadas += 1
+                        else:
+                            fallidas += 1
+                    except Exception as e:
+                        # El proceso murió: la tarea queda en curso y se recupera por tiempo
+                        fallidas += 1
+                        print(f"Error en el worker de tareas: {e}")
+        finally:
+            pool.shutdown(wait=True)
+            close_old_connections()
+
+        self.stdout.write(self.style.SUCCESS(f"Tareas completadas: {completadas}, con error: {fallidas}"))
+
+    def _detener(self, signum, frame):
+        self.stdout.write("Terminando las tareas en curso...")
+        self.detener = True
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.busqueda import fts_disponible, reindexar_todo
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de texto completo (FTS5) de productos"
+
+    def handle(self, *args, **options):
+        if not fts_disponible():
+            self.stdout.write(self.style.WARNING(
+                "El índice FTS5 no está disponible (base no SQLite o migración pendiente); "
+                "la búsqueda usa el filtro de respaldo"
+            ))
+            return
+
+        total = reindexar_todo()
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruido: {total} productos"))
@@ -0,0 +1,163 @@
+import json
+import random
+import time
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from PIL import Image, ImageDraw
+
+from core.busqueda import reindexar_todo
+from core.cache_catalogo import invalidar_catalogo
+from core.imagenes import generar_derivados
+from core.models import Producto, ProductoImagen
+
+CARPETA_SINTETICOS = "productos/sinteticos/"
+
+NOMBRES = [
+    "Manzana", "Plátano", "Naranja", "Pera", "Frutilla", "Palta", "Limón", "Uva",
+    "Tomate", "Lechuga", "Zanahoria", "Papa", "Cebolla", "Zapallo", "Brócoli", "Pimentón",
+    "Canasta", "Combo", "Miel", "Huevos",
+]
+VARIEDADES = [
+    "roja", "verde", "orgánica", "hass", "de temporada", "premium", "nacional",
+    "cherry", "morada", "amarilla", "hidropónica", "de campo",
+]
+COLORES = [
+    (220, 53, 69), (255, 193, 7), (40, 167, 69), (253, 126, 20),
+    (111, 66, 193), (23, 162, 184), (232, 62, 140), (108, 117, 125),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga un catálogo sintético de productos (con imágenes generadas e imágenes "
+        "adicionales) para pruebas de rendimiento"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cantidad", type=int, default=1000, help="Productos a crear (1.000 a 500.000)")
+        parser.add_argument("--imagenes", type=int, default=8, help="Imágenes distintas generadas y reutilizadas")
+        parser.add_argument("--max-adicionales", type=int, default=4, help="Máximo de imágenes adicionales por producto")
+        parser.add_argument("--lote", type=int, default=2000, help="Filas por bulk_create")
+        parser.add_argument("--semilla", type=int, default=26, help="Semilla aleatoria (resultados reproducibles)")
+        parser.add_argument(
+            "--limpiar",
+            action="store_true",
+            help="Elimina antes los productos sintéticos cargados previamente",
+        )
+
+    def handle(self, *args, **options):
+        cantidad = options["cantidad"]
+        if not 1 <= cantidad <= 500_000:
+            raise CommandError("--cantidad debe estar entre 1 y 500000")
+
+        azar = random.Random(options["semilla"])
+        inicio = time.perf_counter()
+
+        if options["limpiar"]:
+            eliminados = self._limpiar()
+            self.stdout.write(f"Eliminados {eliminados} productos sintéticos anteriores")
+
+        imagenes = self._generar_imagenes(max(1, options["imagenes"]))
+        self.stdout.write(f"{len(imagenes)} imágenes base generadas en {CARPETA_SINTETICOS}")
+
+        categorias = [clave for clave, _ in Producto.CATEGORIAS]
+        unidades = [clave for clave, _ in Producto.UNIDADES]
+        lote = options["lote"]
+        creados = 0
+
+        while creados < cantidad:
+            n = min(lote, cantidad - creados)
+            productos = []
+            for i in range(n):
+                nombre = azar.choice(NOMBRES)
+                imagen = azar.choice(imagenes)
+                descuento = azar.random() < 0.15
+                productos.append(Producto(
+                    titulo=f"{nombre} {azar.choice(VARIEDADES)} {creados + i + 1}",
+                    descripcion=f"{nombre} {azar.choice(VARIEDADES)} seleccionada, directo del productor. " * azar.randint(1, 4),
+                    precio=round(azar.uniform(500, 25000), 0),
+                    unidad=azar.choice(unidades),
+                    categoria=azar.choice(categorias),
+                    imagen=imagen["nombre"],
+                    imagen_ancho=imagen["ancho"],
+                    imagen_alto=imagen["alto"],
+                    imagen_derivados=imagen["derivados"],
+                    descuento_activo=descuento,
+                    porcentaje_descuento=azar.choice((10, 15, 20, 30)) if descuento else 0,
+                    fraccionado=azar.random() < 0.3,
+                ))
+
+            with transaction.atomic():
+                productos = Producto.objects.bulk_create(productos)
+                adicionales = []
+                for producto in productos:
+                    for orden in range(azar.randint(0, options["max_adicionales"])):
+                        imagen = azar.choice(imagenes)
+                        adicionales.append(ProductoImagen(
+                            producto_id=producto.pk,
+                            imagen=imagen["nombre"],
+                            ancho=imagen["ancho"],
+                            alto=imagen["alto"],
+                            derivados=imagen["derivados"],
+                            alt=producto.titulo,
+                            orden=orden,
+                        ))
+                ProductoImagen.objects.bulk_create(adicionales, batch_size=lote)
+
+            creados += n
+            self.stdout.write(f"  {creados}/{cantidad} productos")
+
+        # bulk_create no dispara señales: índice de búsqueda y caché a mano
+        indexados = reindexar_todo()
+        invalidar_catalogo()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Catálogo sintético: {creados} productos nuevos, {indexados} indexados "
+            f"en {time.perf_counter() - inicio:.1f}s"
+        ))
+
+    def _generar_imagenes(self, cantidad):
+        """Crea imágenes de colores con sus derivados; los productos las reutilizan"""
+        imagenes = []
+        for i in range(cantidad):
+            color = COLORES[i % len(COLORES)]
+            img = Image.new("RGB", (1200, 900), color)
+            dibujo = ImageDraw.Draw(img)
+            dibujo.ellipse((300, 150, 900, 750), fill=tuple(255 - c for c in color))
+
+            buffer = BytesIO()
+            img.save(buffer, format="JPEG", quality=80)
+            nombre = f"{CARPETA_SINTETICOS}sintetico_{i}.jpg"
+            if default_storage.exists(nombre):
+                default_storage.delete(nombre)
+            nombre = default_storage.save(nombre, ContentFile(buffer.getvalue()))
+
+            resultado = generar_derivados(nombre)
+            imagenes.append({
+                "nombre": nombre,
+                "ancho": resultado["ancho"],
+                "alto": resultado["alto"],
+                "derivados": json.dumps(resultado["variantes"]),
+            })
+        return imagenes
+
+    def _limpiar(self):
+        """
+        Borra los productos con imágenes sintéticas con SQL directo: con delete()
+        se dispararían las señales (FTS, marcas de eliminación, snapshot) por cada fila.
+        """
+        tabla_productos = Producto._meta.db_table
+        tabla_imagenes = ProductoImagen._meta.db_table
+        patron = CARPETA_SINTETICOS + "%"
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {tabla_imagenes} WHERE producto_id IN "
+                f"(SELECT id FROM {tabla_productos} WHERE imagen LIKE %s)",
+                [patron],
+            )
+            cursor.execute(f"DELETE FROM {tabla_productos} WHERE imagen LIKE %s", [patron])
+            return cursor.rowcount
@@ -0,0 +1,177 @@
+"""
+Entrega de archivos subidos (MEDIA_ROOT) para Natural Home.
+Django decide si el archivo se puede servir y con qué cabeceras de caché;
+la transferencia de bytes depende de MEDIA_SERVIDOR:
+  - "django":      FileResponse con soporte de Range, If-None-Match e
+                   If-Modified-Since (el servidor WSGI usa sendfile si puede),
+  - "x-accel":     cabecera X-Accel-Redirect para que la envíe nginx,
+  - "x-sendfile":  cabecera X-Sendfile (Apache mod_xsendfile, lighttpd),
+  - "proxy":       el proxy sirve MEDIA_ROOT directamente y esta vista no se enruta.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Solo estas carpetas de MEDIA_ROOT son públicas
+CARPETAS_PUBLICAS = ("productos/", "catalogo/")
+
+# Archivos cuyo nombre incluye un hash del contenido: nunca cambian
+_PATRONES_INMUTABLES = (
+    re.compile(r"^productos/(adicionales/)?[0-9a-f]{32}\.\w+$"),
+    re.compile(r"^productos/derivados/.+_\d+w\.[0-9a-f]{10}\.\w+$"),
+    re.compile(r"^catalogo/catalog\.[0-9a-f]{16}\.json$"),
+)
+
+_PATRON_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+class TramoArchivo:
+    """
+    Archivo limitado a `largo` bytes desde la posición actual, para responder
+    un Range. Expone fileno(): los servidores con sendfile (gunicorn) envían
+    desde el offset actual hasta Content-Length sin copiar a Python.
+    """
+
+    def __init__(self, archivo, largo):
+        self.archivo = archivo
+        self.restante = largo
+
+    def read(self, cantidad=-1):
+        if self.restante <= 0:
+            return b""
+        if cantidad < 0 or cantidad > self.restante:
+            cantidad = self.restante
+        datos = self.archivo.read(cantidad)
+        self.restante -= len(datos)
+        return datos
+
+    def fileno(self):
+        return self.archivo.fileno()
+
+    def close(self):
+        self.archivo.close()
+
+
+def ruta_publica(path):
+    """
+    Normaliza la ruta pedida y devuelve (relativa, absoluta), o None si no se
+    puede servir: fuera de las carpetas públicas, con componentes ocultos
+    (.cuarentena/, .htaccess...) o inexistente.
+    """
+    relativa = posixpath.normpath(path).lstrip("/")
+    if relativa.startswith("..") or not relativa.startswith(CARPETAS_PUBLICAS):
+        return None
+    if any(parte.startswith(".") for parte in relativa.split("/")):
+        return None
+    absoluta = os.path.join(settings.MEDIA_ROOT, *relativa.split("/"))
+    if not os.path.isfile(absoluta):
+        return None
+    return relativa, absoluta
+
+
+def es_inmutable(relativa):
+    return any(patron.match(relativa) for patron in _PATRONES_INMUTABLES)
+
+
+def _aplicar_cache(response, relativa):
+    if es_inmutable(relativa):
+        patch_cache_control(response, public=True, max_age=31536000, immutable=True)
+    else:
+        # Archivos con nombre libre: se pueden reemplazar, así que revalidan
+        patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_SEGUNDOS)
+
+
+def _rango(request, tamano, etag, modificado):
+    """
+    Interpreta la cabecera Range (un solo rango de bytes).
+    Devuelve None para responder el archivo completo, (inicio, fin) inclusive,
+    o False si el rango no es satisfacible (416).
+    """
+    cabecera = request.headers.get("Range", "")
+    coincidencia = _PATRON_RANGE.match(cabecera.strip())
+    if not coincidencia or not any(coincidencia.groups()):
+        # Sin Range, varios rangos o unidad desconocida: archivo completo
+        return None
+
+    # If-Range: solo se aplica el rango si la versión del cliente es la actual
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != modificado:
+        return None
+
+    inicio, fin = coincidencia.groups()
+    if not inicio:
+        # bytes=-N: los últimos N bytes
+        sufijo = int(fin)
+        if sufijo == 0:
+            return False
+        return max(0, tamano - sufijo), tamano - 1
+    inicio = int(inicio)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or fin < inicio:
+        return False
+    return inicio, fin
+
+
+@require_safe
+def servir_medio(request, path):
+    """Sirve un archivo de MEDIA_ROOT según MEDIA_SERVIDOR"""
+    encontrado = ruta_publica(path)
+    if encontrado is None:
+        raise Http404("Archivo no encontrado")
+    relativa, absoluta = encontrado
+    tipo = mimetypes.guess_type(absoluta)[0] or "application/octet-stream"
+
+    if settings.MEDIA_SERVIDOR == "x-accel":
+        response = HttpResponse(content_type=tipo)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIJO + quote(relativa)
+        _aplicar_cache(response, relativa)
+        return response
+    if settings.MEDIA_SERVIDOR == "x-sendfile":
+        response = HttpResponse(content_type=tipo)
+        response["X-Sendfile"] = absoluta
+        _aplicar_cache(response, relativa)
+        return response
+
+    estado = os.stat(absoluta)
+    modificado = int(estado.st_mtime)
+    etag = f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+
+    response = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if response is None:
+        rango = _rango(request, estado.st_size, etag, modificado)
+        if rango is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{estado.st_size}"
+            return response
+
+        inicio, fin = rango or (0, estado.st_size - 1)
+        largo = fin - inicio + 1
+        if request.method == "HEAD":
+            response = HttpResponse(content_type=tipo)
+        else:
+            archivo = open(absoluta, "rb")
+            if rango:
+                archivo.seek(inicio)
+                archivo = TramoArchivo(archivo, largo)
+            response = FileResponse(archivo, content_type=tipo)
+            response.block_size = TAMANO_BLOQUE
+        response["Content-Length"] = largo
+        if rango:
+            response.status_code = 206
+            response["Content-Range"] = f"bytes {inicio}-{fin}/{estado.st_size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(modificado)
+    _aplicar_cache(response, relativa)
+    return response
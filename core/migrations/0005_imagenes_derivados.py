@@ -0,0 +1,106 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+def campos_previos():
+    """
+    descripcion, fraccionado e imagenes_adicionales ya estaban en el modelo y en
+    las bases existentes (db.sqlite3), pero ninguna migración anterior las crea
+    """
+    return [
+        ('descripcion', models.TextField(blank=True, null=True)),
+        ('fraccionado', models.BooleanField(default=False)),
+        ('imagenes_adicionales', models.TextField(blank=True, default='[]')),
+    ]
+
+
+def agregar_columnas_faltantes(apps, schema_editor):
+    """Agrega solo las columnas que la tabla todavía no tiene (bases nuevas)"""
+    Producto = apps.get_model('core', 'Producto')
+    tabla = Producto._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        existentes = {
+            columna.name for columna in schema_editor.connection.introspection.get_table_description(cursor, tabla)
+        }
+    for nombre, campo in campos_previos():
+        if nombre not in existentes:
+            campo.set_attributes_from_name(nombre)
+            schema_editor.add_field(Producto, campo)
+
+    # fecha_actualizacion está en el estado desde 0003, pero db.sqlite3 no tiene la
+    # columna: sin ella, cada tabla que SQLite rehace después copiaba el texto
+    # 'fecha_actualizacion' en lugar de una fecha. add_field la completa con la hora actual
+    if 'fecha_actualizacion' not in existentes:
+        schema_editor.add_field(Producto, Producto._meta.get_field('fecha_actualizacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_producto_options_and_more'),
+    ]
+
+    operations = [
+        # En las bases existentes las columnas ya están: solo se agregan al estado
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(model_name='producto', name=nombre, field=campo)
+                for nombre, campo in campos_previos()
+            ],
+            database_operations=[
+                # Al revertir se conservan: volver a aplicar la migración no las duplica
+                migrations.RunPython(agregar_columnas_faltantes, migrations.RunPython.noop),
+            ],
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_alto',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_ancho',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_derivados',
+            field=models.TextField(blank=True, default='[]'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='categoria',
+            field=models.CharField(choices=[('frutas', 'Frutas'), ('verduras', 'Verduras'), ('canastas', 'Canastas'), ('combos', 'Combos'), ('otros', 'Otros')], default='otros', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='descuento_activo',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='imagen',
+            field=models.ImageField(blank=True, height_field='imagen_alto', null=True, upload_to='productos/', width_field='imagen_ancho'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='porcentaje_descuento',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='precio',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='titulo',
+            field=models.CharField(max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='unidad',
+            field=models.CharField(choices=[('kg', 'Kilogramo (kg)'), ('unidad', 'Unidad'), ('paquete', 'Paquete'), ('litro', 'Litro'), ('docena', 'Docena')], default='unidad', max_length=20),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_imagenes_derivados'),
+    ]
+
+    operations = [
+        # Sin width_field/height_field hasta después de migrar los datos
+        # (evita que Django abra cada archivo para leer sus dimensiones)
+        migrations.CreateModel(
+            name='ProductoImagen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('imagen', models.ImageField(upload_to='productos/adicionales/')),
+                ('ancho', models.PositiveIntegerField(blank=True, null=True)),
+                ('alto', models.PositiveIntegerField(blank=True, null=True)),
+                ('derivados', models.TextField(blank=True, default='[]')),
+                ('alt', models.CharField(blank=True, default='', max_length=200)),
+                ('orden', models.PositiveIntegerField(default=0)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='imagenes', to='core.producto')),
+            ],
+            options={
+                'verbose_name': 'Imagen de producto',
+                'verbose_name_plural': 'Imágenes de producto',
+                'ordering': ['orden', 'id'],
+                'indexes': [models.Index(fields=['producto', 'orden'], name='productoimagen_orden_idx')],
+            },
+        ),
+    ]
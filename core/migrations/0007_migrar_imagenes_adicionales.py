@@ -0,0 +1,66 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:30
+
+import json
+
+from django.db import migrations
+
+
+def json_a_tabla(apps, schema_editor):
+    """Copia cada entrada del JSON imagenes_adicionales a una fila de ProductoImagen"""
+    Producto = apps.get_model('core', 'Producto')
+    ProductoImagen = apps.get_model('core', 'ProductoImagen')
+    alias = schema_editor.connection.alias
+
+    nuevas = []
+    filas = Producto.objects.using(alias).exclude(imagenes_adicionales__in=['', '[]']).values_list('id', 'imagenes_adicionales')
+    for producto_id, imagenes_json in filas.iterator():
+        try:
+            imagenes = json.loads(imagenes_json)
+        except ValueError:
+            continue
+
+        for orden, img in enumerate(imagenes):
+            if not isinstance(img, dict) or not img.get('url'):
+                continue
+            nuevas.append(ProductoImagen(
+                producto_id=producto_id,
+                imagen=img['url'],
+                ancho=img.get('ancho'),
+                alto=img.get('alto'),
+                derivados=json.dumps(img.get('derivados', [])),
+                orden=orden,
+            ))
+
+    ProductoImagen.objects.using(alias).bulk_create(nuevas, batch_size=500)
+
+
+def tabla_a_json(apps, schema_editor):
+    """Reconstruye el JSON imagenes_adicionales a partir de ProductoImagen"""
+    Producto = apps.get_model('core', 'Producto')
+    ProductoImagen = apps.get_model('core', 'ProductoImagen')
+    alias = schema_editor.connection.alias
+
+    por_producto = {}
+    for img in ProductoImagen.objects.using(alias).order_by('producto_id', 'orden', 'id').iterator():
+        nombre = img.imagen.name
+        por_producto.setdefault(img.producto_id, []).append({
+            'url': nombre,
+            'filename': nombre.rsplit('/', 1)[-1],
+            'ancho': img.ancho,
+            'alto': img.alto,
+            'derivados': json.loads(img.derivados or '[]'),
+        })
+
+    for producto_id, imagenes in por_producto.items():
+        Producto.objects.using(alias).filter(id=producto_id).update(imagenes_adicionales=json.dumps(imagenes))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_productoimagen'),
+    ]
+
+    operations = [
+        migrations.RunPython(json_a_tabla, tabla_a_json),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_migrar_imagenes_adicionales'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='producto',
+            name='imagenes_adicionales',
+        ),
+        # Las dimensiones se guardan al generar los derivados; width_field/height_field
+        # obligaban a abrir el archivo al cargar cada fila sin dimensiones
+        migrations.AlterField(
+            model_name='producto',
+            name='imagen',
+            field=models.ImageField(blank=True, null=True, upload_to='productos/'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:45
+
+from django.db import migrations, OperationalError
+
+
+def crear_indice(apps, schema_editor):
+    """Crea la tabla FTS5 (solo SQLite) y la llena con los productos existentes"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    from core.busqueda import SQL_CREAR_TABLA, TABLA_FTS
+
+    Producto = apps.get_model('core', 'Producto')
+    categorias = dict(Producto._meta.get_field('categoria').choices)
+
+    try:
+        schema_editor.execute(SQL_CREAR_TABLA)
+    except OperationalError as e:
+        # SQLite compilado sin FTS5: la búsqueda usa el filtro de respaldo
+        print(f"FTS5 no disponible: {e}")
+        return
+
+    filas = Producto.objects.using(schema_editor.connection.alias).values_list('id', 'titulo', 'descripcion', 'categoria')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABLA_FTS} (rowid, titulo, descripcion, categoria) VALUES (%s, %s, %s, %s)",
+            [
+                (pk, titulo, descripcion or '', f"{categoria} {categorias.get(categoria, '')}")
+                for pk, titulo, descripcion, categoria in filas
+            ],
+        )
+
+
+def eliminar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    from core.busqueda import TABLA_FTS
+
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA_FTS}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_remove_producto_imagenes_adicionales'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
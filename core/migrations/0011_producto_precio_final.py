@@ -0,0 +1,52 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:28
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Case, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Cast, Round
+
+
+def calcular_precio_final(apps, schema_editor):
+    """
+    Completa precio_final de los productos existentes con una sola consulta UPDATE.
+    Misma cuenta que expresion_precio_final: en centavos enteros, porque en SQLite
+    los precios enteros son INTEGER y "/ 100" sería una división entera.
+    """
+    Producto = apps.get_model('core', 'Producto')
+    entero = models.IntegerField()
+    centavos = Cast(Round(F('precio') * 100), entero)
+    descontados = ExpressionWrapper((centavos * (100 - F('porcentaje_descuento')) + 50) / 100, output_field=entero)
+    centesimo = Value(Decimal('0.01'), output_field=models.DecimalField(max_digits=3, decimal_places=2))
+    Producto.objects.using(schema_editor.connection.alias).update(precio_final=Case(
+        When(
+            Q(descuento_activo=True, porcentaje_descuento__gt=0),
+            then=Round(descontados * centesimo, 2),
+        ),
+        default=Round(F('precio'), 2),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_producto_eliminado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='precio_final',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+        migrations.RunPython(calcular_precio_final, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['categoria', '-id'], name='producto_categoria_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['descuento_activo', '-id'], name='producto_descuento_idx'),
+        ),
+    ]
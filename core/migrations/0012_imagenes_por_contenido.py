@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-18 17:50
+
+import core.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_producto_precio_final'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='producto',
+            name='imagen',
+            field=models.ImageField(blank=True, null=True, storage=core.almacenamiento.obtener_almacenamiento_imagenes, upload_to='productos/'),
+        ),
+        migrations.AlterField(
+            model_name='productoimagen',
+            name='imagen',
+            field=models.ImageField(storage=core.almacenamiento.obtener_almacenamiento_imagenes, upload_to='productos/adicionales/'),
+        ),
+    ]
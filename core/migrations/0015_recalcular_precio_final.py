@@ -0,0 +1,18 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# La cuenta de 0011 hacía división entera en SQLite con precios enteros:
+# se vuelve a calcular precio_final en las bases que ya la aplicaron
+calcular_precio_final = import_module('core.migrations.0011_producto_precio_final').calcular_precio_final
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_tareas'),
+    ]
+
+    operations = [
+        migrations.RunPython(calcular_precio_final, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def completar_fechas(apps, schema_editor):
+    """
+    Pone la hora actual en los productos sin fecha_actualizacion válida: NULL, o
+    el texto 'fecha_actualizacion' que dejó en db.sqlite3 la columna faltante
+    (ver 0005). El ORM lee ese texto como None, así que no servía para los ETag
+    ni para /api/productos/cambios/.
+    """
+    Producto = apps.get_model('core', 'Producto')
+    conexion = schema_editor.connection
+    ahora = timezone.now()
+
+    Producto.objects.using(conexion.alias).filter(fecha_actualizacion__isnull=True).update(fecha_actualizacion=ahora)
+    if conexion.vendor == 'sqlite':
+        # En SQLite la columna puede guardar cualquier texto: datetime() da NULL si no es una fecha
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Producto._meta.db_table} SET fecha_actualizacion = %s "
+                "WHERE datetime(fecha_actualizacion) IS NULL",
+                [conexion.ops.adapt_datetimefield_value(ahora)],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_recalcular_precio_final'),
+    ]
+
+    operations = [
+        migrations.RunPython(completar_fechas, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,107 @@
+from decimal import Decimal, ROUND_HALF_UP
+
 from django.db import models
+from django.db.models import Case, ExpressionWrapper, F, Q, Value, When
+from django.db.models.functions import Cast, Round
+from django.db.models.lookups import Exact, GreaterThan
+from django.utils import timezone
 import json
-from django.core.files.storage import default_storage
-from django.conf import settings
+
+from .almacenamiento import obtener_almacenamiento_imagenes
+
+# Campos que determinan el precio final
+CAMPOS_PRECIO = {'precio', 'descuento_activo', 'porcentaje_descuento'}
+
+# Columnas que usan las tarjetas del catálogo y la lista del admin
+CAMPOS_TARJETA = (
+    'id', 'titulo', 'precio', 'precio_final', 'unidad', 'categoria',
+    'imagen', 'imagen_ancho', 'imagen_alto', 'imagen_derivados',
+    'descuento_activo', 'porcentaje_descuento', 'fraccionado',
+    # Clave del caché de cada tarjeta (core/templatetags/tarjetas.py)
+    'fecha_actualizacion',
+)
+
+
+def calcular_precio_final(precio, descuento_activo, porcentaje_descuento):
+    """Precio con el descuento aplicado, redondeado a 2 decimales (igual que ROUND en SQL)"""
+    precio = Decimal(str(precio))
+    if descuento_activo and int(porcentaje_descuento or 0) > 0:
+        precio = precio - precio * int(porcentaje_descuento) / 100
+    return precio.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+CENTESIMO = Value(Decimal('0.01'), output_field=models.DecimalField(max_digits=3, decimal_places=2))
+
+
+def _descuento_en_centavos(precio, porcentaje):
+    """
+    precio - precio * porcentaje / 100 redondeado a centavos (mitad hacia arriba)
+    con enteros: en SQLite los precios enteros se guardan como INTEGER y "/ 100"
+    sería una división entera (10.00 al 15% daba 9.00), y con REAL los casos de
+    medio centavo se redondean distinto que en Python.
+    """
+    entero = models.IntegerField()
+    centavos = Cast(Round(precio * 100), entero)
+    descontados = ExpressionWrapper((centavos * (100 - porcentaje) + 50) / 100, output_field=entero)
+    return Round(descontados * CENTESIMO, 2)
+
+
+def expresion_precio_final(precio=None, descuento_activo=None, porcentaje_descuento=None):
+    """
+    Misma cuenta que calcular_precio_final pero en SQL. Los argumentos permiten
+    usar los valores nuevos de un UPDATE (que en SQL ve la fila anterior).
+    """
+    precio = F('precio') if precio is None else _expresion(precio)
+    activo = F('descuento_activo') if descuento_activo is None else _expresion(descuento_activo)
+    porcentaje = F('porcentaje_descuento') if porcentaje_descuento is None else _expresion(porcentaje_descuento)
+    return Case(
+        When(
+            Exact(activo, True) & GreaterThan(porcentaje, 0),
+            then=_descuento_en_centavos(precio, porcentaje),
+        ),
+        default=Round(precio, 2),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2),
+    )
+
+
+def _expresion(valor):
+    return valor if hasattr(valor, 'resolve_expression') else Value(valor)
+
+
+class ProductoQuerySet(models.QuerySet):
+    def con_galeria(self):
+        """Carga las imágenes adicionales de todos los productos en una sola consulta extra"""
+        return self.prefetch_related('imagenes')
+
+    def para_tarjetas(self):
+        """Solo las columnas de las tarjetas, más fecha_actualizacion para la clave de su caché"""
+        return self.only(*CAMPOS_TARJETA)
+
+    def actualizar_precio_final(self):
+        """Recalcula precio_final en SQL para todos los productos del queryset"""
+        return super().update(precio_final=expresion_precio_final())
+
+    def update(self, **kwargs):
+        # Si cambia el precio o el descuento, precio_final se calcula en el mismo UPDATE
+        if CAMPOS_PRECIO & kwargs.keys() and 'precio_final' not in kwargs:
+            kwargs['precio_final'] = expresion_precio_final(
+                kwargs.get('precio'), kwargs.get('descuento_activo'), kwargs.get('porcentaje_descuento')
+            )
+        return super().update(**kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if CAMPOS_PRECIO & set(fields) and 'precio_final' not in fields:
+            for obj in objs:
+                obj.precio_final = obj.precio_con_descuento()
+            fields = list(fields) + ['precio_final']
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.precio_final = obj.precio_con_descuento()
+        return super().bulk_create(objs, *args, **kwargs)
+
 
 class Producto(models.Model):
     UNIDADES = [
@@ -22,15 +122,22 @@ class Producto(models.Model):
 
     titulo = models.CharField(max_length=200)
     precio = models.DecimalField(max_digits=10, decimal_places=2)
+    # Precio con descuento guardado para filtrar/ordenar en SQL (se calcula al guardar)
+    precio_final = models.DecimalField(max_digits=10, decimal_places=2, default=0, db_index=True, editable=False)
     unidad = models.CharField(max_length=20, choices=UNIDADES, default="unidad")
     categoria = models.CharField(max_length=20, choices=CATEGORIAS, default="otros")
     descripcion = models.TextField(blank=True, null=True)
 
-    # Imagen principal
-    imagen = models.ImageField(upload_to="productos/", blank=True, null=True)
+    # Imagen principal. Ancho/alto se completan al generar los derivados
+    # (no se usa width_field: obligaría a abrir el archivo al cargar cada fila sin dimensiones)
+    imagen = models.ImageField(
+        upload_to="productos/", storage=obtener_almacenamiento_imagenes, blank=True, null=True
+    )
+    imagen_ancho = models.PositiveIntegerField(blank=True, null=True)
+    imagen_alto = models.PositiveIntegerField(blank=True, null=True)
 
-    # Campo para almacenar imágenes adicionales como JSON
-    imagenes_adicionales = models.TextField(default='[]', blank=True)
+    # Variantes responsivas de la imagen principal como JSON (ver core/imagenes.py)
+    imagen_derivados = models.TextField(default='[]', blank=True)
 
     # Descuentos
     descuento_activo = models.BooleanField(default=False)
@@ -39,24 +146,43 @@ class Producto(models.Model):
     # Nueva opción: fraccionamiento
     fraccionado = models.BooleanField(default=False)
 
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Última actualización')
+
+    objects = ProductoQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['categoria', '-id'], name='producto_categoria_idx'),
+            models.Index(fields=['descuento_activo', '-id'], name='producto_descuento_idx'),
+        ]
+        verbose_name = 'Producto'
+        verbose_name_plural = 'Productos'
+
+    def save(self, *args, **kwargs):
+        self.precio_final = self.precio_con_descuento()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and CAMPOS_PRECIO & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'precio_final'}
+        super().save(*args, **kwargs)
+
     def get_imagenes_adicionales(self):
-        """Devuelve la lista de imágenes adicionales como diccionarios con URLs completas"""
+        """
+        Devuelve las imágenes adicionales ordenadas. Usa el caché de
+        prefetch_related('imagenes') si la consulta lo cargó.
+        """
+        return self.imagenes.all()
+
+    def get_derivados_imagen(self):
+        """Devuelve la lista de variantes responsivas de la imagen principal"""
         try:
-            imagenes = json.loads(self.imagenes_adicionales)
-            # Añadir URL completa a cada imagen
-            for img in imagenes:
-                if 'url' in img:
-                    try:
-                        img['url_completa'] = default_storage.url(img['url'])
-                    except:
-                        img['url_completa'] = settings.MEDIA_URL + img['url'] if img['url'].startswith('productos/') else img['url']
-            return imagenes
+            return json.loads(self.imagen_derivados)
         except:
             return []
 
-    def set_imagenes_adicionales(self, lista):
-        """Guarda la lista de imágenes adicionales como JSON"""
-        self.imagenes_adicionales = json.dumps(lista)
+    def set_derivados_imagen(self, lista):
+        """Guarda la lista de variantes de la imagen principal como JSON"""
+        self.imagen_derivados = json.dumps(lista)
 
     def get_todas_imagenes(self):
         """Devuelve todas las imágenes del producto (principal + adicionales)"""
@@ -71,22 +197,170 @@ class Producto(models.Model):
             })
         
         # Imágenes adicionales
-        adicionales = self.get_imagenes_adicionales()
-        for img in adicionales:
-            if 'url_completa' in img:
-                imagenes.append({
-                    'url': img['url_completa'],
-                    'tipo': 'adicional',
-                    'nombre': img.get('filename', '')
-                })
+        for img in self.get_imagenes_adicionales():
+            imagenes.append({
+                'url': img.url,
+                'tipo': 'adicional',
+                'nombre': img.alt or img.imagen.name
+            })
         
         return imagenes
 
     def precio_con_descuento(self):
-        if self.descuento_activo and self.porcentaje_descuento > 0:
-            d = (self.precio * self.porcentaje_descuento) / 100
-            return round(self.precio - d, 2)
-        return self.precio
+        return calcular_precio_final(self.precio, self.descuento_activo, self.porcentaje_descuento)
+
+    def __str__(self):
+        return self.titulo
+
+
+class ProductoImagen(models.Model):
+    """Imagen adicional de un producto (galería del modal)"""
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='imagenes')
+    imagen = models.ImageField(upload_to="productos/adicionales/", storage=obtener_almacenamiento_imagenes)
+    ancho = models.PositiveIntegerField(blank=True, null=True)
+    alto = models.PositiveIntegerField(blank=True, null=True)
+
+    # Variantes responsivas como JSON (ver core/imagenes.py)
+    derivados = models.TextField(default='[]', blank=True)
+
+    alt = models.CharField(max_length=200, blank=True, default='')
+    orden = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['orden', 'id']
+        indexes = [
+            models.Index(fields=['producto', 'orden'], name='productoimagen_orden_idx'),
+        ]
+        verbose_name = 'Imagen de producto'
+        verbose_name_plural = 'Imágenes de producto'
+
+    @property
+    def url(self):
+        return self.imagen.url
+
+    def get_derivados(self):
+        """Devuelve la lista de variantes responsivas de la imagen"""
+        try:
+            return json.loads(self.derivados)
+        except:
+            return []
+
+    def set_derivados(self, lista):
+        """Guarda la lista de variantes como JSON"""
+        self.derivados = json.dumps(lista)
+
+    def __str__(self):
+        return f"{self.producto_id} - {self.imagen.name}"
+
+
+class ProductoEliminado(models.Model):
+    """Marca de un producto eliminado, para la sincronización incremental del catálogo"""
+    producto_id = models.BigIntegerField(unique=True)
+    fecha_eliminacion = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Producto eliminado'
+        verbose_name_plural = 'Productos eliminados'
+
+    def __str__(self):
+        return f"{self.producto_id} ({self.fecha_eliminacion})"
+
+
+class Pedido(models.Model):
+    """Pedido enviado desde el carrito, con los precios cotizados por el servidor"""
+
+    METODOS_PAGO = [
+        ("efectivo", "Efectivo"),
+        ("transferencia", "Transferencia Bancaria"),
+    ]
+
+    nombre = models.CharField(max_length=120)
+    telefono = models.CharField(max_length=40)
+    direccion = models.CharField(max_length=300)
+    observaciones = models.TextField(blank=True, default='')
+    metodo_pago = models.CharField(max_length=20, choices=METODOS_PAGO, default="efectivo")
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    fecha_creacion = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Pedido'
+        verbose_name_plural = 'Pedidos'
+
+    def __str__(self):
+        return f"Pedido {self.id} - {self.nombre}"
+
+
+class PedidoItem(models.Model):
+    """
+    Línea de un pedido. Título, unidad y precios se copian del producto al
+    momento del pedido: siguen siendo válidos si el producto cambia o se elimina.
+    """
+    pedido = models.ForeignKey(Pedido, on_delete=models.CASCADE, related_name='items')
+    producto = models.ForeignKey(Producto, on_delete=models.SET_NULL, null=True, related_name='+')
+    titulo = models.CharField(max_length=200)
+    unidad = models.CharField(max_length=20)
+    # Cantidad en gramos si el producto se vende fraccionado por kg; si no, en unidades
+    fraccionado = models.BooleanField(default=False)
+    cantidad = models.PositiveIntegerField()
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Línea de pedido'
+        verbose_name_plural = 'Líneas de pedido'
+
+    def __str__(self):
+        return f"{self.pedido_id} - {self.titulo}"
+
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano (derivados de imágenes, snapshot del catálogo...).
+    Lo ejecuta python manage.py procesar_tareas; ver core/tareas.py.
+    """
+
+    PENDIENTE = "pendiente"
+    EN_CURSO = "en_curso"
+    COMPLETADA = "completada"
+    FALLIDA = "fallida"
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_CURSO, "En curso"),
+        (COMPLETADA, "Completada"),
+        (FALLIDA, "Fallida"),
+    ]
+
+    tipo = models.CharField(max_length=80)
+    parametros = models.JSONField(default=dict, blank=True)
+    # Clave de idempotencia: no puede haber dos tareas pendientes con la misma
+    clave = models.CharField(max_length=200, blank=True, default='')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    max_intentos = models.PositiveIntegerField(default=5)
+    # Las tareas reintentadas esperan hasta esta fecha (backoff)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    trabajador = models.CharField(max_length=100, blank=True, default='')
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Tarea'
+        verbose_name_plural = 'Tareas'
+        indexes = [
+            models.Index(fields=['estado', 'disponible_desde'], name='tarea_cola_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave'],
+                condition=Q(estado='pendiente') & ~Q(clave=''),
+                name='tarea_clave_pendiente_unica',
+            ),
+        ]
 
     def __str__(self):
-        return self.titulo
\ No newline at end of file
+        return f"{self.tipo} #{self.id} ({self.estado})"
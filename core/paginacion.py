@@ -0,0 +1,195 @@
+"""
+Paginación por cursor (keyset) para los listados de Natural Home.
+En lugar de OFFSET, cada página pide "los N productos con id menor que el
+último mostrado" (orden -id), así que las páginas profundas cuestan lo mismo
+que la primera y no se saltean ni repiten productos cuando se agregan nuevos.
+
+Los cursores son opacos (firmados) y llevan el número de página aproximado.
+La navegación por número (?page=N) sigue disponible usando un conteo cacheado,
+de modo que no se ejecuta COUNT(*) en cada request.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from .cache_catalogo import cache_en_memoria
+
+SAL_CURSOR = "core.paginacion.cursor"
+
+SIGUIENTE = "s"
+ANTERIOR = "a"
+
+
+def codificar_cursor(producto_id, numero, direccion):
+    """Cursor opaco: id del borde de la página, número de página y dirección"""
+    return signing.Signer(salt=SAL_CURSOR).sign_object(
+        {"id": producto_id, "n": numero, "d": direccion}, compress=True
+    )
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (id, numero, direccion) o None si el cursor no es válido"""
+    try:
+        datos = signing.Signer(salt=SAL_CURSOR).unsign_object(cursor)
+        return int(datos["id"]), max(int(datos["n"]), 1), datos["d"]
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+
+def _clave_conteo(partes):
+    parametros = "\x1f".join(str(p) for p in partes)
+    return "conteo:" + hashlib.md5(parametros.encode("utf-8")).hexdigest()
+
+
+def contar_aproximado(queryset, *partes):
+    """
+    COUNT(*) cacheado por CONTEO_CACHE_SEGUNDOS según los filtros (partes).
+    Solo se usa para mostrar "Página N de M", así que puede estar un poco desactualizado.
+    """
+    clave = _clave_conteo(partes)
+    conteo = cache.get(clave)
+    if conteo is None:
+        conteo = queryset.count()
+        cache.set(clave, conteo, timeout=settings.CONTEO_CACHE_SEGUNDOS)
+    return conteo
+
+
+async def acontar_aproximado(queryset, *partes):
+    """Versión async de contar_aproximado"""
+    clave = _clave_conteo(partes)
+    conteo = cache.get(clave) if cache_en_memoria() else await cache.aget(clave)
+    if conteo is None:
+        conteo = await queryset.acount()
+        await cache.aset(clave, conteo, timeout=settings.CONTEO_CACHE_SEGUNDOS)
+    return conteo
+
+
+class PaginadorAproximado(Paginator):
+    """Paginator con el total ya conocido (no ejecuta COUNT)"""
+
+    def __init__(self, object_list, per_page, conteo):
+        super().__init__(object_list, per_page)
+        self._conteo = conteo
+
+    @property
+    def count(self):
+        return self._conteo
+
+
+class PaginaCursor:
+    """
+    Página con la misma interfaz que django.core.paginator.Page (number,
+    has_next, start_index...) más los cursores de la página siguiente/anterior.
+    """
+
+    def __init__(self, object_list, number, paginator, hay_siguiente, hay_anterior, keyset=True):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._hay_siguiente = hay_siguiente
+        self._hay_anterior = hay_anterior
+        self.cursor_siguiente = None
+        self.cursor_anterior = None
+        if keyset and object_list:
+            if hay_siguiente:
+                self.cursor_siguiente = codificar_cursor(object_list[-1].pk, number + 1, SIGUIENTE)
+            if hay_anterior:
+                self.cursor_anterior = codificar_cursor(object_list[0].pk, number - 1, ANTERIOR)
+
+    def __repr__(self):
+        return f"<Página {self.number} (cursor)>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._hay_siguiente
+
+    def has_previous(self):
+        return self._hay_anterior
+
+    def has_other_pages(self):
+        return self._hay_siguiente or self._hay_anterior
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1 if self.object_list else 0
+
+
+def _planificar(queryset, por_pagina, cursor, page, paginator, keyset):
+    """
+    Decide qué filas pedir. Devuelve (consulta sin ejecutar, armar), donde
+    armar(filas) construye la PaginaCursor con el resultado de la consulta.
+    """
+    datos_cursor = decodificar_cursor(cursor) if (cursor and keyset) else None
+    if datos_cursor:
+        borde, numero, direccion = datos_cursor
+        if direccion == ANTERIOR:
+            def armar_anterior(filas):
+                hay_anterior = len(filas) > por_pagina
+                # Si no quedan productos antes, esta es la primera página
+                return PaginaCursor(
+                    filas[:por_pagina][::-1], numero if hay_anterior else 1,
+                    paginator, True, hay_anterior, keyset,
+                )
+            return queryset.filter(id__gt=borde).order_by("id")[:por_pagina + 1], armar_anterior
+
+        def armar_siguiente(filas):
+            hay_siguiente = len(filas) > por_pagina
+            return PaginaCursor(filas[:por_pagina], max(numero, 2), paginator, hay_siguiente, True, keyset)
+        return queryset.filter(id__lt=borde).order_by("-id")[:por_pagina + 1], armar_siguiente
+
+    # Por número de página (la primera página no necesita OFFSET)
+    try:
+        numero = max(int(page), 1) if page else 1
+    except (TypeError, ValueError):
+        numero = 1
+    numero = min(numero, paginator.num_pages)
+
+    def armar_numero(filas):
+        hay_siguiente = len(filas) > por_pagina
+        return PaginaCursor(filas[:por_pagina], numero, paginator, hay_siguiente, numero > 1, keyset)
+
+    inicio = (numero - 1) * por_pagina
+    return queryset[inicio:inicio + por_pagina + 1], armar_numero
+
+
+def paginar(queryset, por_pagina, cursor=None, page=None, partes_conteo=(), keyset=True):
+    """
+    Pagina un queryset ordenado por -id.
+    - cursor: continúa desde un cursor (sin OFFSET).
+    - page: salta a una página por número (OFFSET, pero con el conteo cacheado).
+    - keyset=False: el queryset tiene otro orden (p. ej. relevancia de la
+      búsqueda) y solo se usa la navegación por número.
+    """
+    conteo = contar_aproximado(queryset, *partes_conteo)
+    paginator = PaginadorAproximado(queryset, por_pagina, conteo)
+    consulta, armar = _planificar(queryset, por_pagina, cursor, page, paginator, keyset)
+    return armar(list(consulta))
+
+
+async def apaginar(queryset, por_pagina, cursor=None, page=None, partes_conteo=(), keyset=True):
+    """Versión async de paginar (ORM async: acount y async for)"""
+    conteo = await acontar_aproximado(queryset, *partes_conteo)
+    paginator = PaginadorAproximado(queryset, por_pagina, conteo)
+    consulta, armar = _planificar(queryset, por_pagina, cursor, page, paginator, keyset)
+    return armar([p async for p in consulta])
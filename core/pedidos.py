@@ -0,0 +1,190 @@
+"""
+Cotización del carrito y registro de pedidos para Natural Home.
+El carrito vive en localStorage con los precios copiados de la página; acá se
+recalcula entero con los precios actuales (precio_final ya incluye el
+descuento) en una sola consulta, sin importar cuántos productos tenga.
+Cantidades: gramos para los productos fraccionados por kg, unidades para el resto.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Pedido, PedidoItem, Producto
+
+MIN_GRAMOS = 50
+MAX_GRAMOS = 100_000
+MAX_UNIDADES = 999
+
+CENTAVOS = Decimal('0.01')
+
+
+def _en_gramos(producto):
+    return producto.fraccionado and producto.unidad == "kg"
+
+
+def _entero(valor, campo):
+    try:
+        numero = Decimal(str(valor))
+    except Exception:
+        raise ValueError(f"{campo} no válido")
+    if not numero.is_finite():
+        raise ValueError(f"{campo} no válido")
+    return int(numero.to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def _items_solicitados(items):
+    """Valida la lista de items del carrito: [(id, cantidad, en_gramos_según_el_cliente, precio)]"""
+    if not isinstance(items, list) or not items:
+        raise ValueError("El carrito está vacío")
+    if len(items) > settings.MAX_ITEMS_PEDIDO:
+        raise ValueError(f"El carrito no puede tener más de {settings.MAX_ITEMS_PEDIDO} productos")
+
+    solicitados = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError("Item no válido")
+        pk = _entero(item.get("id"), "id")
+        cantidad = _entero(item.get("cantidad"), "cantidad")
+        precio = item.get("precio")
+        solicitados.append((pk, cantidad, bool(item.get("esFraccionado")), precio))
+    return solicitados
+
+
+def _cantidad(producto, cantidad, gramos_cliente):
+    """
+    Cantidad en la unidad que corresponde al producto. Si el producto pasó a
+    venderse (o dejó de venderse) por gramos desde que se agregó al carrito,
+    se convierte. Devuelve (cantidad, ajustada).
+    """
+    gramos = _en_gramos(producto)
+    ajustada = gramos != gramos_cliente
+    if ajustada:
+        cantidad = cantidad * 1000 if gramos else max(1, round(cantidad / 1000))
+    minimo, maximo = (MIN_GRAMOS, MAX_GRAMOS) if gramos else (1, MAX_UNIDADES)
+    if not minimo <= cantidad <= maximo:
+        raise ValueError(f"Cantidad de {producto.titulo} fuera de rango ({minimo} a {maximo})")
+    return cantidad, ajustada
+
+
+def subtotal(precio_unitario, cantidad, gramos):
+    """Precio de una línea: precio por kg × gramos / 1000, o precio × unidades"""
+    importe = precio_unitario * cantidad / 1000 if gramos else precio_unitario * cantidad
+    return importe.quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+def cotizar(items):
+    """
+    Recalcula el carrito con los precios actuales. Lanza ValueError si el
+    carrito no es válido. Devuelve
+    {'lineas': [...], 'no_disponibles': [ids], 'total': Decimal}
+    donde cada línea indica si cambió el precio o se ajustó la cantidad.
+    Los items repetidos (mismo producto) se suman en una sola línea.
+    """
+    solicitados = _items_solicitados(items)
+    productos = Producto.objects.only(
+        'id', 'titulo', 'precio_final', 'unidad', 'fraccionado'
+    ).in_bulk({pk for pk, _, _, _ in solicitados})
+
+    lineas = {}
+    no_disponibles = []
+    for pk, cantidad, gramos_cliente, precio_cliente in solicitados:
+        producto = productos.get(pk)
+        if producto is None:
+            if pk not in no_disponibles:
+                no_disponibles.append(pk)
+            continue
+        cantidad, ajustada = _cantidad(producto, cantidad, gramos_cliente)
+
+        linea = lineas.get(pk)
+        if linea is None:
+            linea = lineas[pk] = {
+                "id": pk,
+                "titulo": producto.titulo,
+                "unidad": producto.unidad,
+                "fraccionado": _en_gramos(producto),
+                "cantidad": 0,
+                "precio_unitario": producto.precio_final,
+                "precio_cambio": False,
+                "cantidad_ajustada": False,
+            }
+        linea["cantidad"] += cantidad
+        linea["cantidad_ajustada"] |= ajustada
+        if precio_cliente is not None:
+            try:
+                linea["precio_cambio"] |= Decimal(str(precio_cliente)).quantize(CENTAVOS) != producto.precio_final
+            except Exception:
+                linea["precio_cambio"] = True
+
+    total = Decimal('0.00')
+    for linea in lineas.values():
+        linea["subtotal"] = subtotal(linea["precio_unitario"], linea["cantidad"], linea["fraccionado"])
+        total += linea["subtotal"]
+
+    return {"lineas": list(lineas.values()), "no_disponibles": no_disponibles, "total": total}
+
+
+def texto_cantidad(linea):
+    """'1.50 kg', '500 g' o '3 unidad', como en el carrito"""
+    if linea["fraccionado"]:
+        if linea["cantidad"] >= 1000:
+            return f"{linea['cantidad'] / 1000:.2f} kg"
+        return f"{linea['cantidad']} g"
+    return f"{linea['cantidad']} {linea['unidad']}"
+
+
+def resumen_pedido(lineas):
+    """Lista de productos para el mensaje de WhatsApp (mismo formato que envio.js)"""
+    return "".join(
+        f"{numero}. {linea['titulo']} - {texto_cantidad(linea)} - ${linea['subtotal']}\n"
+        for numero, linea in enumerate(lineas, start=1)
+    )
+
+
+def _cliente(datos):
+    if not isinstance(datos, dict):
+        raise ValueError("Faltan los datos del cliente")
+    cliente = {
+        "nombre": str(datos.get("nombre") or "").strip()[:120],
+        "telefono": str(datos.get("telefono") or "").strip()[:40],
+        "direccion": str(datos.get("direccion") or "").strip()[:300],
+        "observaciones": str(datos.get("observaciones") or "").strip()[:2000],
+        "metodo_pago": str(datos.get("metodoPago") or "efectivo"),
+    }
+    if not (cliente["nombre"] and cliente["telefono"] and cliente["direccion"]):
+        raise ValueError("Nombre, teléfono y dirección son obligatorios")
+    if len(cliente["telefono"]) < 8:
+        raise ValueError("Teléfono no válido")
+    if cliente["metodo_pago"] not in dict(Pedido.METODOS_PAGO):
+        raise ValueError("Método de pago no válido")
+    return cliente
+
+
+def registrar_pedido(datos_cliente, items):
+    """
+    Cotiza el carrito y guarda el pedido con sus líneas: una consulta de
+    productos, un INSERT del pedido y un INSERT con todas las líneas.
+    Lanza ValueError si el cliente o el carrito no son válidos o si ningún
+    producto sigue disponible. Devuelve (pedido, cotización).
+    """
+    cliente = _cliente(datos_cliente)
+    cotizacion = cotizar(items)
+    if not cotizacion["lineas"]:
+        raise ValueError("Ninguno de los productos del carrito está disponible")
+
+    with transaction.atomic():
+        pedido = Pedido.objects.create(total=cotizacion["total"], **cliente)
+        PedidoItem.objects.bulk_create([
+            PedidoItem(
+                pedido=pedido,
+                producto_id=linea["id"],
+                titulo=linea["titulo"],
+                unidad=linea["unidad"],
+                fraccionado=linea["fraccionado"],
+                cantidad=linea["cantidad"],
+                precio_unitario=linea["precio_unitario"],
+                subtotal=linea["subtotal"],
+            )
+            for linea in cotizacion["lineas"]
+        ])
+    return pedido, cotizacion
@@ -0,0 +1,100 @@
+"""
+Cambios masivos de precios y descuentos para Natural Home.
+Cada acción es un único UPDATE con expresiones F() sobre el queryset elegido
+(categoría, resultado de búsqueda o selección); precio_final se recalcula en
+la misma sentencia (ver ProductoQuerySet.update) y la caché se invalida una
+sola vez al final.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Greatest, Now, Round
+
+from .busqueda import buscar
+from .cache_catalogo import invalidar_catalogo
+from .models import Producto
+from .signals import programar_snapshot
+
+ACCIONES = {
+    "precio_porcentaje": "Cambiar precio (%)",
+    "precio_monto": "Sumar o restar al precio ($)",
+    "descuento_activar": "Activar descuento (%)",
+    "descuento_desactivar": "Quitar descuento",
+}
+
+ALCANCES = ("categoria", "busqueda", "seleccion")
+
+_DECIMAL = DecimalField(max_digits=10, decimal_places=2)
+
+
+def _numero(valor):
+    try:
+        numero = Decimal(str(valor).strip().replace(",", "."))
+    except InvalidOperation:
+        raise ValueError("El valor debe ser un número")
+    if not numero.is_finite():
+        raise ValueError("El valor debe ser un número")
+    return numero
+
+
+def cambios_accion(accion, valor=None):
+    """Argumentos de update() para una acción. Lanza ValueError si no es válida."""
+    if accion == "precio_porcentaje":
+        porcentaje = _numero(valor)
+        if porcentaje <= -100:
+            raise ValueError("El porcentaje debe ser mayor que -100")
+        factor = Value((100 + porcentaje) / 100, output_field=_DECIMAL)
+        return {"precio": Round(F("precio") * factor, 2, output_field=_DECIMAL)}
+
+    if accion == "precio_monto":
+        monto = Value(_numero(valor), output_field=_DECIMAL)
+        # Nunca por debajo de 0
+        return {"precio": Greatest(F("precio") + monto, Value(Decimal("0"), output_field=_DECIMAL))}
+
+    if accion == "descuento_activar":
+        porcentaje = _numero(valor)
+        if porcentaje != int(porcentaje) or not 1 <= porcentaje <= 100:
+            raise ValueError("El descuento debe ser un entero entre 1 y 100")
+        return {"descuento_activo": True, "porcentaje_descuento": int(porcentaje)}
+
+    if accion == "descuento_desactivar":
+        return {"descuento_activo": False, "porcentaje_descuento": 0}
+
+    raise ValueError("Acción no válida")
+
+
+def productos_alcance(alcance, categoria="", query="", ids=()):
+    """Queryset de los productos a modificar. Lanza ValueError si falta el criterio."""
+    productos = Producto.objects.all()
+    if alcance == "categoria":
+        if categoria not in dict(Producto.CATEGORIAS):
+            raise ValueError("Categoría no válida")
+        return productos.filter(categoria=categoria)
+    if alcance == "busqueda":
+        if not query.strip():
+            raise ValueError("Falta el texto de búsqueda")
+        # Subconsulta de ids: el UPDATE no puede llevar el orden por relevancia
+        return productos.filter(id__in=buscar(Producto.objects.all(), query).values("id"))
+    if alcance == "seleccion":
+        if not ids:
+            raise ValueError("No hay productos seleccionados")
+        return productos.filter(id__in=ids)
+    raise ValueError("Alcance no válido")
+
+
+def aplicar_accion(queryset, accion, valor=None):
+    """
+    Ejecuta la acción como un solo UPDATE y devuelve la cantidad de productos
+    modificados. fecha_actualizacion se fija a mano (update() no usa auto_now)
+    para que los clientes de /api/productos/cambios/ reciban los cambios.
+    """
+    cambios = cambios_accion(accion, valor)
+    with transaction.atomic():
+        afectados = queryset.update(**cambios, fecha_actualizacion=Now())
+        if afectados:
+            programar_snapshot()
+    if afectados:
+        # Los precios no están en el índice de búsqueda: solo hace falta la caché
+        invalidar_catalogo()
+    return afectados
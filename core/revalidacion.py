@@ -0,0 +1,118 @@
+"""
+Revalidación HTTP del storefront para Natural Home.
+  - revalidar_catalogo: ETag fuerte de una página del catálogo a partir de la
+    versión del catálogo (ver core/cache_catalogo.py) y de sus parámetros; un
+    If-None-Match que coincide se responde 304 antes de consultar la base o
+    renderizar.
+  - PoliticaCacheMiddleware: Cache-Control por defecto. Storefront anónimo:
+    público con s-maxage para un CDN; admin: privado y siempre revalidado.
+"""
+import functools
+import hashlib
+import os
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.cache import get_conditional_response, has_vary_header, patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import quote_etag
+
+from .cache_catalogo import aversion_catalogo, version_catalogo
+
+CARPETA_PLANTILLAS = os.path.join(os.path.dirname(__file__), "templates")
+
+
+@functools.lru_cache(maxsize=None)
+def version_despliegue():
+    """
+    Huella de las plantillas y del manifest de estáticos: un deploy que cambia
+    el HTML cambia los ETag aunque el catálogo siga en la misma versión.
+    Se calcula una vez por proceso.
+    """
+    firma = []
+    for carpeta, _, archivos in sorted(os.walk(CARPETA_PLANTILLAS)):
+        for nombre in sorted(archivos):
+            ruta = os.path.join(carpeta, nombre)
+            firma.append(f"{ruta}:{os.stat(ruta).st_mtime_ns}")
+    manifest = os.path.join(settings.STATIC_ROOT or "", "staticfiles.json")
+    if os.path.isfile(manifest):
+        firma.append(f"{manifest}:{os.stat(manifest).st_mtime_ns}")
+    return hashlib.md5("\n".join(firma).encode()).hexdigest()[:8]
+
+
+def etag_catalogo(nombre, version, partes):
+    """ETag (con comillas) de una página: nombre, versión del catálogo y hash de los parámetros"""
+    parametros = "\x1f".join(str(p) for p in (version_despliegue(), *partes))
+    return quote_etag(f"{nombre}-{version}-{hashlib.md5(parametros.encode()).hexdigest()[:16]}")
+
+
+def _revalidar(request, etag):
+    """Respuesta 304 si el cliente ya tiene esta versión, o None"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+def revalidar_catalogo(nombre, partes):
+    """
+    Decorador para vistas del catálogo (sync o async). partes(request) devuelve
+    los parámetros que cambian el contenido (q, categoria, orden, page...).
+    """
+    def decorador(vista):
+        if iscoroutinefunction(vista):
+            @functools.wraps(vista)
+            async def envoltura(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await vista(request, *args, **kwargs)
+                etag = etag_catalogo(nombre, await aversion_catalogo(), partes(request))
+                response = _revalidar(request, etag)
+                if response is None:
+                    response = await vista(request, *args, **kwargs)
+                    if response.status_code == 200:
+                        response["ETag"] = etag
+                return response
+        else:
+            @functools.wraps(vista)
+            def envoltura(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return vista(request, *args, **kwargs)
+                etag = etag_catalogo(nombre, version_catalogo(), partes(request))
+                response = _revalidar(request, etag)
+                if response is None:
+                    response = vista(request, *args, **kwargs)
+                    if response.status_code == 200:
+                        response["ETag"] = etag
+                return response
+        return envoltura
+    return decorador
+
+
+class PoliticaCacheMiddleware(MiddlewareMixin):
+    """
+    Cache-Control para las respuestas que no lo definen en la vista.
+    Va antes de SessionMiddleware en MIDDLEWARE, así ve el Vary: Cookie que
+    agrega la sesión: esas respuestas dependen del usuario y no son públicas.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Cache-Control"):
+            return response
+
+        if request.path.startswith("/admin/"):
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        if request.method not in ("GET", "HEAD") or response.status_code not in (200, 304):
+            return response
+        if response.cookies or has_vary_header(response, "Cookie"):
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.CACHE_NAVEGADOR_SEGUNDOS,
+            s_maxage=settings.CACHE_CDN_SEGUNDOS,
+        )
+        return response
@@ -0,0 +1,54 @@
+"""
+Serialización de productos para la API y los datos embebidos en home.html.
+"""
+from django.conf import settings
+
+
+def _url(request, url):
+    """URL absoluta si hay request; si no, se deja relativa al sitio"""
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def datos_producto(p, request=None):
+    """
+    Devuelve el diccionario público de un producto (el mismo que entrega
+    api_producto). Para no generar consultas extra, el producto debería venir
+    de Producto.objects.con_galeria().
+    """
+    todas_imagenes = []
+
+    # Imagen principal
+    if p.imagen:
+        try:
+            todas_imagenes.append(_url(request, p.imagen.url))
+        except Exception as e:
+            print(f"Error obteniendo URL de imagen principal: {e}")
+
+    # Imágenes adicionales (precargadas con con_galeria)
+    for img in p.get_imagenes_adicionales():
+        try:
+            todas_imagenes.append(_url(request, img.url))
+        except Exception as e:
+            print(f"Error obteniendo URL de imagen adicional: {e}")
+
+    # Si no hay imágenes, usar placeholder
+    if not todas_imagenes:
+        todas_imagenes = [_url(request, settings.STATIC_URL + 'img/no-image.png')]
+
+    return {
+        "id": p.id,
+        "titulo": p.titulo,
+        "descripcion": p.descripcion or "",
+        "precio": float(p.precio),
+        "precio_final": float(p.precio_final),
+        "unidad": p.unidad,
+        "unidad_display": p.get_unidad_display(),
+        "imagen": p.imagen.url if p.imagen else "",
+        "imagenes": todas_imagenes,  # Lista de TODAS las imágenes
+        "fraccionado": bool(p.fraccionado),
+    }
+
+
+def etag_producto(producto_id, fecha):
+    """ETag de un producto según su fecha de actualización (None si no existe)"""
+    return f"p{producto_id}-{fecha.timestamp():.6f}" if fecha else None
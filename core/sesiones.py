@@ -0,0 +1,39 @@
+"""
+Sesiones del panel de administración.
+El backend se elige con SESSION_MODO en settings (db, cached_db o
+signed_cookies). El worker de tareas (procesar_tareas) borra las sesiones
+vencidas como mucho una vez cada SESSION_PURGA_SEGUNDOS, para que
+django_session no crezca sin límite; sin worker, usar clearsessions en un cron.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import cache
+
+CLAVE_PURGA = "sesiones:ultima_purga"
+
+
+def purgar_sesiones_expiradas():
+    """Borra las sesiones vencidas del backend configurado"""
+    motor = import_module(settings.SESSION_ENGINE)
+    try:
+        motor.SessionStore.clear_expired()
+    except NotImplementedError:
+        # Backends sin almacenamiento propio (cookies firmadas) no tienen nada que purgar
+        pass
+
+
+def purgar_si_corresponde():
+    """
+    Ejecuta la purga si pasó el intervalo desde la última.
+    cache.add es atómico: si varios procesos comparten la caché, solo uno purga.
+    """
+    if not settings.SESSION_PURGA_SEGUNDOS:
+        return False
+    if not cache.add(CLAVE_PURGA, True, timeout=settings.SESSION_PURGA_SEGUNDOS):
+        return False
+    try:
+        purgar_sesiones_expiradas()
+    except Exception as e:
+        print(f"Error purgando sesiones vencidas: {e}")
+    return True
@@ -0,0 +1,47 @@
+"""
+Señales del modelo Producto.
+Mantienen sincronizados los datos derivados (índice de búsqueda, versión
+del catálogo cacheado, snapshot y marcas de eliminación) al guardar o eliminar.
+"""
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .busqueda import indexar_producto, desindexar_producto
+from .cache_catalogo import invalidar_catalogo
+from .catalogo import registrar_eliminacion
+from .models import Producto, ProductoImagen
+from .tareas import encolar
+
+
+def programar_snapshot():
+    """
+    Encola la regeneración del snapshot del catálogo. La clave junta en una
+    sola tarea todos los cambios que lleguen antes de que el worker la tome.
+    """
+    if settings.CATALOGO_SNAPSHOT_AUTOMATICO:
+        encolar("regenerar_snapshot", clave="snapshot")
+
+
+@receiver(post_save, sender=Producto)
+def producto_guardado(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    indexar_producto(instance)
+    invalidar_catalogo()
+    programar_snapshot()
+
+
+@receiver(post_delete, sender=Producto)
+def producto_eliminado(sender, instance, **kwargs):
+    desindexar_producto(instance.pk)
+    registrar_eliminacion(instance.pk)
+    invalidar_catalogo()
+    programar_snapshot()
+
+
+@receiver(post_save, sender=ProductoImagen)
+@receiver(post_delete, sender=ProductoImagen)
+def imagen_modificada(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidar_catalogo()
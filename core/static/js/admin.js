@@ -190,4 +190,54 @@ document.addEventListener('DOMContentLoaded', function() {
             confirmarEliminacionLista(this);
         });
     });
-});
\ No newline at end of file
+});
+
+/* =========================================================
+   ACCIONES MASIVAS DE PRECIOS Y DESCUENTOS
+========================================================= */
+
+function seleccionarTodos(marcar) {
+    document.querySelectorAll('.seleccion-masiva').forEach(check => check.checked = marcar);
+}
+
+function cambiarAlcanceMasivo(alcance) {
+    const form = document.getElementById('accionesMasivas');
+    form.categoria.style.display = alcance === 'categoria' ? '' : 'none';
+}
+
+async function enviarAccionMasiva(simular) {
+    const form = document.getElementById('accionesMasivas');
+    const datos = new FormData(form);
+    const ids = Array.from(document.querySelectorAll('.seleccion-masiva:checked')).map(check => check.value);
+    datos.append('ids', ids.join(','));
+    datos.append('simular', simular ? '1' : '0');
+
+    const respuesta = await fetch(form.dataset.url, {
+        method: 'POST',
+        body: datos,
+        headers: {'X-CSRFToken': document.querySelector('meta[name="csrf-token"]').content},
+    });
+    const resultado = await respuesta.json();
+    if (!respuesta.ok) {
+        throw new Error(resultado.error || 'Error al aplicar la acción');
+    }
+    return resultado.afectados;
+}
+
+// Vista previa: cuenta los productos afectados. Aplicar: muestra la vista previa y pide confirmación
+async function accionMasiva(soloVistaPrevia) {
+    const resultado = document.getElementById('resultadoMasivo');
+    try {
+        const afectados = await enviarAccionMasiva(true);
+        resultado.textContent = `${afectados} producto(s) afectado(s)`;
+        if (soloVistaPrevia || afectados === 0) return;
+
+        if (confirm(`Se modificarán ${afectados} producto(s). ¿Continuar?`)) {
+            const modificados = await enviarAccionMasiva(false);
+            alert(`${modificados} producto(s) actualizado(s)`);
+            location.reload();
+        }
+    } catch (error) {
+        resultado.textContent = error.message;
+    }
+}
@@ -133,16 +133,27 @@ function inicializarConfirmacionesEliminacion() {
    GESTIÓN DE IMÁGENES ADICIONALES
    ============================================ */
 
-// Array para almacenar imágenes en base64
-let imagenesAdicionalesBase64 = [];
+// Archivos seleccionados: se envían como partes del formulario multipart
+// (el servidor los recibe en streaming, sin convertirlos a base64)
+let imagenesAdicionalesArchivos = [];
+
+/**
+ * Copia los archivos seleccionados al input oculto que se envía con el formulario
+ */
+function sincronizarArchivosAdicionales() {
+    const hiddenInput = document.getElementById('additionalImagesFiles');
+    if (!hiddenInput) return;
+
+    const dataTransfer = new DataTransfer();
+    imagenesAdicionalesArchivos.forEach(img => dataTransfer.items.add(img.file));
+    hiddenInput.files = dataTransfer.files;
+}
 
 /**
  * Inicializa el input de imágenes adicionales
  */
 function inicializarImagenesAdicionales() {
     const input = document.getElementById('imagenesAdicionales');
-    const gallery = document.getElementById('additionalGallery');
-    const hiddenField = document.getElementById('additionalImagesData');
 
     if (!input) return;
 
@@ -151,14 +162,14 @@ function inicializarImagenesAdicionales() {
         const maxImages = 5;
 
         // Validar número máximo de imágenes
-        const totalImages = imagenesAdicionalesBase64.length + files.length;
+        const totalImages = imagenesAdicionalesArchivos.length + files.length;
         if (totalImages > maxImages) {
             alert(`Solo puedes subir un máximo de ${maxImages} imágenes adicionales`);
             return;
         }
 
         // Procesar cada archivo
-        files.forEach((file, index) => {
+        files.forEach(file => {
             if (!file.type.startsWith('image/')) {
                 alert(`El archivo ${file.name} no es una imagen válida`);
                 return;
@@ -170,28 +181,17 @@ function inicializarImagenesAdicionales() {
                 return;
             }
 
-            const reader = new FileReader();
-            reader.onload = function(e) {
-                const base64 = e.target.result;
-
-                // Agregar al array
-                imagenesAdicionalesBase64.push({
-                    base64: base64,
-                    filename: file.name,
-                    type: file.type
-                });
-
-                // Actualizar vista previa
-                actualizarGaleriaPreview();
-
-                // Actualizar campo oculto
-                if (hiddenField) {
-                    hiddenField.value = JSON.stringify(imagenesAdicionalesBase64);
-                }
-            };
-            reader.readAsDataURL(file);
+            // Vista previa sin leer el archivo a memoria
+            imagenesAdicionalesArchivos.push({
+                file: file,
+                preview: URL.createObjectURL(file),
+                filename: file.name
+            });
         });
 
+        actualizarGaleriaPreview();
+        sincronizarArchivosAdicionales();
+
         // Limpiar input
         e.target.value = '';
     });
@@ -204,16 +204,16 @@ function actualizarGaleriaPreview() {
     const gallery = document.getElementById('additionalGallery');
     if (!gallery) return;
 
-    if (imagenesAdicionalesBase64.length === 0) {
+    if (imagenesAdicionalesArchivos.length === 0) {
         gallery.classList.add('hidden');
         gallery.innerHTML = '';
         return;
     }
 
     gallery.classList.remove('hidden');
-    gallery.innerHTML = imagenesAdicionalesBase64.map((img, index) => `
+    gallery.innerHTML = imagenesAdicionalesArchivos.map((img, index) => `
         <div class="additional-image-item" data-index="${index}">
-            <img src="${img.base64}" alt="${img.filename}">
+            <img src="${img.preview}" alt="${img.filename}">
             <div class="additional-image-actions">
                 <button type="button" class="btn-remove-additional"
                         title="Eliminar imagen"
@@ -239,28 +239,25 @@ function actualizarGaleriaPreview() {
  * Elimina una imagen nueva (no guardada aún)
  */
 function eliminarImagenNueva(index) {
-    if (index < 0 || index >= imagenesAdicionalesBase64.length) {
+    if (index < 0 || index >= imagenesAdicionalesArchivos.length) {
         console.error('Índice inválido:', index);
         return;
     }
 
-    // Eliminar del array
-    imagenesAdicionalesBase64.splice(index, 1);
+    // Eliminar del array y liberar la vista previa
+    const [eliminada] = imagenesAdicionalesArchivos.splice(index, 1);
+    URL.revokeObjectURL(eliminada.preview);
 
-    // Actualizar vista
+    // Actualizar vista y archivos a enviar
     actualizarGaleriaPreview();
+    sincronizarArchivosAdicionales();
 
-    // Actualizar campo oculto
-    const hiddenField = document.getElementById('additionalImagesData');
-    if (hiddenField) {
-        hiddenField.value = JSON.stringify(imagenesAdicionalesBase64);
-    }
-
-    console.log(`Imagen eliminada. Total de imágenes: ${imagenesAdicionalesBase64.length}`);
+    console.log(`Imagen eliminada. Total de imágenes: ${imagenesAdicionalesArchivos.length}`);
 }
 
 /**
  * Marca una imagen existente para eliminación (solo en edit)
+ * @param {number} index - ID de la imagen (ProductoImagen)
  */
 function eliminarImagenAdicional(index) {
     if (!confirm('¿Seguro que quieres eliminar esta imagen?')) {
@@ -268,7 +265,7 @@ function eliminarImagenAdicional(index) {
     }
 
     const keepInput = document.getElementById(`keep_${index}`);
-    const item = document.querySelector(`[data-index="${index}"]`);
+    const item = document.querySelector(`#existingGallery .additional-image-item[data-index="${index}"]`);
 
     if (keepInput && item) {
         keepInput.value = '0';
@@ -276,9 +276,80 @@ function vaciarCarrito() {
     }
 }
 
+// =========================================================
+// PRECIOS DEL SERVIDOR (/api/carrito/cotizar/)
+// =========================================================
+
+// Items del carrito en el formato de /api/carrito/cotizar/ y /api/pedidos/
+function itemsParaServidor(carrito) {
+    return carrito.map(item => ({
+        id: Number(item.id),
+        cantidad: item.cantidad,
+        esFraccionado: Boolean(item.esFraccionado && item.unidad === "kg"),
+        precio: item.precio
+    }));
+}
+
+// Aplica al carrito guardado los precios y cantidades que devolvió el servidor
+function aplicarCotizacion(cotizacion) {
+    const lineas = new Map(cotizacion.lineas.map(linea => [String(linea.id), linea]));
+    const quitados = [];
+    let cambios = 0;
+
+    const carrito = cargarCarrito().filter(item => {
+        const linea = lineas.get(String(item.id));
+        if (!linea) {
+            quitados.push(item.titulo);
+            return false;
+        }
+        const precio = Number(linea.precio_unitario);
+        if (precio !== Number(item.precio)) cambios++;
+        item.precio = precio;
+        item.titulo = linea.titulo;
+
+        // El producto pasó a venderse (o dejó de venderse) por gramos
+        const enGramos = Boolean(item.esFraccionado && item.unidad === "kg");
+        if (enGramos !== linea.fraccionado) {
+            item.cantidad = linea.fraccionado ? item.cantidad * 1000 : Math.max(1, Math.round(item.cantidad / 1000));
+            cambios++;
+        }
+        item.esFraccionado = linea.fraccionado;
+        item.unidad = linea.unidad;
+        return true;
+    });
+
+    guardarCarrito(carrito);
+    if (quitados.length) {
+        mostrarNotificacion(`✗ Ya no disponible:<br><small>${quitados.join(", ")}</small>`);
+    } else if (cambios) {
+        mostrarNotificacion("Precios del carrito actualizados");
+    }
+}
+
+// Pide los precios actuales de todo el carrito en una sola consulta
+function sincronizarCarrito() {
+    const carrito = cargarCarrito();
+    if (carrito.length === 0) return Promise.resolve(null);
+
+    return fetch("/api/carrito/cotizar/", {
+        method: "POST",
+        headers: {"Content-Type": "application/json"},
+        body: JSON.stringify({items: itemsParaServidor(carrito)})
+    })
+        .then(respuesta => respuesta.ok ? respuesta.json() : null)
+        .then(cotizacion => {
+            if (cotizacion) aplicarCotizacion(cotizacion);
+            return cotizacion;
+        })
+        .catch(() => null); // Sin conexión: se muestran los precios guardados
+}
+
 // Abrir modal del carrito - CORREGIDO
 function abrirCarrito() {
     mostrarCarrito();
+    sincronizarCarrito().then(cotizacion => {
+        if (cotizacion) mostrarCarrito();
+    });
     const modal = document.getElementById("modalCarrito");
     if (modal) {
         modal.style.display = "flex";
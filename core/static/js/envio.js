@@ -54,8 +54,7 @@ function cerrarEnvio() {
 // GENERACIÓN DE MENSAJE (EMOJIS CORREGIDOS Y FORMATO MEJORADO)
 // =========================================================
 
-function generarMensajeWhatsApp(datos) {
-    const carritoInfo = obtenerResumenCarrito();
+function generarMensajeWhatsApp(datos, carritoInfo) {
     
     // Formato de fecha y hora mejorado: 16/12/2024 - 11:17 AM
     const ahora = new Date();
@@ -72,7 +71,8 @@ function generarMensajeWhatsApp(datos) {
     
     // Construir mensaje con emojis Unicode seguros
     let mensaje = "Hola! Quiero hacer un pedido.\n\n";
-    mensaje += "*PEDIDO* - " + fecha + " a las " + hora + "\n\n";
+    const numeroPedido = carritoInfo.pedido ? " #" + carritoInfo.pedido : "";
+    mensaje += "*PEDIDO" + numeroPedido + "* - " + fecha + " a las " + hora + "\n\n";
     mensaje += "*Cliente:* " + datos.nombre + "\n";
     mensaje += "*Telefono:* " + datos.telefono + "\n";
     mensaje += "*Direccion:* " + datos.direccion + "\n";
@@ -94,8 +94,8 @@ function generarMensajeWhatsApp(datos) {
 // ENVÍO POR WHATSAPP (MEJORADO - DETECTA DISPOSITIVO)
 // =========================================================
 
-function enviarPedidoWhatsApp(datos) {
-    const mensaje = generarMensajeWhatsApp(datos);
+function enviarPedidoWhatsApp(datos, carritoInfo) {
+    const mensaje = generarMensajeWhatsApp(datos, carritoInfo);
     const mensajeCodificado = encodeURIComponent(mensaje);
     
     // Detectar si es móvil
@@ -149,7 +149,33 @@ function enviarPedidoWhatsApp(datos) {
     }
     
     // Mostrar confirmación
-    mostrarConfirmacionPedido(datos, obtenerResumenCarrito());
+    mostrarConfirmacionPedido(datos, carritoInfo);
+}
+
+// =========================================================
+// REGISTRO DEL PEDIDO (/api/pedidos/)
+// =========================================================
+
+// Guarda el pedido con los precios del servidor y envía ese resumen por WhatsApp
+function registrarPedido(datos) {
+    fetch('/api/pedidos/', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({cliente: datos, items: itemsParaServidor(cargarCarrito())})
+    })
+        .then(respuesta => respuesta.json().then(json => ({ok: respuesta.ok, json: json})))
+        .then(({ok, json}) => {
+            if (!ok) {
+                mostrarNotificacion('❌ ' + (json.error || 'No se pudo registrar el pedido'), 'error');
+                return;
+            }
+            aplicarCotizacion(json);
+            enviarPedidoWhatsApp(datos, {resumen: json.resumen, total: json.total, pedido: json.pedido});
+        })
+        .catch(() => {
+            // Sin conexión con el servidor: el pedido sale igual con los precios del carrito
+            enviarPedidoWhatsApp(datos, obtenerResumenCarrito());
+        });
 }
 
 // =========================================================
@@ -291,10 +317,7 @@ document.addEventListener('DOMContentLoaded', function() {
             // Mostrar carga
             mostrarNotificacion('⏳ Generando pedido...', 'info');
             
-            // Pequeño delay para mejor UX
-            setTimeout(() => {
-                enviarPedidoWhatsApp(datos);
-            }, 500);
+            registrarPedido(datos);
         });
     }
     
@@ -667,6 +690,9 @@ function vaciarCarrito() {
 // Abrir modal del carrito - CORREGIDO
 function abrirCarrito() {
     mostrarCarrito();
+    sincronizarCarrito().then(cotizacion => {
+        if (cotizacion) mostrarCarrito();
+    });
     const modal = document.getElementById("modalCarrito");
     if (modal) {
         modal.style.display = "flex";
@@ -35,12 +35,171 @@ function filtrar(categoria) {
         url.searchParams.set('categoria', categoria);
     }
 
+    // Un filtro nuevo empieza desde la primera página
+    url.searchParams.delete('page');
+    url.searchParams.delete('cursor');
+
     const searchInput = document.getElementById('searchInput');
     if (searchInput && searchInput.value) {
         url.searchParams.set('q', searchInput.value);
     }
 
-    window.location.href = url.toString();
+    navegar(url);
+}
+
+// Ordenar por precio ('precio', '-precio') o por más recientes ('')
+function ordenar(orden) {
+    const url = new URL(window.location);
+
+    if (orden) {
+        url.searchParams.set('orden', orden);
+    } else {
+        url.searchParams.delete('orden');
+    }
+
+    url.searchParams.delete('page');
+    url.searchParams.delete('cursor');
+
+    navegar(url);
+}
+
+/* ---------------------------------------------------------
+   RESULTADOS SIN RECARGAR LA PÁGINA
+   /api/productos/fragmento/ devuelve solo las tarjetas, la
+   página siguiente y (en la primera página) las facetas.
+--------------------------------------------------------- */
+
+const URL_FRAGMENTO = '/api/productos/fragmento/';
+
+// Query string de la página siguiente ('' = no hay más)
+let paginaSiguiente = '';
+let cargandoProductos = false;
+let observadorScroll = null;
+
+// Pide el fragmento; agregar=true lo suma al grid (scroll infinito)
+function cargarProductos(parametros, agregar = false) {
+    const container = document.getElementById('productosContainer');
+    cargandoProductos = true;
+    if (!agregar) container.classList.add('cargando');
+
+    return fetch(`${URL_FRAGMENTO}?${parametros}`)
+        .then(res => {
+            if (!res.ok) {
+                throw new Error(`Error HTTP: ${res.status}`);
+            }
+            return res.json();
+        })
+        .then(datos => {
+            if (agregar) {
+                container.insertAdjacentHTML('beforeend', datos.html);
+            } else {
+                container.innerHTML = datos.html;
+            }
+            agregarProductosPrecargados(datos.productos);
+            if (datos.facetas) actualizarFacetas(datos.facetas);
+            paginaSiguiente = datos.siguiente;
+        })
+        .finally(() => {
+            cargandoProductos = false;
+            container.classList.remove('cargando');
+            revisarCentinela();
+        });
+}
+
+// Cambia la URL y los resultados en el lugar; si falla, navega normalmente
+function navegar(url) {
+    history.pushState(null, '', url);
+    actualizarBusqueda(url.searchParams.get('q') || '');
+    setupFilters();
+    cargarProductos(url.searchParams.toString())
+        .then(() => {
+            const container = document.getElementById('productosContainer');
+            if (container.getBoundingClientRect().top < 0) {
+                container.scrollIntoView({ behavior: 'smooth' });
+            }
+        })
+        .catch(error => {
+            console.error("Error cargando productos:", error);
+            window.location.href = url.toString();
+        });
+}
+
+// Texto "Resultados para..." de la búsqueda actual
+function actualizarBusqueda(query) {
+    const info = document.getElementById('resultadosBusqueda');
+    const texto = document.getElementById('textoBusqueda');
+    if (info && texto) {
+        texto.textContent = query;
+        info.hidden = !query;
+    }
+}
+
+// Cantidades de los botones de categoría y del banner de descuentos
+function actualizarFacetas(facetas) {
+    document.querySelectorAll('.filter-count[data-faceta]').forEach(span => {
+        const valor = span.dataset.faceta;
+        span.textContent = valor === 'total' ? facetas.total : (facetas.categorias[valor] || {}).total || 0;
+    });
+}
+
+// Scroll infinito: pide la página siguiente cuando el final del grid se acerca a la pantalla
+function setupScrollInfinito() {
+    const container = document.getElementById('productosContainer');
+    const centinela = document.getElementById('scrollInfinito');
+    if (!container || !centinela || !('IntersectionObserver' in window)) return;
+
+    paginaSiguiente = container.dataset.siguiente || '';
+    // La paginación numerada queda para los navegadores sin IntersectionObserver
+    document.body.classList.add('scroll-infinito-activo');
+
+    observadorScroll = new IntersectionObserver(entries => {
+        if (!entries[0].isIntersecting || cargandoProductos || !paginaSiguiente) return;
+        cargarProductos(paginaSiguiente, true).catch(error => {
+            console.error("Error cargando más productos:", error);
+        });
+    }, { rootMargin: '600px 0px' });
+    observadorScroll.observe(centinela);
+}
+
+// El observer solo avisa cuando cambia la visibilidad: si el centinela sigue
+// visible después de cargar (grid corto), volver a observarlo lo evalúa de nuevo
+function revisarCentinela() {
+    const centinela = document.getElementById('scrollInfinito');
+    if (observadorScroll && centinela) {
+        observadorScroll.unobserve(centinela);
+        observadorScroll.observe(centinela);
+    }
+}
+
+// Filtros, orden y búsqueda sin recargar la página
+function setupNavegacion() {
+    // Atrás/adelante del navegador entre filtros
+    window.addEventListener('popstate', () => {
+        const parametros = new URLSearchParams(window.location.search);
+        const searchInput = document.getElementById('searchInput');
+        if (searchInput) searchInput.value = parametros.get('q') || '';
+        actualizarBusqueda(parametros.get('q') || '');
+        setupFilters();
+        cargarProductos(parametros.toString()).catch(() => window.location.reload());
+    });
+
+    // La búsqueda tampoco recarga la página
+    const form = document.getElementById('searchForm');
+    if (form) {
+        form.addEventListener('submit', e => {
+            e.preventDefault();
+            const url = new URL(window.location);
+            const q = document.getElementById('searchInput').value.trim();
+            if (q) {
+                url.searchParams.set('q', q);
+            } else {
+                url.searchParams.delete('q');
+            }
+            url.searchParams.delete('page');
+            url.searchParams.delete('cursor');
+            navegar(url);
+        });
+    }
 }
 
 // Búsqueda en tiempo real (opcional)
@@ -57,7 +216,9 @@ function buscarProductos() {
 // Inicializar filtros al cargar la página
 document.addEventListener('DOMContentLoaded', function() {
     setupFilters();
-    
+    setupScrollInfinito();
+    setupNavegacion();
+
     // Configurar búsqueda en tiempo real si existe el input
     const searchInput = document.getElementById('searchInput');
     if (searchInput) {
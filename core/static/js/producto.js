@@ -162,6 +162,43 @@ function crearCarruselImagenes(imagenes) {
     }
 }
 
+// Datos de productos embebidos por home.html (evitan pedir la API al abrir el modal)
+let productosPrecargados = null;
+
+function getProductosPrecargados() {
+    if (productosPrecargados === null) {
+        const script = document.getElementById('productos-data');
+        try {
+            productosPrecargados = script ? JSON.parse(script.textContent) : {};
+        } catch (error) {
+            console.error("Error leyendo productos embebidos:", error);
+            productosPrecargados = {};
+        }
+    }
+    return productosPrecargados;
+}
+
+// Suma los datos de los productos que llegan con un fragmento del grid (filtros.js)
+function agregarProductosPrecargados(datos) {
+    Object.assign(getProductosPrecargados(), datos || {});
+}
+
+// Obtener un producto: primero de los datos embebidos, si no de la API
+function obtenerProducto(id) {
+    const precargado = getProductosPrecargados()[id];
+    if (precargado) {
+        return Promise.resolve(precargado);
+    }
+
+    return fetch(`/api/producto/${id}/`)
+        .then(res => {
+            if (!res.ok) {
+                throw new Error(`Error HTTP: ${res.status}`);
+            }
+            return res.json();
+        });
+}
+
 // Abrir modal de producto
 function abrirProducto(id) {
     // Prevenir scroll en el body cuando el modal está abierto
@@ -169,13 +206,7 @@ function abrirProducto(id) {
     
     console.log(`Solicitando producto ID: ${id}`);
     
-    fetch(`/api/producto/${id}/`)
-        .then(res => {
-            if (!res.ok) {
-                throw new Error(`Error HTTP: ${res.status}`);
-            }
-            return res.json();
-        })
+    obtenerProducto(id)
         .then(p => {
             console.log("Producto cargado:", p);
             console.log("Imágenes disponibles:", p.imagenes);
@@ -0,0 +1,235 @@
+"""
+Tareas en segundo plano para Natural Home.
+La cola es la tabla Tarea de la misma base de datos: encolar() inserta una
+fila en la transacción del request (si el request falla, la tarea no existe)
+y python manage.py procesar_tareas las ejecuta en un pool de hilos o de
+procesos. Pensado para un solo servidor, sin Redis ni broker aparte.
+
+  - Idempotencia: con una clave, encolar() devuelve la tarea pendiente que ya
+    existe en lugar de crear otra (diez guardados seguidos del mismo producto
+    generan una sola tarea).
+  - Reintentos: una tarea que falla vuelve a la cola con espera exponencial
+    (TAREAS_ESPERA_BASE, 2x, 4x...) hasta TAREAS_MAX_INTENTOS.
+  - Una tarea en curso por más de TAREAS_TIEMPO_MAXIMO se considera abandonada
+    (el worker se cortó) y cuenta como intento fallido.
+
+Con TAREAS_INMEDIATAS=True no se usa la cola: la tarea se ejecuta en el mismo
+proceso al confirmarse la transacción (desarrollo, o si no hay worker).
+"""
+import functools
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Producto, Tarea
+
+# Tope de la espera entre reintentos (segundos)
+ESPERA_MAXIMA = 3600
+
+# Tareas registradas: tipo -> función
+_tareas = {}
+
+
+def tarea(tipo):
+    """Registra una función como tarea. Los parámetros deben poder guardarse como JSON"""
+    def decorador(funcion):
+        _tareas[tipo] = funcion
+        return funcion
+    return decorador
+
+
+def encolar(tipo, clave="", retraso=0, max_intentos=None, **parametros):
+    """
+    Agrega una tarea a la cola. Si hay una pendiente con la misma clave,
+    devuelve esa. Con TAREAS_INMEDIATAS devuelve None y la ejecuta en el
+    proceso al confirmarse la transacción.
+    """
+    if tipo not in _tareas:
+        raise ValueError(f"Tarea desconocida: {tipo}")
+
+    if settings.TAREAS_INMEDIATAS:
+        transaction.on_commit(functools.partial(_ejecutar_en_linea, tipo, parametros))
+        return None
+
+    if clave:
+        existente = Tarea.objects.filter(clave=clave, estado=Tarea.PENDIENTE).first()
+        if existente is not None:
+            return existente
+    try:
+        with transaction.atomic():
+            return Tarea.objects.create(
+                tipo=tipo,
+                clave=clave,
+                parametros=parametros,
+                max_intentos=max_intentos or settings.TAREAS_MAX_INTENTOS,
+                disponible_desde=timezone.now() + timedelta(seconds=retraso),
+            )
+    except IntegrityError:
+        # Otro proceso la encoló entre la consulta y el INSERT
+        return Tarea.objects.filter(clave=clave, estado=Tarea.PENDIENTE).first()
+
+
+def _ejecutar_en_linea(tipo, parametros):
+    try:
+        _tareas[tipo](**parametros)
+    except Exception as e:
+        print(f"Error ejecutando la tarea {tipo}: {e}")
+
+
+def espera_reintento(intentos):
+    """Segundos hasta el próximo intento: base, 2x base, 4x base... con un poco de azar"""
+    espera = min(ESPERA_MAXIMA, settings.TAREAS_ESPERA_BASE * 2 ** max(0, intentos - 1))
+    # Para que las tareas que fallaron juntas no se reintenten todas a la vez
+    return espera * random.uniform(1, 1.2)
+
+
+def _registrar_fallo(tarea, error, reintentar=True):
+    """Vuelve a poner la tarea en la cola con backoff, o la marca como fallida"""
+    ahora = timezone.now()
+    if reintentar and tarea.intentos < tarea.max_intentos:
+        try:
+            with transaction.atomic():
+                Tarea.objects.filter(pk=tarea.pk).update(
+                    estado=Tarea.PENDIENTE,
+                    error=error,
+                    trabajador='',
+                    disponible_desde=ahora + timedelta(seconds=espera_reintento(tarea.intentos)),
+                )
+            return
+        except IntegrityError:
+            error += "\n(no se reintenta: ya hay una tarea pendiente con la misma clave)"
+    Tarea.objects.filter(pk=tarea.pk).update(estado=Tarea.FALLIDA, error=error, fecha_fin=ahora)
+
+
+def recuperar_abandonadas():
+    """Las tareas en curso hace más de TAREAS_TIEMPO_MAXIMO cuentan como un intento fallido"""
+    limite = timezone.now() - timedelta(seconds=settings.TAREAS_TIEMPO_MAXIMO)
+    abandonadas = Tarea.objects.filter(estado=Tarea.EN_CURSO, fecha_inicio__lt=limite)
+    for tarea in abandonadas:
+        _registrar_fallo(tarea, f"Sin terminar después de {settings.TAREAS_TIEMPO_MAXIMO}s (worker {tarea.trabajador})")
+    return len(abandonadas)
+
+
+def tomar_tareas(trabajador, cantidad):
+    """
+    Reserva hasta `cantidad` tareas disponibles para este worker. El UPDATE
+    condicionado a estado=pendiente garantiza que dos workers no tomen la misma.
+    """
+    ahora = timezone.now()
+    ids = list(
+        Tarea.objects.filter(estado=Tarea.PENDIENTE, disponible_desde__lte=ahora)
+        .order_by('disponible_desde', 'id')
+        .values_list('id', flat=True)[:cantidad]
+    )
+    if not ids:
+        return []
+    Tarea.objects.filter(id__in=ids, estado=Tarea.PENDIENTE).update(
+        estado=Tarea.EN_CURSO,
+        trabajador=trabajador,
+        fecha_inicio=ahora,
+        intentos=F('intentos') + 1,
+    )
+    return list(Tarea.objects.filter(id__in=ids, estado=Tarea.EN_CURSO, trabajador=trabajador, fecha_inicio=ahora))
+
+
+def ejecutar_tarea(tarea_id):
+    """
+    Ejecuta una tarea ya reservada y guarda el resultado. Corre en los hilos o
+    procesos del worker. Devuelve True si terminó bien.
+    """
+    tarea = Tarea.objects.get(pk=tarea_id)
+    funcion = _tareas.get(tarea.tipo)
+    if funcion is None:
+        _registrar_fallo(tarea, f"Tarea desconocida: {tarea.tipo}", reintentar=False)
+        return False
+    try:
+        funcion(**tarea.parametros)
+    except Exception as e:
+        _registrar_fallo(tarea, f"{type(e).__name__}: {e}")
+        return False
+    Tarea.objects.filter(pk=tarea.pk).update(estado=Tarea.COMPLETADA, error='', fecha_fin=timezone.now())
+    return True
+
+
+def purgar_completadas():
+    """Borra las tareas completadas hace más de TAREAS_CONSERVAR_DIAS"""
+    limite = timezone.now() - timedelta(days=settings.TAREAS_CONSERVAR_DIAS)
+    borradas, _ = Tarea.objects.filter(estado=Tarea.COMPLETADA, fecha_fin__lt=limite).delete()
+    return borradas
+
+
+def reintentar(tarea_id):
+    """Vuelve a encolar una tarea fallida desde cero. Devuelve False si no se puede"""
+    try:
+        with transaction.atomic():
+            return bool(Tarea.objects.filter(pk=tarea_id, estado=Tarea.FALLIDA).update(
+                estado=Tarea.PENDIENTE, intentos=0, error='', fecha_fin=None, disponible_desde=timezone.now(),
+            ))
+    except IntegrityError:
+        return False
+
+
+def estado_cola(ultimas_fallidas=20):
+    """Resumen para /admin/tareas/: cantidad por estado, demora de la cola y últimas fallidas"""
+    por_estado = dict(Tarea.objects.values_list('estado').annotate(n=Count('id')).order_by())
+    mas_antigua = Tarea.objects.filter(
+        estado=Tarea.PENDIENTE, disponible_desde__lte=timezone.now()
+    ).aggregate(m=Min('disponible_desde'))['m']
+    return {
+        "modo": "inmediato" if settings.TAREAS_INMEDIATAS else "cola",
+        "estados": {estado: por_estado.get(estado, 0) for estado, _ in Tarea.ESTADOS},
+        "demora_segundos": round((timezone.now() - mas_antigua).total_seconds(), 1) if mas_antigua else 0,
+        "en_curso": [
+            {"id": t.id, "tipo": t.tipo, "trabajador": t.trabajador, "inicio": t.fecha_inicio.isoformat()}
+            for t in Tarea.objects.filter(estado=Tarea.EN_CURSO)
+        ],
+        "fallidas": [
+            {"id": t.id, "tipo": t.tipo, "parametros": t.parametros, "intentos": t.intentos,
+             "error": t.error, "fecha": t.fecha_fin.isoformat() if t.fecha_fin else None}
+            for t in Tarea.objects.filter(estado=Tarea.FALLIDA).order_by('-id')[:ultimas_fallidas]
+        ],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Tareas
+# ---------------------------------------------------------------------------
+
+def encolar_imagenes(producto):
+    """Derivados de las imágenes de un producto, fuera del request del admin"""
+    return encolar("procesar_imagenes", clave=f"imagenes:{producto.pk}", producto_id=producto.pk)
+
+
+@tarea("procesar_imagenes")
+def procesar_imagenes(producto_id, forzar=False):
+    from .cache_catalogo import invalidar_catalogo
+    from .imagenes import procesar_producto
+    from .signals import programar_snapshot
+
+    producto = Producto.objects.con_galeria().filter(pk=producto_id).first()
+    if producto is None:
+        return  # Se eliminó mientras esperaba en la cola
+    # Una imagen dañada o un error del storage debe fallar la tarea: así se reintenta
+    if not procesar_producto(producto, forzar, lanzar_errores=True):
+        return
+    # Si mientras tanto el admin reemplazó la imagen, estos derivados ya no corresponden:
+    # el UPDATE no encuentra la fila y la tarea encolada por ese cambio genera los nuevos
+    Producto.objects.filter(pk=producto.pk, imagen=producto.imagen.name).update(
+        imagen_ancho=producto.imagen_ancho,
+        imagen_alto=producto.imagen_alto,
+        imagen_derivados=producto.imagen_derivados,
+        fecha_actualizacion=timezone.now(),
+    )
+    invalidar_catalogo()
+    programar_snapshot()
+
+
+@tarea("regenerar_snapshot")
+def snapshot_catalogo():
+    from .catalogo import generar_snapshot
+
+    generar_snapshot()
@@ -0,0 +1,39 @@
+"""
+Template tags para los bundles de estáticos (ver core/estaticos.py).
+Uso en templates:
+    {% load bundles %}
+    {% bundle_css 'tienda' %}
+    {% bundle_js 'tienda' %}
+Con ESTATICOS_OPTIMIZADOS=False se enlazan los archivos fuente por separado
+(cómodo para desarrollar); con True, el bundle minificado con hash en el nombre.
+"""
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+from core.estaticos import BUNDLES
+
+register = template.Library()
+
+
+def _archivos(nombre_bundle):
+    if settings.ESTATICOS_OPTIMIZADOS:
+        return [nombre_bundle]
+    return BUNDLES[nombre_bundle]
+
+
+@register.simple_tag
+def bundle_css(nombre):
+    return format_html_join(
+        "\n    ", '<link rel="stylesheet" href="{}">',
+        ((static(ruta),) for ruta in _archivos(f"css/{nombre}.min.css")),
+    )
+
+
+@register.simple_tag
+def bundle_js(nombre):
+    return format_html_join(
+        "\n    ", '<script src="{}"></script>',
+        ((static(ruta),) for ruta in _archivos(f"js/{nombre}.min.js")),
+    )
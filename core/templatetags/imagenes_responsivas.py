@@ -0,0 +1,78 @@
+"""
+Template tags para imágenes responsivas.
+Uso en templates:
+    {% load imagenes_responsivas %}
+    {% imagen_responsiva p clase="img-producto" sizes="(max-width: 600px) 50vw, 300px" %}
+"""
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+SIZES_POR_DEFECTO = "(max-width: 600px) 50vw, (max-width: 1024px) 33vw, 300px"
+
+
+def _srcset(variantes, formato):
+    """Arma el atributo srcset para las variantes de un formato"""
+    return ", ".join(
+        f"{default_storage.url(v['url'])} {v['ancho']}w"
+        for v in variantes if v["formato"] == formato
+    )
+
+
+def render_imagen(url, ancho, alto, variantes, alt="", clase="", sizes=SIZES_POR_DEFECTO):
+    """
+    Devuelve el HTML <picture> con un <source> por formato moderno y un <img>
+    con width/height (evita saltos de layout) y carga diferida.
+    """
+    formatos = []
+    for v in variantes or []:
+        if v["formato"] not in formatos:
+            formatos.append(v["formato"])
+
+    fuentes = format_html_join(
+        "",
+        '<source type="image/{}" srcset="{}" sizes="{}">',
+        ((fmt, _srcset(variantes, fmt), sizes) for fmt in formatos),
+    )
+
+    dimensiones = format_html(' width="{}" height="{}"', ancho, alto) if ancho and alto else ""
+
+    return format_html(
+        '<picture>{}<img src="{}" class="{}" alt="{}"{} loading="lazy" decoding="async" '
+        'onerror="this.onerror=null;this.src=\'{}\'"></picture>',
+        fuentes, url, clase, alt, dimensiones, static("img/no-image.png"),
+    )
+
+
+@register.simple_tag
+def imagen_responsiva(producto, clase="", sizes=SIZES_POR_DEFECTO):
+    """Imagen principal de un producto con srcset de sus variantes"""
+    if not producto.imagen:
+        return render_imagen(static("img/no-image.png"), None, None, [], producto.titulo, clase, sizes)
+
+    return render_imagen(
+        producto.imagen.url,
+        producto.imagen_ancho,
+        producto.imagen_alto,
+        producto.get_derivados_imagen(),
+        producto.titulo,
+        clase,
+        sizes,
+    )
+
+
+@register.simple_tag
+def imagen_adicional_responsiva(img, clase="", sizes=SIZES_POR_DEFECTO):
+    """Imagen adicional (ProductoImagen) con srcset de sus variantes"""
+    return render_imagen(
+        img.url,
+        img.ancho,
+        img.alto,
+        img.get_derivados(),
+        img.alt,
+        clase,
+        sizes,
+    )
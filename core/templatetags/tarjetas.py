@@ -0,0 +1,36 @@
+"""
+Claves del caché de fragmentos de las tarjetas del catálogo (home_tarjetas.html).
+Cada tarjeta se cachea por id + fecha_actualizacion del producto, y el grid
+por la lista de claves de sus tarjetas:
+    {% load cache tarjetas %}
+    {% segundos_cache_tarjetas as segundos %}
+    {% claves_tarjetas productos as claves %}
+    {% cache segundos grilla claves %}
+        {% for p in productos %}{% cache segundos tarjeta p|clave_tarjeta %}...{% endcache %}{% endfor %}
+    {% endcache %}
+Editar un producto cambia su fecha: se vuelve a renderizar esa tarjeta y los
+grids que la contienen, el resto sale del caché. Un deploy que cambia las
+plantillas cambia version_despliegue() y con ella todas las claves.
+"""
+from django import template
+from django.conf import settings
+
+from core.revalidacion import version_despliegue
+
+register = template.Library()
+
+
+@register.filter
+def clave_tarjeta(producto):
+    fecha = producto.fecha_actualizacion
+    return f"{version_despliegue()}:{producto.pk}:{fecha.timestamp() if fecha else 0}"
+
+
+@register.simple_tag
+def claves_tarjetas(productos):
+    return ",".join(clave_tarjeta(p) for p in productos)
+
+
+@register.simple_tag
+def segundos_cache_tarjetas():
+    return settings.CACHE_TARJETAS_SEGUNDOS
@@ -1,3 +1,975 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import Http404
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from naturalhome.settings import base_de_datos
+
+from . import instrumentacion, views, views_async
+from .busqueda import buscar, normalizar, reindexar_todo
+from .cache_catalogo import invalidar_catalogo
+from .catalogo import cambios_desde
+from .estaticos import CACHE_INMUTABLE, brotli, minificar_js, servir_estatico
+from .imagenes import FORMATOS_DERIVADOS
+from .models import Pedido, Producto, ProductoImagen, Tarea, calcular_precio_final
+from .paginacion import paginar
+from .pedidos import cotizar
+from .sesiones import purgar_si_corresponde
+from .tareas import ejecutar_tarea, encolar, procesar_imagenes, tarea, tomar_tareas
+from .templatetags.bundles import bundle_js
+from .templatetags.imagenes_responsivas import imagen_responsiva
+
+
+def crear_productos(cantidad, imagenes_por_producto=2):
+    """Crea productos con imagen principal, imágenes adicionales y algunos con descuento"""
+    productos = Producto.objects.bulk_create([
+        Producto(
+            titulo=f"Manzana {i}",
+            descripcion="Manzana roja de temporada",
+            precio=1000 + i,
+            unidad="kg",
+            categoria="frutas" if i % 2 else "verduras",
+            imagen=f"productos/manzana_{i}.jpg",
+            descuento_activo=i % 3 == 0,
+            porcentaje_descuento=10 if i % 3 == 0 else 0,
+        )
+        for i in range(cantidad)
+    ])
+    ProductoImagen.objects.bulk_create([
+        ProductoImagen(producto=p, imagen=f"productos/adicionales/{p.pk}_{orden}.jpg", orden=orden)
+        for p in productos
+        for orden in range(imagenes_por_producto)
+    ])
+    return productos
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False, CACHE_HOME_SEGUNDOS=0)
+class ConsultasPorVistaTests(TestCase):
+    """
+    La cantidad de consultas de cada vista no debe crecer con el tamaño del
+    catálogo: si un cambio en una plantilla o vista agrega un N+1, estos tests fallan.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def contar_consultas(self, url, cliente=None):
+        cliente = cliente or self.client
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = cliente.get(url)
+        self.assertEqual(respuesta.status_code, 200, url)
+        return len(capturadas.captured_queries)
+
+    def assertConsultasConstantes(self, url, cliente=None):
+        """Mismo número de consultas con un catálogo chico y con uno 10 veces más grande"""
+        crear_productos(5)
+        # Request previo: carga la sesión y los datos que se cachean una vez por proceso
+        self.contar_consultas(url, cliente)
+        cache.clear()
+        chico = self.contar_consultas(url, cliente)
+
+        crear_productos(50)
+        cache.clear()
+        grande = self.contar_consultas(url, cliente)
+
+        self.assertEqual(chico, grande, f"{url}: {chico} consultas con 5 productos, {grande} con 55")
+
+    def login_admin(self):
+        sesion = self.client.session
+        sesion["admin_logged_in"] = True
+        sesion.save()
+
+    @override_settings(EMBEBER_PRODUCTOS_HOME=True)
+    def test_home_con_datos_embebidos(self):
+        crear_productos(40)
+        # listado + galerías del listado + carrusel + galerías del carrusel + conteo + facetas
+        with self.assertNumQueries(6):
+            self.client.get("/")
+        # El conteo y las facetas quedan cacheados
+        with self.assertNumQueries(4):
+            self.client.get("/?page=2")
+
+    @override_settings(EMBEBER_PRODUCTOS_HOME=False)
+    def test_home_solo_tarjetas(self):
+        crear_productos(40)
+        # listado + carrusel + conteo + facetas
+        with self.assertNumQueries(4):
+            self.client.get("/")
+
+    def test_home_constante_con_filtros(self):
+        self.assertConsultasConstantes("/?categoria=frutas&orden=precio")
+
+    def test_home_busqueda_constante(self):
+        self.assertConsultasConstantes("/?q=manzana")
+
+    def test_home_cacheada_no_consulta(self):
+        crear_productos(10)
+        with override_settings(CACHE_HOME_SEGUNDOS=600):
+            self.client.get("/")
+            with self.assertNumQueries(0):
+                respuesta = self.client.get("/")
+        self.assertEqual(respuesta["X-Cache"], "HIT")
+
+    def test_admin_busqueda_constante(self):
+        self.login_admin()
+        self.assertConsultasConstantes("/admin/productos/?q=manzana")
+
+    def test_api_producto(self):
+        producto = crear_productos(20, imagenes_por_producto=5)[0]
+        # fecha para el ETag + producto + imágenes adicionales
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(f"/api/producto/{producto.pk}/")
+        self.assertEqual(len(respuesta.json()["imagenes"]), 6)
+
+        # Revalidación: solo la consulta de la fecha
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(f"/api/producto/{producto.pk}/", HTTP_IF_NONE_MATCH=respuesta["ETag"])
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_api_productos_lote_constante(self):
+        productos = crear_productos(30)
+        ids = ",".join(str(p.pk) for p in productos[:2])
+        with self.assertNumQueries(3):
+            self.client.get(f"/api/productos/?ids={ids}")
+
+        ids = ",".join(str(p.pk) for p in productos)
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(f"/api/productos/?ids={ids}")
+        self.assertEqual(len(respuesta.json()["productos"]), 30)
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False, CACHE_CDN_SEGUNDOS=60)
+class RevalidacionTests(TestCase):
+    """ETag del catálogo, 304 sin consultas, compresión y Cache-Control"""
+
+    def setUp(self):
+        cache.clear()
+        crear_productos(10)
+
+    def test_home_304_sin_consultas(self):
+        respuesta = self.client.get("/?categoria=frutas")
+        etag = respuesta["ETag"]
+        self.assertIn("public", respuesta["Cache-Control"])
+        self.assertIn("s-maxage=60", respuesta["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            respuesta = self.client.get("/?categoria=frutas", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertNotEqual(self.client.get("/?categoria=verduras")["ETag"], etag)
+
+        invalidar_catalogo()
+        self.assertEqual(self.client.get("/?categoria=frutas", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_compresion_conserva_revalidacion(self):
+        respuesta = self.client.get("/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(respuesta["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", respuesta["Vary"])
+        self.assertTrue(respuesta["ETag"].endswith('-gz"'))
+
+        revalidada = self.client.get("/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=respuesta["ETag"])
+        self.assertEqual(revalidada.status_code, 304)
+        self.assertEqual(revalidada["ETag"], respuesta["ETag"])
+
+    def test_admin_privado(self):
+        self.assertIn("private", self.client.get("/admin/")["Cache-Control"])
+
+
+class ServirMediosTests(TestCase):
+    """Entrega de MEDIA_ROOT con Range, GET condicional y caché por tipo de archivo"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        os.makedirs(os.path.join(self.directorio.name, "productos", "derivados"))
+        self.datos = bytes(range(256)) * 40
+        for nombre in ("productos/foto.jpg", "productos/derivados/foto_320w.0123456789.webp", "secreto.txt"):
+            with open(os.path.join(self.directorio.name, *nombre.split("/")), "wb") as archivo:
+                archivo.write(self.datos)
+        ajustes = override_settings(MEDIA_ROOT=self.directorio.name, MEDIA_SERVIDOR="django")
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_rango_y_revalidacion(self):
+        respuesta = self.client.get("/media/productos/foto.jpg", HTTP_RANGE="bytes=100-199")
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(respuesta["Content-Range"], f"bytes 100-199/{len(self.datos)}")
+        self.assertEqual(b"".join(respuesta.streaming_content), self.datos[100:200])
+
+        respuesta = self.client.get("/media/productos/foto.jpg", HTTP_IF_NONE_MATCH=respuesta["ETag"])
+        self.assertEqual(respuesta.status_code, 304)
+
+        respuesta = self.client.get("/media/productos/foto.jpg", HTTP_RANGE=f"bytes={len(self.datos)}-")
+        self.assertEqual(respuesta.status_code, 416)
+
+    def test_cache_y_acceso(self):
+        original = self.client.get("/media/productos/foto.jpg")
+        self.assertNotIn("immutable", original["Cache-Control"])
+        derivado = self.client.get("/media/productos/derivados/foto_320w.0123456789.webp")
+        self.assertIn("immutable", derivado["Cache-Control"])
+        self.assertEqual(self.client.get("/media/secreto.txt").status_code, 404)
+
+        with override_settings(MEDIA_SERVIDOR="x-accel"):
+            respuesta = self.client.get("/media/productos/foto.jpg")
+        self.assertEqual(respuesta["X-Accel-Redirect"], "/media-interna/productos/foto.jpg")
+        self.assertEqual(respuesta.content, b"")
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class LimpiarMediosTests(TestCase):
+    """Imágenes nombradas por contenido y recolección de huérfanos"""
+
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_misma_foto_un_solo_archivo(self):
+        a = Producto(titulo="A", precio=1)
+        a.imagen.save("manzana.JPG", ContentFile(b"foto"), save=False)
+        b = Producto(titulo="B", precio=1)
+        b.imagen.save("otra.jpg", ContentFile(b"foto"), save=False)
+        self.assertEqual(a.imagen.name, b.imagen.name)
+        self.assertTrue(a.imagen.name.endswith(".jpg"))
+        self.assertEqual(os.listdir(os.path.join(self.directorio.name, "productos")), [os.path.basename(a.imagen.name)])
+
+    def test_huerfanos_a_cuarentena(self):
+        producto = Producto(titulo="A", precio=1)
+        producto.imagen.save("a.jpg", ContentFile(b"usada"))
+        huerfana = ProductoImagen(producto=producto)
+        huerfana.imagen.save("b.jpg", ContentFile(b"huerfana"))
+        ruta = huerfana.imagen.path
+        huerfana.delete()
+
+        salida = StringIO()
+        call_command("limpiar_medios", "--gracia=0", stdout=salida)
+        self.assertIn("1 huérfanos en cuarentena: 8 B", salida.getvalue())
+        self.assertFalse(os.path.exists(ruta))
+        self.assertTrue(os.path.exists(producto.imagen.path))
+        self.assertTrue(os.path.isdir(os.path.join(self.directorio.name, ".cuarentena")))
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class ImportacionTests(TestCase):
+    """importar_catalogo / exportar: ida y vuelta sin perder datos"""
+
+    def importar(self, contenido, extension=".csv"):
+        with tempfile.NamedTemporaryFile("w", suffix=extension, delete=False, encoding="utf-8") as archivo:
+            archivo.write(contenido)
+        self.addCleanup(os.remove, archivo.name)
+        call_command("importar_catalogo", archivo.name, stdout=StringIO(), stderr=StringIO())
+
+    def test_importar_y_exportar(self):
+        self.importar(
+            "titulo,precio,unidad,categoria,descuento_activo,porcentaje_descuento\n"
+            "Manzana roja,\"1000,50\",kg,Frutas,si,10\n"
+            "Sin precio,,kg,frutas,,\n"
+            "Lechuga,500,unidad,verduras,,\n"
+        )
+        self.assertEqual(Producto.objects.count(), 2)
+        manzana = Producto.objects.get(titulo="Manzana roja")
+        self.assertEqual(str(manzana.precio_final), "900.45")
+        self.assertEqual(manzana.categoria, "frutas")
+
+        sesion = self.client.session
+        sesion["admin_logged_in"] = True
+        sesion.save()
+        respuesta = self.client.get("/admin/productos/exportar/?formato=jsonl")
+        exportado = b"".join(respuesta.streaming_content).decode()
+        self.assertEqual(len(exportado.splitlines()), 2)
+
+        # Reimportar con un precio cambiado actualiza por id sin crear filas
+        self.importar(exportado.replace('"precio": "500.00"', '"precio": "650.00"'), ".jsonl")
+        self.assertEqual(Producto.objects.count(), 2)
+        self.assertEqual(str(Producto.objects.get(titulo="Lechuga").precio_final), "650.00")
+
+    def test_reimportar_conserva_ids(self):
+        self.importar(
+            "id,titulo,precio\n"
+            "40,Manzana roja,1000\n"
+            "41,Lechuga,500\n"
+            "41,Lechuga repetida,600\n"
+        )
+        self.assertEqual(sorted(Producto.objects.values_list("id", "titulo")), [(40, "Manzana roja"), (41, "Lechuga")])
+        # Los productos nuevos siguen la numeración después de los importados
+        self.assertGreater(Producto.objects.create(titulo="Pera", precio=1).id, 41)
+        # El índice de búsqueda se reconstruye con los ids del archivo
+        self.assertEqual(list(buscar(Producto.objects.all(), "lechuga").values_list("id", flat=True)), [41])
+        self.assertEqual(reindexar_todo(), 3)
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class PreciosMasivosTests(TestCase):
+    """Acciones masivas: un solo UPDATE, vista previa sin cambios y precio_final al día"""
+
+    def setUp(self):
+        cache.clear()
+        crear_productos(12)
+        # bulk_create no indexa: la búsqueda necesita el índice FTS
+        reindexar_todo()
+        sesion = self.client.session
+        sesion["admin_logged_in"] = True
+        sesion.save()
+
+    def post(self, **datos):
+        return self.client.post("/admin/productos/precios/", datos)
+
+    def test_vista_previa_no_modifica(self):
+        antes = list(Producto.objects.values_list("precio", flat=True))
+        respuesta = self.post(alcance="categoria", categoria="frutas", accion="precio_porcentaje", valor="10", simular="1")
+        self.assertEqual(respuesta.json(), {"simulado": True, "afectados": 6})
+        self.assertEqual(list(Producto.objects.values_list("precio", flat=True)), antes)
+
+    def test_aumento_por_categoria_en_un_update(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.post(alcance="categoria", categoria="frutas", accion="precio_porcentaje", valor="10")
+        self.assertEqual(respuesta.json()["afectados"], 6)
+        updates = [q["sql"] for q in capturadas.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+
+        for p in Producto.objects.filter(categoria="frutas"):
+            i = int(p.titulo.split()[-1])
+            self.assertEqual(p.precio, (Decimal(1000 + i) * Decimal("1.1")).quantize(Decimal("0.01")))
+            self.assertEqual(p.precio_final, p.precio_con_descuento())
+
+    def test_descuento_por_busqueda_y_seleccion(self):
+        self.post(alcance="busqueda", q="manzana", accion="descuento_activar", valor="20")
+        self.assertEqual(Producto.objects.filter(porcentaje_descuento=20).count(), 12)
+
+        ids = list(Producto.objects.values_list("id", flat=True)[:3])
+        self.post(alcance="seleccion", ids=",".join(map(str, ids)), accion="descuento_desactivar")
+        for p in Producto.objects.filter(id__in=ids):
+            self.assertFalse(p.descuento_activo)
+            self.assertEqual(p.precio_final, p.precio)
+
+    def test_descuento_con_precios_no_redondos(self):
+        # 1001 al 15%: 850.85 (con división entera en SQLite se guardaba 851.00)
+        self.post(alcance="categoria", categoria="frutas", accion="descuento_activar", valor="15")
+        frutas = list(Producto.objects.filter(categoria="frutas"))
+        for p in frutas:
+            self.assertEqual(p.precio_final, calcular_precio_final(p.precio, True, 15), p.precio)
+        self.assertIn(Decimal("850.85"), [p.precio_final for p in frutas])
+
+        # El pedido cobra el mismo precio que muestra la tarjeta
+        producto = next(p for p in frutas if p.precio == Decimal("1001"))
+        linea = cotizar([{"id": producto.id, "cantidad": 1}])["lineas"][0]
+        self.assertEqual(linea["subtotal"], Decimal("850.85"))
+
+    def test_valor_invalido(self):
+        respuesta = self.post(alcance="categoria", categoria="frutas", accion="descuento_activar", valor="150")
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class PedidosTests(TestCase):
+    """Cotización del carrito y pedidos con precios del servidor en consultas constantes"""
+
+    def setUp(self):
+        self.productos = crear_productos(20, imagenes_por_producto=0)
+        Producto.objects.filter(id=self.productos[0].id).update(fraccionado=True)
+
+    def post(self, url, datos):
+        return self.client.post(url, datos, content_type="application/json")
+
+    def items(self, cantidad):
+        return [
+            {"id": p.id, "cantidad": 1500 if i == 0 else 2, "esFraccionado": i == 0, "precio": 1}
+            for i, p in enumerate(self.productos[:cantidad])
+        ]
+
+    def test_cotizar_con_descuento_y_gramos(self):
+        respuesta = self.post("/api/carrito/cotizar/", {"items": self.items(2) + [{"id": 99999, "cantidad": 1}]})
+        datos = respuesta.json()
+        # Producto 0: 1000 con 10% de descuento, 1,5 kg; producto 1: 1001 x 2
+        self.assertEqual([linea["subtotal"] for linea in datos["lineas"]], ["1350.00", "2002.00"])
+        self.assertEqual(datos["total"], "3352.00")
+        self.assertEqual(datos["no_disponibles"], [99999])
+        self.assertTrue(all(linea["precio_cambio"] for linea in datos["lineas"]))
+
+    def test_pedido_en_consultas_constantes(self):
+        cliente = {"nombre": "Ana", "telefono": "099123456", "direccion": "Calle 1", "metodoPago": "efectivo"}
+        consultas = []
+        for cantidad in (2, 20):
+            with CaptureQueriesContext(connection) as capturadas:
+                respuesta = self.post("/api/pedidos/", {"cliente": cliente, "items": self.items(cantidad)})
+            self.assertEqual(respuesta.status_code, 201)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+
+        pedido = Pedido.objects.get(id=respuesta.json()["pedido"])
+        self.assertEqual(pedido.items.count(), 20)
+        self.assertEqual(pedido.total, sum(item.subtotal for item in pedido.items.all()))
+        self.assertEqual(self.post("/api/pedidos/", {"cliente": cliente, "items": []}).status_code, 400)
+
+
+@tarea("prueba_falla")
+def _tarea_que_falla():
+    raise RuntimeError("sin conexión")
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False, TAREAS_INMEDIATAS=False, TAREAS_MAX_INTENTOS=2)
+class TareasTests(TestCase):
+    """Cola de tareas: el admin encola sin procesar, idempotencia y reintentos con backoff"""
+
+    def test_editar_encola_una_sola_tarea(self):
+        producto = crear_productos(1, imagenes_por_producto=0)[0]
+        Producto.objects.update(imagen="")
+        sesion = self.client.session
+        sesion["admin_logged_in"] = True
+        sesion.save()
+        datos = {"titulo": "Nuevo", "precio": "10", "unidad": "kg", "categoria": "frutas"}
+        for _ in range(3):
+            respuesta = self.client.post(f"/admin/productos/{producto.id}/editar/", datos)
+            self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(
+            list(Tarea.objects.values_list("tipo", "clave", "estado")),
+            [("procesar_imagenes", f"imagenes:{producto.id}", Tarea.PENDIENTE)],
+        )
+
+        [tomada] = tomar_tareas("prueba", 10)
+        self.assertEqual(tomar_tareas("otro", 10), [])
+        self.assertTrue(ejecutar_tarea(tomada.id))
+        self.assertEqual(self.client.get("/admin/tareas/").json()["estados"]["completada"], 1)
+
+    def test_reintentos_con_backoff(self):
+        encolar("prueba_falla", clave="x")
+        [tomada] = tomar_tareas("prueba", 10)
+        self.assertFalse(ejecutar_tarea(tomada.id))
+        tomada.refresh_from_db()
+        self.assertEqual((tomada.estado, tomada.intentos), (Tarea.PENDIENTE, 1))
+        self.assertIn("sin conexión", tomada.error)
+        # Espera antes del próximo intento
+        self.assertEqual(tomar_tareas("prueba", 10), [])
+
+        Tarea.objects.update(disponible_desde=tomada.fecha_creacion)
+        [tomada] = tomar_tareas("prueba", 10)
+        self.assertFalse(ejecutar_tarea(tomada.id))
+        tomada.refresh_from_db()
+        self.assertEqual((tomada.estado, tomada.intentos), (Tarea.FALLIDA, 2))
+
+    def test_error_de_imagen_se_reintenta(self):
+        producto = crear_productos(1, imagenes_por_producto=0)[0]
+        encolar("procesar_imagenes", clave="imagenes", max_intentos=2, producto_id=producto.id)
+        with mock.patch("core.imagenes.generar_derivados", side_effect=OSError("imagen dañada")):
+            [tomada] = tomar_tareas("prueba", 10)
+            self.assertFalse(ejecutar_tarea(tomada.id))
+            tomada.refresh_from_db()
+            self.assertEqual((tomada.estado, tomada.intentos), (Tarea.PENDIENTE, 1))
+            self.assertIn("imagen dañada", tomada.error)
+
+            Tarea.objects.update(disponible_desde=tomada.fecha_creacion)
+            [tomada] = tomar_tareas("prueba", 10)
+            self.assertFalse(ejecutar_tarea(tomada.id))
+        tomada.refresh_from_db()
+        self.assertEqual((tomada.estado, tomada.intentos), (Tarea.FALLIDA, 2))
+
+    def test_worker_exige_cache_compartida(self):
+        # Con LocMemCache la invalidación del worker no llegaría a los procesos web
+        with self.assertRaisesMessage(CommandError, "caché compartida"):
+            call_command("procesar_tareas", "--una-vez", stdout=StringIO())
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class FacetasTests(TestCase):
+    """Conteos de la barra de filtros en un solo GROUP BY, cacheados por versión del catálogo"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_conteos_de_la_busqueda(self):
+        crear_productos(9, imagenes_por_producto=0)
+        Producto.objects.filter(id=Producto.objects.order_by("id")[0].id).update(unidad="docena", titulo="Pera")
+        reindexar_todo()
+        invalidar_catalogo()
+
+        with self.assertNumQueries(1):
+            datos = self.client.get("/api/productos/facetas/").json()
+        self.assertEqual((datos["total"], datos["con_descuento"]), (9, 3))
+        self.assertEqual(datos["categorias"]["frutas"]["total"] + datos["categorias"]["verduras"]["total"], 9)
+        self.assertEqual(datos["categorias"]["combos"]["total"], 0)
+        self.assertEqual((datos["unidades"]["kg"]["total"], datos["unidades"]["docena"]["total"]), (8, 1))
+
+        # Cacheado hasta que cambia el catálogo
+        with self.assertNumQueries(0):
+            self.client.get("/api/productos/facetas/?page=2")
+        self.assertEqual(self.client.get("/api/productos/facetas/?q=pera").json()["total"], 1)
+
+        respuesta = self.client.get("/")
+        self.assertContains(respuesta, '<span class="filter-count" data-faceta="total">9</span>', html=False)
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False, EMBEBER_PRODUCTOS_HOME=True)
+class FragmentoHomeTests(TestCase):
+    """Fragmento del grid para filtrar y hacer scroll infinito sin recargar la página"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_paginas_por_cursor_hasta_el_final(self):
+        crear_productos(45, imagenes_por_producto=0)
+        completa = self.client.get("/?categoria=frutas")
+        siguiente = completa.context["siguiente"]
+        self.assertIn("cursor=", siguiente)
+
+        vistos = []
+        while siguiente:
+            datos = self.client.get(f"/api/productos/fragmento/?{siguiente}").json()
+            self.assertNotIn("<html", datos["html"])
+            self.assertNotIn("facetas", datos)
+            vistos += [int(pk) for pk in datos["productos"]]
+            siguiente = datos["siguiente"]
+        frutas = Producto.objects.filter(categoria="frutas").count()
+        # 20 en la página completa y el resto en los fragmentos, sin repetidos
+        self.assertEqual(len(set(vistos)), frutas - 20)
+
+        primera = self.client.get("/api/productos/fragmento/?categoria=frutas")
+        self.assertEqual(primera.json()["facetas"]["total"], 45)
+        self.assertLess(len(primera.content), len(completa.content) / 2)
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False, CACHE_HOME_SEGUNDOS=0, EMBEBER_PRODUCTOS_HOME=False)
+class CacheTarjetasTests(TestCase):
+    """Cada tarjeta se cachea por id + fecha_actualizacion: editar un producto renderiza solo esa"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_editar_un_producto_renderiza_solo_su_tarjeta(self):
+        editado, sin_tocar = crear_productos(2, imagenes_por_producto=0)
+        self.client.get("/")
+
+        editado.titulo = "Kiwi editado"
+        editado.save()
+        # Cambio sin fecha nueva: si la tarjeta se volviera a renderizar, se vería
+        Producto.objects.filter(id=sin_tocar.id).update(titulo="No debería verse")
+
+        respuesta = self.client.get("/")
+        self.assertContains(respuesta, "Kiwi editado")
+        self.assertContains(respuesta, sin_tocar.titulo)
+        self.assertNotContains(respuesta, "No debería verse")
+
+
+class PrecioFinalTests(TestCase):
+    """precio_final calculado en SQL (update) igual que en Python (save), también con precios enteros"""
+
+    def test_update_igual_que_save(self):
+        casos = [("10.00", 15), ("7", 33), ("1001.00", 15), ("10.05", 50), ("3465.75", 94), ("1550.34", 75)]
+        for precio, porcentaje in casos:
+            guardado = Producto.objects.create(
+                titulo="Con save", precio=precio, unidad="kg", categoria="frutas",
+                descuento_activo=True, porcentaje_descuento=porcentaje,
+            )
+            actualizado = Producto.objects.create(titulo="Con update", precio=precio, unidad="kg", categoria="frutas")
+            Producto.objects.filter(id=actualizado.id).update(descuento_activo=True, porcentaje_descuento=porcentaje)
+            guardado.refresh_from_db()
+            actualizado.refresh_from_db()
+            esperado = calcular_precio_final(precio, True, porcentaje)
+            self.assertEqual(guardado.precio_final, esperado, precio)
+            self.assertEqual(actualizado.precio_final, esperado, precio)
+
+
+class InstrumentacionTests(TestCase):
+    """Server-Timing y agregación por endpoint de core/instrumentacion.py"""
+
+    def setUp(self):
+        instrumentacion._minutos.clear()
+        instrumentacion._lentos_por_minuto.clear()
+
+    def test_rutas_inexistentes_comparten_endpoint(self):
+        for ruta in ("/wp-login.php", "/no-existe/1/", "/no-existe/2/"):
+            self.assertEqual(self.client.get(ruta).status_code, 404)
+        self.assertEqual(
+            [(r["endpoint"], r["requests"]) for r in instrumentacion.peores_endpoints()],
+            [(instrumentacion.SIN_RUTA, 3)],
+        )
+
+    @override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+    def test_server_timing(self):
+        cache.clear()
+        crear_productos(2)
+        respuesta = self.client.get("/")
+        self.assertRegex(
+            respuesta["Server-Timing"],
+            r'^sql;dur=[\d.]+;desc="[1-9]\d* consultas", tpl;dur=[\d.]+, '
+            r'storage;dur=[\d.]+;desc="\d+ llamadas", total;dur=[\d.]+$',
+        )
+        self.assertEqual([r["endpoint"] for r in instrumentacion.peores_endpoints()], ["home"])
+
+    @override_settings(REQUEST_LENTO_MS=0)
+    def test_log_lento_con_la_ruta(self):
+        with self.assertLogs("core.lento", "WARNING") as registro:
+            self.client.get("/no-existe/?x=1")
+        linea = json.loads(registro.records[0].getMessage())
+        self.assertEqual((linea["endpoint"], linea["ruta"]), (instrumentacion.SIN_RUTA, "/no-existe/?x=1"))
+
+
+def imagen_jpeg(ancho, alto):
+    buffer = BytesIO()
+    Image.new("RGB", (ancho, alto), (200, 40, 40)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+class MediaTemporalMixin:
+    """MEDIA_ROOT en un directorio temporal que se borra al terminar el test"""
+
+    def setUp(self):
+        super().setUp()
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=self.directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class DerivadosTests(MediaTemporalMixin, TestCase):
+    """Variantes responsivas: anchos fijos sin ampliar, nombre por contenido y srcset"""
+
+    def test_variantes_de_la_imagen_principal(self):
+        producto = Producto(titulo="Manzana", precio=1)
+        producto.imagen.save("manzana.jpg", ContentFile(imagen_jpeg(800, 600)))
+        procesar_imagenes(producto.id)
+
+        producto.refresh_from_db()
+        variantes = producto.get_derivados_imagen()
+        self.assertEqual((producto.imagen_ancho, producto.imagen_alto), (800, 600))
+        # 1024 es más ancho que el original: se usa el original
+        self.assertEqual(
+            sorted((v["ancho"], v["alto"], v["formato"]) for v in variantes),
+            sorted((a, h, f) for a, h in ((320, 240), (640, 480), (800, 600)) for f in FORMATOS_DERIVADOS),
+        )
+        for v in variantes:
+            self.assertRegex(v["url"], r"^productos/derivados/.+_\d+w\.[0-9a-f]{10}\.(webp|avif)$")
+            self.assertTrue(default_storage.exists(v["url"]))
+
+        html = imagen_responsiva(producto)
+        self.assertIn('width="800" height="600"', html)
+        self.assertIn(f'{default_storage.url(variantes[0]["url"])} {variantes[0]["ancho"]}w', html)
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class SubidaImagenesTests(MediaTemporalMixin, TestCase):
+    """Subidas multipart: cada archivo se valida al llegar y los inválidos se descartan"""
+
+    def setUp(self):
+        super().setUp()
+        sesion = self.client.session
+        sesion["admin_logged_in"] = True
+        sesion.save()
+
+    def datos(self, **archivos):
+        return {"titulo": "Pera", "precio": "10", "unidad": "kg", "categoria": "frutas", **archivos}
+
+    def test_descarta_adicionales_invalidas(self):
+        respuesta = self.client.post("/admin/productos/nuevo/", self.datos(
+            imagen=SimpleUploadedFile("pera.jpg", imagen_jpeg(40, 30)),
+            imagenes_adicionales=[
+                SimpleUploadedFile("detalle.jpg", imagen_jpeg(20, 20)),
+                SimpleUploadedFile("falsa.jpg", b"no es una imagen" * 100),
+            ],
+        ), follow=True)
+        producto = Producto.objects.get(titulo="Pera")
+        self.assertEqual(producto.imagenes.count(), 1)
+        # El admin ve qué imagen no se guardó
+        self.assertContains(respuesta, "Imagen no guardada: falsa.jpg: no es una imagen válida")
+
+    @override_settings(MAX_TAMANO_IMAGEN=1000)
+    def test_imagen_demasiado_grande(self):
+        respuesta = self.client.post("/admin/productos/nuevo/", self.datos(
+            imagen=SimpleUploadedFile("pera.jpg", imagen_jpeg(40, 30) + b"\0" * 2000),
+        ))
+        self.assertContains(respuesta, "supera el tamaño máximo permitido")
+        self.assertFalse(Producto.objects.exists())
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class BusquedaTests(TestCase):
+    """FTS5: plegado de acentos y mayúsculas, prefijos y relevancia por columna"""
+
+    def setUp(self):
+        Producto.objects.create(titulo="Plátano maduro", precio=1, categoria="frutas")
+        Producto.objects.create(titulo="Licuado", descripcion="Leche con plátano", precio=1, categoria="otros")
+        Producto.objects.create(titulo="Lechuga", precio=1, categoria="verduras")
+
+    def titulos(self, query):
+        return list(buscar(Producto.objects.all(), query).values_list("titulo", flat=True))
+
+    def test_acentos_y_prefijos(self):
+        # El título pesa más que la descripción, aunque Licuado sea más nuevo
+        for query in ("platano", "PLÁTANO", "plat"):
+            self.assertEqual(self.titulos(query), ["Plátano maduro", "Licuado"], query)
+
+    def test_todos_los_terminos_y_categoria(self):
+        self.assertEqual(self.titulos("platano leche"), ["Licuado"])
+        self.assertEqual(self.titulos("verdura"), ["Lechuga"])
+        self.assertEqual(self.titulos("kiwi"), [])
+
+    def test_respaldo_sin_fts(self):
+        # Bases sin FTS5: icontains, y con unaccent (PostgreSQL) también sin acentos.
+        # En SQLite se simula UNACCENT con una función registrada en la conexión
+        connection.ensure_connection()
+        connection.connection.create_function("UNACCENT", 1, normalizar)
+        with mock.patch("core.busqueda.fts_disponible", return_value=False):
+            with mock.patch("core.busqueda.unaccent_disponible", return_value=False):
+                self.assertEqual(self.titulos("platano"), [])
+                self.assertEqual(sorted(self.titulos("Plátano")), ["Licuado", "Plátano maduro"])
+            with mock.patch("core.busqueda.unaccent_disponible", return_value=True):
+                self.assertEqual(sorted(self.titulos("PLATANO")), ["Licuado", "Plátano maduro"])
+                self.assertEqual(self.titulos("fruta"), ["Plátano maduro"])
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class SincronizacionTests(MediaTemporalMixin, TestCase):
+    """Snapshot del catálogo y /api/productos/cambios/?desde=<versión>"""
+
+    def cambios(self, desde):
+        respuesta = self.client.get(f"/api/productos/cambios/?desde={desde}")
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_snapshot(self):
+        crear_productos(3, imagenes_por_producto=0)
+        url = self.client.get("/api/productos/cambios/").json()["snapshot"]
+        with default_storage.open(url.removeprefix(settings.MEDIA_URL)) as archivo:
+            snapshot = json.load(archivo)
+        self.assertEqual(len(snapshot["productos"]), 3)
+        # Sin cambios desde el snapshot, el delta está vacío
+        self.assertEqual(self.cambios(snapshot["version"])["productos"], [])
+
+    def test_solo_modificados_y_eliminados(self):
+        a, b, c = crear_productos(3, imagenes_por_producto=0)
+        inicial = self.cambios(0)
+        self.assertEqual(len(inicial["productos"]), 3)
+        version = inicial["version"]
+        self.assertEqual(self.cambios(version), {"version": version, "productos": [], "eliminados": []})
+
+        a.titulo = "Manzana verde"
+        a.save()
+        eliminado = c.id
+        c.delete()
+        delta = self.cambios(version)
+        self.assertEqual([p["titulo"] for p in delta["productos"]], ["Manzana verde"])
+        self.assertEqual(delta["eliminados"], [eliminado])
+        self.assertGreater(delta["version"], version)
+
+        self.assertEqual(self.client.get("/api/productos/cambios/?desde=ayer").status_code, 400)
+
+
+class PaginacionCursorTests(TestCase):
+    """Keyset: las páginas siguientes no usan OFFSET ni se corren con productos nuevos"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_recorrer_con_cursores(self):
+        ids = sorted((p.id for p in crear_productos(25, imagenes_por_producto=0)), reverse=True)
+        productos = Producto.objects.order_by("-id")
+        pagina = paginar(productos, 10)
+        vistos = [p.id for p in pagina]
+
+        crear_productos(1, imagenes_por_producto=0)
+        while pagina.cursor_siguiente:
+            with CaptureQueriesContext(connection) as capturadas:
+                pagina = paginar(productos, 10, cursor=pagina.cursor_siguiente)
+            self.assertNotIn("OFFSET", capturadas.captured_queries[-1]["sql"])
+            vistos += [p.id for p in pagina]
+        self.assertEqual(vistos, ids)
+        self.assertEqual((pagina.number, pagina.start_index(), pagina.has_next()), (3, 21, False))
+
+        anterior = paginar(productos, 10, cursor=pagina.cursor_anterior)
+        self.assertEqual([p.id for p in anterior], ids[10:20])
+        self.assertEqual(anterior.number, 2)
+
+    def test_cursor_alterado(self):
+        crear_productos(15, imagenes_por_producto=0)
+        pagina = paginar(Producto.objects.order_by("-id"), 10)
+        alterado = pagina.cursor_siguiente[:-1] + ("A" if pagina.cursor_siguiente[-1] != "A" else "B")
+        self.assertEqual(paginar(Producto.objects.order_by("-id"), 10, cursor=alterado).number, 1)
+
+
+class SesionesTests(TestCase):
+    """Las sesiones vencidas se purgan como mucho una vez por SESSION_PURGA_SEGUNDOS"""
+
+    def crear_sesion(self, clave, dias):
+        Session.objects.create(session_key=clave, session_data="", expire_date=timezone.now() + timedelta(days=dias))
+
+    @override_settings(SESSION_PURGA_SEGUNDOS=3600)
+    def test_purga_limitada(self):
+        cache.clear()
+        self.crear_sesion("vencida", -1)
+        self.crear_sesion("vigente", 1)
+        self.assertTrue(purgar_si_corresponde())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["vigente"])
+
+        self.crear_sesion("otra", -1)
+        self.assertFalse(purgar_si_corresponde())
+        self.assertTrue(Session.objects.filter(session_key="otra").exists())
+
+    def test_cache_de_sesiones_compartida(self):
+        # Si default es compartida (varios procesos), las sesiones cacheadas también
+        self.assertEqual(settings.CACHES["sesiones"]["BACKEND"], settings.CACHES["default"]["BACKEND"])
+        self.assertEqual(settings.CACHES["sesiones"]["LOCATION"], settings.CACHES["default"]["LOCATION"])
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False, EMBEBER_PRODUCTOS_HOME=True)
+class VistasAsyncTests(TestCase):
+    """Las vistas async devuelven lo mismo que las sync"""
+
+    def setUp(self):
+        cache.clear()
+        self.producto = crear_productos(3)[0]
+
+    def danar_fecha(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE core_producto SET fecha_actualizacion = 'fecha_actualizacion' WHERE id = %s", [self.producto.id]
+            )
+
+    async def test_api_producto(self):
+        ruta = f"/api/producto/{self.producto.id}/"
+        asincrona = await views_async.api_producto_async(AsyncRequestFactory().get(ruta), id=self.producto.id)
+        sincrona = await sync_to_async(views.api_producto)(RequestFactory().get(ruta), id=self.producto.id)
+        self.assertEqual(asincrona.status_code, 200)
+        self.assertEqual(json.loads(asincrona.content), json.loads(sincrona.content))
+        self.assertEqual(asincrona["ETag"], sincrona["ETag"])
+
+    async def test_api_producto_sin_fecha(self):
+        # Datos viejos sin fecha_actualizacion válida: 200 sin ETag, como la vista sync (no 404)
+        await sync_to_async(self.danar_fecha)()
+        ruta = f"/api/producto/{self.producto.id}/"
+        asincrona = await views_async.api_producto_async(AsyncRequestFactory().get(ruta), id=self.producto.id)
+        sincrona = await sync_to_async(views.api_producto)(RequestFactory().get(ruta), id=self.producto.id)
+        self.assertEqual((asincrona.status_code, sincrona.status_code), (200, 200))
+        self.assertFalse(asincrona.has_header("ETag") or sincrona.has_header("ETag"))
+        with self.assertRaises(Http404):
+            await views_async.api_producto_async(AsyncRequestFactory().get("/api/producto/0/"), id=0)
+
+    async def test_home_cacheada(self):
+        primera = await views_async.home_async(AsyncRequestFactory().get("/"))
+        segunda = await views_async.home_async(AsyncRequestFactory().get("/"))
+        self.assertEqual((primera["X-Cache"], segunda["X-Cache"]), ("MISS", "HIT"))
+        self.assertEqual(primera.content, segunda.content)
+        self.assertContains(primera, self.producto.titulo)
+
+
+class EstaticosTests(TestCase):
+    """Bundles minificados con hash en el nombre, precomprimidos y con caché inmutable"""
+
+    def test_minificar_js_respeta_cadenas_y_regex(self):
+        codigo = (
+            "// comentario\n"
+            "var url = 'http://x/*no*/';\n"
+            "    var r = /\\/\\/ruta/g; /* bloque */\n"
+            "var t = `a  // b`;\n"
+        )
+        self.assertEqual(
+            minificar_js(codigo),
+            "var url = 'http://x/*no*/';\nvar r = /\\/\\/ruta/g;\nvar t = `a  // b`;\n",
+        )
+
+    def test_collectstatic(self):
+        destino = tempfile.TemporaryDirectory()
+        self.addCleanup(destino.cleanup)
+        almacenamiento = {**settings.STORAGES, "staticfiles": {"BACKEND": "core.estaticos.AlmacenamientoEstaticos"}}
+        with override_settings(STATIC_ROOT=destino.name, STORAGES=almacenamiento, ESTATICOS_OPTIMIZADOS=True):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            nombre = staticfiles_storage.stored_name("js/tienda.min.js")
+            self.assertRegex(nombre, r"^js/tienda\.min\.[0-9a-f]{12}\.js$")
+            self.assertIn(nombre, bundle_js("tienda"))
+
+            self.assertTrue(os.path.isfile(os.path.join(destino.name, nombre + ".gz")))
+            if not brotli:
+                # Sin el paquete brotli no se genera el .br: uno de prueba para elegir entre los dos
+                with open(os.path.join(destino.name, nombre + ".br"), "wb") as archivo:
+                    archivo.write(b"br")
+
+            respuesta = servir_estatico(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip, br"), nombre)
+            respuesta.close()
+            self.assertEqual(respuesta["Content-Encoding"], "br")
+            self.assertEqual(respuesta["Cache-Control"], CACHE_INMUTABLE)
+
+            # q=0 rechaza brotli aunque exista el .br
+            respuesta = servir_estatico(RequestFactory().get("/", HTTP_ACCEPT_ENCODING="br;q=0, gzip"), nombre)
+            respuesta.close()
+            self.assertEqual(respuesta["Content-Encoding"], "gzip")
+
+
+class BaseDeDatosTests(TestCase):
+    """Perfiles de base de datos (naturalhome/settings.py: base_de_datos)"""
+
+    def test_pragmas_sqlite(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Solo SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute("PRAGMA temp_store")
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+    def test_postgresql_con_pool(self):
+        entorno = {"PRUEBA_MOTOR": "postgresql", "PRUEBA_POOL": "True", "PRUEBA_POOL_MAX": "4"}
+        with mock.patch.dict(os.environ, entorno):
+            configuracion = base_de_datos("PRUEBA_")
+        self.assertEqual(configuracion["ENGINE"], "django.db.backends.postgresql")
+        # Con pool las conexiones no se mantienen abiertas entre requests
+        self.assertEqual(configuracion["CONN_MAX_AGE"], 0)
+        self.assertEqual(configuracion["OPTIONS"]["pool"]["max_size"], 4)
+
+        with mock.patch.dict(os.environ, {"PRUEBA_MOTOR": "mysql"}), self.assertRaises(ValueError):
+            base_de_datos("PRUEBA_")
+
+
+@override_settings(CATALOGO_SNAPSHOT_AUTOMATICO=False)
+class FechaActualizacionTests(TestCase):
+    """Productos con fecha_actualizacion inválida (el texto que quedó en db.sqlite3) y su corrección"""
+
+    def setUp(self):
+        self.productos = crear_productos(3, imagenes_por_producto=0)
+        self.danado = self.productos[0]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE core_producto SET fecha_actualizacion = 'fecha_actualizacion' WHERE id = %s", [self.danado.id]
+            )
+
+    def completar_fechas(self):
+        migracion = import_module("core.migrations.0016_completar_fecha_actualizacion")
+        migracion.completar_fechas(django_apps, SimpleNamespace(connection=connection))
+
+    def test_lote_sin_fecha(self):
+        ids = ",".join(str(p.id) for p in self.productos)
+        respuesta = self.client.get(f"/api/productos/?ids={ids}")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.has_header("ETag"))
+
+        self.completar_fechas()
+        self.assertIsNotNone(Producto.objects.get(id=self.danado.id).fecha_actualizacion)
+        self.assertNotEqual(self.client.get(f"/api/productos/?ids={ids}")["ETag"], respuesta["ETag"])
+
+    def test_cambios_con_fecha_corregida(self):
+        self.completar_fechas()
+        modificados, eliminados, version = cambios_desde(0)
+        self.assertEqual(len(modificados), 3)
+        # Con el texto viejo la comparación era de cadenas y el producto volvía en cada delta
+        self.assertEqual(cambios_desde(version), ([], [], version))
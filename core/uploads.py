@@ -0,0 +1,99 @@
+"""
+Manejo de subidas de imágenes en streaming para Natural Home.
+Cada archivo del formulario multipart se escribe a disco por partes (nunca
+se carga completo en memoria) y se valida con Pillow a medida que llega.
+"""
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from PIL import Image
+
+# Campos del formulario que deben contener imágenes
+CAMPOS_IMAGEN = ("imagen", "imagenes_adicionales")
+
+FORMATOS_PERMITIDOS = ("JPEG", "PNG", "GIF", "WEBP", "AVIF", "MPO")
+
+# Si la cabecera no se pudo leer en estos primeros bytes, el archivo no es una imagen válida
+BYTES_MAXIMOS_CABECERA = 256 * 1024
+
+
+class ImagenUploadHandler(TemporaryFileUploadHandler):
+    """
+    Escribe cada archivo subido a un temporal en disco y, para los campos de
+    imagen, aplica el límite de tamaño por archivo y valida la cabecera con
+    Pillow de forma incremental. Los archivos rechazados se descartan y el
+    motivo queda en request.errores_subida.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        if request is not None and not hasattr(request, "errores_subida"):
+            request.errores_subida = []
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.es_imagen = field_name in CAMPOS_IMAGEN
+        self.bytes_recibidos = 0
+        self.cabecera = BytesIO() if self.es_imagen else None
+        self.imagen_valida = not self.es_imagen
+
+        content_length = self.content_length
+        if self.es_imagen and content_length and content_length > settings.MAX_TAMANO_IMAGEN:
+            self._rechazar("supera el tamaño máximo permitido")
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.es_imagen:
+            self.bytes_recibidos += len(raw_data)
+            if self.bytes_recibidos > settings.MAX_TAMANO_IMAGEN:
+                self._rechazar("supera el tamaño máximo permitido")
+            if not self.imagen_valida:
+                self._validar_cabecera(raw_data)
+
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.imagen_valida:
+            # El archivo terminó sin una cabecera de imagen reconocible
+            self.file.close()
+            self._registrar_error("no es una imagen válida")
+            return None
+        return super().file_complete(file_size)
+
+    def _validar_cabecera(self, datos):
+        """
+        Acumula los primeros bytes del archivo hasta que Pillow reconoce el
+        formato y las dimensiones. Image.open solo lee la cabecera, así que
+        nunca se decodifican los píxeles ni se guarda más que BYTES_MAXIMOS_CABECERA.
+        """
+        self.cabecera.write(datos)
+        self.cabecera.seek(0)
+        try:
+            imagen = Image.open(self.cabecera)
+            formato, (ancho, alto) = imagen.format, imagen.size
+        except Image.DecompressionBombError:
+            self._rechazar("tiene dimensiones demasiado grandes")
+        except Exception:
+            # Cabecera incompleta: esperar más datos
+            self.cabecera.seek(0, 2)
+            if self.bytes_recibidos > BYTES_MAXIMOS_CABECERA:
+                self._rechazar("no es una imagen válida")
+            return
+
+        if formato not in FORMATOS_PERMITIDOS:
+            self._rechazar(f"formato {formato} no permitido")
+        if Image.MAX_IMAGE_PIXELS and ancho * alto > Image.MAX_IMAGE_PIXELS:
+            self._rechazar("tiene dimensiones demasiado grandes")
+
+        # Cabecera validada: liberar el buffer
+        self.imagen_valida = True
+        self.cabecera = None
+
+    def _registrar_error(self, motivo):
+        if self.request is not None:
+            self.request.errores_subida.append(f"{self.file_name}: {motivo}")
+
+    def _rechazar(self, motivo):
+        self._registrar_error(motivo)
+        self.cabecera = None
+        raise SkipFile(motivo)
@@ -1,18 +1,35 @@
 from django.urls import path
 from . import views
 from django.conf import settings
-from django.conf.urls.static import static
+
+# Con un servidor ASGI, el catálogo y la API de producto usan las vistas async
+if settings.VISTAS_ASYNC:
+    from . import views_async
+    vista_home = views_async.home_async
+    vista_api_producto = views_async.api_producto_async
+else:
+    vista_home = views.home
+    vista_api_producto = views.api_producto
 
 urlpatterns = [
-    path("", views.home, name="home"),
+    path("", vista_home, name="home"),
     path("admin/", views.admin_login, name="admin_login"),
     path("admin/logout/", views.admin_logout, name="admin_logout"),
     path("admin/productos/", views.admin_products, name="admin_products"),
     path("admin/productos/nuevo/", views.admin_new, name="admin_new"),
     path("admin/productos/<int:id>/editar/", views.admin_edit, name="admin_edit"),
     path("admin/productos/<int:id>/eliminar/", views.admin_delete, name="admin_delete"),
-    path("api/producto/<int:id>/", views.api_producto, name="api_producto"),
+    path("admin/productos/exportar/", views.admin_exportar, name="admin_exportar"),
+    path("admin/productos/precios/", views.admin_precios_masivos, name="admin_precios_masivos"),
+    path("admin/cache/", views.admin_cache_estadisticas, name="admin_cache_estadisticas"),
+    path("admin/rendimiento/", views.admin_rendimiento, name="admin_rendimiento"),
+    path("admin/tareas/", views.admin_tareas, name="admin_tareas"),
+    path("admin/tareas/<int:id>/reintentar/", views.admin_tarea_reintentar, name="admin_tarea_reintentar"),
+    path("api/producto/<int:id>/", vista_api_producto, name="api_producto"),
+    path("api/productos/", views.api_productos, name="api_productos"),
+    path("api/productos/fragmento/", views.home_fragmento, name="home_fragmento"),
+    path("api/productos/facetas/", views.api_facetas, name="api_facetas"),
+    path("api/productos/cambios/", views.api_productos_cambios, name="api_productos_cambios"),
+    path("api/carrito/cotizar/", views.api_carrito_cotizar, name="api_carrito_cotizar"),
+    path("api/pedidos/", views.api_pedidos, name="api_pedidos"),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
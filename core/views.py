@@ -1,16 +1,41 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from .models import Producto
-from django.db.models import Q
-from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+from .models import Producto, ProductoImagen
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+import os
 import json
-import base64
-from django.core.files.base import ContentFile
+import hashlib
 from django.core.files.storage import default_storage
 from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
-from django.contrib.sessions.backends.db import SessionStore
+from django.views.decorators.http import require_POST, condition
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.csrf import csrf_exempt
+from .tareas import encolar_imagenes, estado_cola, reintentar
+from .busqueda import buscar
+from .facetas import facetas
+from .paginacion import paginar
+from .instrumentacion import peores_endpoints
+from .serializacion import datos_producto, etag_producto
+from .catalogo import cambios_desde, generar_snapshot, snapshot_actual
+from .importacion import FORMATOS as FORMATOS_EXPORTACION, exportar
+from .precios import ACCIONES, aplicar_accion, cambios_accion, productos_alcance
+from .pedidos import cotizar, registrar_pedido, resumen_pedido
+from .revalidacion import revalidar_catalogo
+from .cache_catalogo import (
+    clave_pagina, obtener_pagina, guardar_pagina, invalidar_catalogo, estadisticas,
+)
+
+# Máximo de productos por pedido a /api/productos/
+MAX_PRODUCTOS_LOTE = 100
+
+# Órdenes disponibles en el catálogo (?orden=precio / ?orden=-precio)
+ORDENES_HOME = {
+    'precio': 'precio_final',
+    '-precio': '-precio_final',
+}
 
 def login_required_admin(view_func):
     """Decorador personalizado para verificar si el usuario está logueado como admin"""
@@ -46,35 +71,98 @@ def admin_login(request):
 
 def admin_logout(request):
     """Vista para logout del admin"""
-    if 'admin_logged_in' in request.session:
-        del request.session['admin_logged_in']
-    if 'admin_username' in request.session:
-        del request.session['admin_username']
-    request.session.save()
+    # flush() borra la sesión del almacenamiento en lugar de dejar una fila vacía
+    request.session.flush()
     return redirect('admin_login')
 
+def guardar_imagenes_adicionales(request, producto, inicio=0):
+    """
+    Crea una ProductoImagen por cada imagen adicional subida como parte del
+    formulario multipart. Los archivos ya llegan validados y escritos a disco
+    por core.uploads.ImagenUploadHandler, así que se copian por bloques.
+    Las imágenes rechazadas o que no se pudieron guardar se informan al admin
+    con un mensaje en el listado de productos.
+    """
+    errores = list(getattr(request, 'errores_subida', []))
+
+    nuevas = []
+    archivos = request.FILES.getlist('imagenes_adicionales')
+    if len(archivos) > settings.MAX_IMAGENES_ADICIONALES:
+        errores.append(
+            f"se guardaron las primeras {settings.MAX_IMAGENES_ADICIONALES} imágenes adicionales, "
+            f"{len(archivos) - settings.MAX_IMAGENES_ADICIONALES} quedaron afuera"
+        )
+    for archivo in archivos[:settings.MAX_IMAGENES_ADICIONALES]:
+        ext = os.path.splitext(archivo.name)[1].lower().lstrip('.') or 'jpg'
+        orden = inicio + len(nuevas)
+
+        # El storage nombra el archivo por su contenido: solo importa la extensión
+        filename = f"additional_{producto.id}.{ext}"
+
+        try:
+            img = ProductoImagen(producto=producto, orden=orden)
+            img.imagen.save(filename, archivo, save=False)
+            nuevas.append(img)
+        except Exception as e:
+            print(f"Error guardando imagen adicional {archivo.name}: {e}")
+            errores.append(f"{archivo.name}: no se pudo guardar")
+
+    for error in errores:
+        messages.error(request, f"Imagen no guardada: {error}")
+
+    return ProductoImagen.objects.bulk_create(nuevas)
+
+def actualizar_imagenes_existentes(request, producto):
+    """
+    Aplica las bajas, el orden y el texto alternativo enviados desde admin_edit.
+    Solo se escriben las filas que cambiaron. Devuelve el siguiente orden libre.
+    """
+    a_eliminar = []
+    a_actualizar = []
+    siguiente_orden = 0
+
+    for img in producto.get_imagenes_adicionales():
+        if request.POST.get(f"keep_additional_image_{img.id}", "1") != "1":
+            a_eliminar.append(img)
+            continue
+
+        orden_raw = request.POST.get(f"orden_imagen_{img.id}", "").strip()
+        orden = int(orden_raw) if orden_raw.isdigit() else img.orden
+        alt = request.POST.get(f"alt_imagen_{img.id}", img.alt).strip()[:200]
+
+        if orden != img.orden or alt != img.alt:
+            img.orden = orden
+            img.alt = alt
+            a_actualizar.append(img)
+        siguiente_orden = max(siguiente_orden, orden + 1)
+
+    if a_eliminar:
+        # Los archivos quedan en disco (pueden estar compartidos): los retira limpiar_medios
+        ProductoImagen.objects.filter(id__in=[img.id for img in a_eliminar]).delete()
+
+    if a_actualizar:
+        ProductoImagen.objects.bulk_update(a_actualizar, ["orden", "alt"])
+
+    return siguiente_orden
+
 @login_required_admin
 def admin_products(request):
     # Búsqueda en admin
     query = request.GET.get('q', '')
-    productos_list = Producto.objects.all()
+    productos_list = Producto.objects.para_tarjetas()
     
     if query:
-        productos_list = productos_list.filter(
-            Q(titulo__icontains=query) | 
-            Q(categoria__icontains=query)
-        )
+        # Búsqueda de texto completo ordenada por relevancia (ver core/busqueda.py)
+        productos_list = buscar(productos_list, query)
     
-    # Paginación
-    paginator = Paginator(productos_list, 10)
-    page = request.GET.get('page')
-    
-    try:
-        productos = paginator.page(page)
-    except PageNotAnInteger:
-        productos = paginator.page(1)
-    except EmptyPage:
-        productos = paginator.page(paginator.num_pages)
+    # Paginación por cursor (los resultados de búsqueda van por número: se ordenan por relevancia)
+    productos = paginar(
+        productos_list, 10,
+        cursor=request.GET.get('cursor'),
+        page=request.GET.get('page'),
+        partes_conteo=('admin', query),
+        keyset=not query,
+    )
     
     # Obtener el nombre de usuario de la sesión
     username = request.session.get('admin_username', 'Admin')
@@ -82,7 +170,9 @@ def admin_products(request):
     return render(request, "admin_products.html", {
         "productos": productos,
         "query": query,
-        "username": username
+        "username": username,
+        "acciones_masivas": ACCIONES,
+        "categorias": Producto.CATEGORIAS,
     })
 
 @login_required_admin
@@ -105,9 +195,11 @@ def admin_new(request):
             })
 
         if "imagen" not in request.FILES:
+            errores_subida = getattr(request, "errores_subida", [])
             return render(request, "admin_new.html", {
                 "producto": None,
-                "error": "Debe subir una imagen principal para el producto",
+                "error": "Debe subir una imagen principal válida para el producto"
+                         + (f" ({'; '.join(errores_subida)})" if errores_subida else ""),
                 "username": username
             })
 
@@ -140,49 +232,11 @@ def admin_new(request):
             producto.save()
             
             # Procesar imágenes adicionales si existen
-            imagenes_adicionales = []
-            if 'additional_images_data' in request.POST and request.POST['additional_images_data']:
-                try:
-                    additional_images = json.loads(request.POST['additional_images_data'])
-                    for img_data in additional_images:
-                        if 'base64' in img_data:
-                            # CORRECCIÓN: Manejar diferentes formatos de base64
-                            base64_data = img_data['base64']
-                            
-                            # Verificar si tiene el formato completo o solo los datos
-                            if ';base64,' in base64_data:
-                                # Formato completo: data:image/png;base64,iVBORw0...
-                                format_part, imgstr = base64_data.split(';base64,')
-                                ext = format_part.split('/')[-1] if '/' in format_part else 'png'
-                            else:
-                                # Solo datos base64 sin formato
-                                imgstr = base64_data
-                                # Intentar obtener extensión del tipo
-                                ext = img_data.get('type', 'png').split('/')[-1] if '/' in img_data.get('type', '') else 'png'
-                            
-                            # Generar nombre único
-                            from datetime import datetime
-                            filename = f"additional_{producto.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{len(imagenes_adicionales)}.{ext}"
-                            
-                            # Guardar archivo
-                            try:
-                                data = ContentFile(base64.b64decode(imgstr))
-                                file_path = default_storage.save(f'productos/adicionales/{filename}', data)
-                                
-                                # Agregar a la lista
-                                imagenes_adicionales.append({
-                                    'url': file_path,
-                                    'filename': filename
-                                })
-                            except Exception as decode_error:
-                                print(f"Error decodificando base64: {decode_error}")
-                                continue
-                except Exception as e:
-                    print(f"Error procesando imágenes adicionales: {e}")
-            
-            # Guardar imágenes adicionales
-            producto.set_imagenes_adicionales(imagenes_adicionales)
-            producto.save()
+            guardar_imagenes_adicionales(request, producto)
+
+            # Las variantes responsivas (miniaturas WebP/AVIF) las genera el worker
+            encolar_imagenes(producto)
+            invalidar_catalogo()
             
             return redirect("admin_products")
         except Exception as e:
@@ -209,6 +263,7 @@ def admin_edit(request, id):
         # ELIMINAR
         if "delete" in request.POST:
             producto.delete()
+            invalidar_catalogo()
             return redirect("admin_products")
         
         # EDITAR CAMPOS BÁSICOS
@@ -226,63 +281,19 @@ def admin_edit(request, id):
         
         # Imagen principal (solo si subieron una nueva)
         if "imagen" in request.FILES:
+            producto.set_derivados_imagen([])
             producto.imagen = request.FILES["imagen"]
         
-        # Obtener imágenes adicionales existentes
-        imagenes_adicionales = producto.get_imagenes_adicionales()
-        
-        # Eliminar imágenes marcadas para eliminación
-        imagenes_a_mantener = []
-        for i, img in enumerate(imagenes_adicionales):
-            keep_input = request.POST.get(f"keep_additional_image_{i}", "1")
-            if keep_input == "1":
-                imagenes_a_mantener.append(img)
-        
+        # Imágenes adicionales existentes: bajas, orden y texto alternativo
+        siguiente_orden = actualizar_imagenes_existentes(request, producto)
+
         # Procesar nuevas imágenes adicionales (si las hay)
-        if 'additional_images_data' in request.POST and request.POST['additional_images_data']:
-            try:
-                additional_images = json.loads(request.POST['additional_images_data'])
-                
-                for img_data in additional_images:
-                    if 'base64' in img_data:
-                        # CORRECCIÓN: Manejar diferentes formatos de base64
-                        base64_data = img_data['base64']
-                        
-                        # Verificar si tiene el formato completo o solo los datos
-                        if ';base64,' in base64_data:
-                            # Formato completo: data:image/png;base64,iVBORw0...
-                            format_part, imgstr = base64_data.split(';base64,')
-                            ext = format_part.split('/')[-1] if '/' in format_part else 'png'
-                        else:
-                            # Solo datos base64 sin formato
-                            imgstr = base64_data
-                            # Intentar obtener extensión del tipo
-                            ext = img_data.get('type', 'png').split('/')[-1] if '/' in img_data.get('type', '') else 'png'
-                        
-                        # Generar nombre único para el archivo
-                        from datetime import datetime
-                        filename = f"additional_{producto.id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{len(imagenes_a_mantener)}.{ext}"
-                        
-                        # Guardar archivo
-                        try:
-                            data = ContentFile(base64.b64decode(imgstr))
-                            file_path = default_storage.save(f'productos/adicionales/{filename}', data)
-                            
-                            # Agregar a la lista
-                            imagenes_a_mantener.append({
-                                'url': file_path,
-                                'filename': filename
-                            })
-                        except Exception as decode_error:
-                            print(f"Error decodificando base64: {decode_error}")
-                            continue
-                
-            except Exception as e:
-                print(f"Error procesando imágenes adicionales: {e}")
-        
-        # Guardar la lista actualizada
-        producto.set_imagenes_adicionales(imagenes_a_mantener)
+        guardar_imagenes_adicionales(request, producto, inicio=siguiente_orden)
+
         producto.save()
+        # El worker genera variantes solo para las imágenes nuevas o reemplazadas
+        encolar_imagenes(producto)
+        invalidar_catalogo()
         return redirect("admin_products")
     
     # GET request - mostrar formulario con datos del producto
@@ -291,101 +302,235 @@ def admin_edit(request, id):
         "username": username
     })
 
-def home(request):
-    # Búsqueda
-    query = request.GET.get('q', '')
-    categoria = request.GET.get('categoria', '')
-    
-    productos_list = Producto.objects.all()
+def parametros_home(request):
+    """Filtros y posición del catálogo leídos de la URL"""
+    orden = request.GET.get('orden', '')
+    return {
+        'query': request.GET.get('q', ''),
+        'categoria': request.GET.get('categoria', ''),
+        'orden': orden if orden in ORDENES_HOME else '',
+        'page': request.GET.get('page'),
+        'cursor': request.GET.get('cursor'),
+    }
+
+def partes_clave_home(f):
+    """Partes de la clave de caché de la página (ver clave_pagina)"""
+    return (f['query'], f['categoria'], f['orden'], f['page'] or '1', f['cursor'] or '')
+
+def consultas_home(f):
+    """
+    Querysets (sin ejecutar) del listado y del carrusel, más las opciones
+    de paginación. Los comparten home() y la versión async.
+    """
+    # Con los datos embebidos, abrir el modal no necesita pedir la API (hace falta
+    # la descripción y la galería); si no, solo se leen las columnas de la tarjeta
+    if settings.EMBEBER_PRODUCTOS_HOME:
+        base = Producto.objects.con_galeria()
+    else:
+        base = Producto.objects.para_tarjetas()
+
+    productos_list = base
     
-    if query:
-        productos_list = productos_list.filter(
-            Q(titulo__icontains=query)
-        )
+    if f['query']:
+        productos_list = buscar(productos_list, f['query'])
     
-    if categoria:
-        productos_list = productos_list.filter(categoria=categoria)
+    if f['categoria']:
+        productos_list = productos_list.filter(categoria=f['categoria'])
+
+    # Orden por precio final (columna indexada, se ordena en SQL)
+    if f['orden']:
+        productos_list = productos_list.order_by(ORDENES_HOME[f['orden']], '-id')
     
     # Productos con descuento para el carrusel
-    productos_con_descuento = Producto.objects.filter(descuento_activo=True)[:10]
-    
+    productos_con_descuento = base.filter(descuento_activo=True)[:10]
+
     # Paginación (20 por página) - Nota: el usuario quiere 10 en el futuro
-    paginator = Paginator(productos_list, 20)
-    page = request.GET.get('page')
-    
-    try:
-        productos = paginator.page(page)
-    except PageNotAnInteger:
-        productos = paginator.page(1)
-    except EmptyPage:
-        productos = paginator.page(paginator.num_pages)
-    
+    # Por cursor sobre -id; con búsqueda u orden por precio se pagina por número
+    paginacion = {
+        'cursor': f['cursor'],
+        'page': f['page'],
+        'partes_conteo': ('home', f['query'], f['categoria']),
+        'keyset': not (f['query'] or f['orden']),
+    }
+    return productos_list, productos_con_descuento, paginacion
+
+def parametros_siguiente(f, productos):
+    """Query string de la página siguiente (cursor o número), o '' si es la última"""
+    if not productos.has_next():
+        return ''
+    parametros = {k: f[k] for k in ('query', 'categoria', 'orden') if f[k]}
+    if 'query' in parametros:
+        parametros['q'] = parametros.pop('query')
+    if productos.cursor_siguiente:
+        parametros['cursor'] = productos.cursor_siguiente
+    else:
+        parametros['page'] = productos.next_page_number()
+    return urlencode(parametros)
+
+def render_home(request, f, productos, productos_con_descuento, conteos):
+    """Renderiza home.html con los productos y los conteos de los filtros ya cargados"""
+    productos_data = None
+    if settings.EMBEBER_PRODUCTOS_HOME:
+        productos_data = {
+            p.id: datos_producto(p)
+            for p in list(productos) + list(productos_con_descuento)
+        }
+
     return render(request, "home.html", {
         "productos": productos,
-        "query": query,
-        "categoria_actual": categoria,
-        "productos_descuento": productos_con_descuento
+        "query": f['query'],
+        "categoria_actual": f['categoria'],
+        "orden_actual": f['orden'],
+        "productos_descuento": productos_con_descuento,
+        "productos_data": productos_data,
+        "facetas": conteos,
+        "siguiente": parametros_siguiente(f, productos),
     })
 
+def partes_etag_home(request):
+    """Parámetros que cambian la página del catálogo (para revalidar_catalogo)"""
+    return partes_clave_home(parametros_home(request))
+
+@revalidar_catalogo('home', partes_etag_home)
+def home(request):
+    f = parametros_home(request)
+
+    # Caché de la página completa: la clave incluye la versión del catálogo,
+    # así que un acierto se sirve sin tocar la base de datos
+    clave = clave_pagina('home', *partes_clave_home(f))
+    contenido = obtener_pagina(clave)
+    if contenido is not None:
+        response = HttpResponse(contenido)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    productos_list, productos_con_descuento, paginacion = consultas_home(f)
+    productos = paginar(productos_list, 20, **paginacion)
+
+    response = render_home(request, f, productos, productos_con_descuento, facetas(f['query']))
+    guardar_pagina(clave, response.content)
+    response['X-Cache'] = 'MISS'
+    return response
+
+@revalidar_catalogo('fragmento', partes_etag_home)
+def home_fragmento(request):
+    """
+    Solo las tarjetas de una página del catálogo, para filtrar, buscar y hacer
+    scroll infinito sin recargar home (ver filtros.js). JSON con el HTML, la
+    query string de la página siguiente, los datos de los productos para el
+    modal (con EMBEBER_PRODUCTOS_HOME) y, en la primera página, las facetas.
+    """
+    f = parametros_home(request)
+
+    clave = clave_pagina('fragmento', *partes_clave_home(f))
+    contenido = obtener_pagina(clave)
+    if contenido is not None:
+        response = HttpResponse(contenido, content_type='application/json')
+        response['X-Cache'] = 'HIT'
+        return response
+
+    productos_list, _, paginacion = consultas_home(f)
+    productos = paginar(productos_list, 20, **paginacion)
+
+    datos = {
+        "html": render_to_string("home_tarjetas.html", {"productos": productos, "query": f['query']}, request),
+        "siguiente": parametros_siguiente(f, productos),
+    }
+    if settings.EMBEBER_PRODUCTOS_HOME:
+        datos["productos"] = {p.id: datos_producto(p) for p in productos}
+    if productos.number == 1:
+        datos["facetas"] = facetas(f['query'])
+
+    response = JsonResponse(datos)
+    guardar_pagina(clave, response.content)
+    response['X-Cache'] = 'MISS'
+    return response
+
+def _fecha_producto(request, id):
+    """Última modificación del producto; se consulta una sola vez por request"""
+    if not hasattr(request, 'fecha_producto'):
+        request.fecha_producto = Producto.objects.filter(id=id).values_list(
+            'fecha_actualizacion', flat=True
+        ).first()
+    return request.fecha_producto
+
+def _etag_producto(request, id):
+    return etag_producto(id, _fecha_producto(request, id))
+
+def _ids_solicitados(request):
+    """IDs únicos del parámetro ?ids=1,2,3 (como máximo MAX_PRODUCTOS_LOTE)"""
+    ids = []
+    for parte in request.GET.get('ids', '').split(','):
+        parte = parte.strip()
+        if parte.isdigit() and int(parte) not in ids:
+            ids.append(int(parte))
+    return ids[:MAX_PRODUCTOS_LOTE]
+
+def _etag_lote(request):
+    """ETag del lote: cambia si cambia cualquiera de los productos pedidos"""
+    ids = _ids_solicitados(request)
+    if not ids:
+        return None
+    filas = Producto.objects.filter(id__in=ids).order_by('id').values_list('id', 'fecha_actualizacion')
+    # Sin fecha (datos viejos) cuenta como 0, igual que en clave_tarjeta
+    firma = ";".join(f"{pk}:{fecha.timestamp() if fecha else 0:.6f}" for pk, fecha in filas)
+    return "l" + hashlib.md5(firma.encode()).hexdigest()
+
+@condition(etag_func=_etag_producto, last_modified_func=_fecha_producto)
 def api_producto(request, id):
     try:
-        p = get_object_or_404(Producto, id=id)
-        
-        # Obtener todas las imágenes
-        todas_imagenes = []
-        
-        # Imagen principal
-        if p.imagen:
-            try:
-                # Construir URL absoluta para la imagen principal
-                main_image_url = request.build_absolute_uri(p.imagen.url)
-                todas_imagenes.append(main_image_url)
-            except Exception as e:
-                print(f"Error obteniendo URL de imagen principal: {e}")
-        
-        # Imágenes adicionales
-        imagenes_adicionales = p.get_imagenes_adicionales()
-        for img in imagenes_adicionales:
-            if 'url_completa' in img:
-                try:
-                    # Usar la URL completa ya construida por el modelo
-                    todas_imagenes.append(request.build_absolute_uri(img['url_completa']))
-                except:
-                    # Si falla, intentar construir la URL desde el campo 'url'
-                    if 'url' in img:
-                        try:
-                            img_url = default_storage.url(img['url'])
-                            todas_imagenes.append(request.build_absolute_uri(img_url))
-                        except:
-                            pass
-            elif 'url' in img:
-                try:
-                    # Construir URL desde el campo 'url'
-                    img_url = default_storage.url(img['url'])
-                    todas_imagenes.append(request.build_absolute_uri(img_url))
-                except:
-                    pass
-        
-        # Si no hay imágenes, usar placeholder
-        if not todas_imagenes:
-            todas_imagenes = [request.build_absolute_uri(settings.STATIC_URL + 'img/no-image.png')]
-        
-        return JsonResponse({
-            "id": p.id,
-            "titulo": p.titulo,
-            "descripcion": p.descripcion or "",
-            "precio": float(p.precio),
-            "precio_final": float(p.precio_con_descuento()),
-            "unidad": p.unidad,
-            "unidad_display": p.get_unidad_display(),
-            "imagen": p.imagen.url if p.imagen else "",
-            "imagenes": todas_imagenes,  # Lista de TODAS las imágenes
-            "fraccionado": bool(p.fraccionado),
-        })
+        p = get_object_or_404(Producto.objects.con_galeria(), id=id)
+        return JsonResponse(datos_producto(p, request))
+    except Http404:
+        raise
     except Exception as e:
         print(f"Error en API producto: {e}")
         return JsonResponse({"error": str(e)}, status=500)
 
+@condition(etag_func=_etag_lote)
+def api_productos(request):
+    """Detalle de varios productos en una sola consulta: /api/productos/?ids=1,2,3"""
+    ids = _ids_solicitados(request)
+    if not ids:
+        return JsonResponse({"error": "Parámetro ids requerido (ej: ?ids=1,2,3)"}, status=400)
+
+    productos = {p.id: p for p in Producto.objects.con_galeria().filter(id__in=ids)}
+    return JsonResponse({
+        # Mismo orden en que se pidieron; los IDs inexistentes se omiten
+        "productos": [datos_producto(productos[pk], request) for pk in ids if pk in productos],
+    })
+
+def partes_etag_facetas(request):
+    return (request.GET.get('q', ''),)
+
+@revalidar_catalogo('facetas', partes_etag_facetas)
+def api_facetas(request):
+    """Conteos por categoría, unidad y con descuento para la búsqueda ?q= (ver core/facetas.py)"""
+    return JsonResponse(facetas(request.GET.get('q', '')))
+
+@cache_control(max_age=0, must_revalidate=True)
+def api_productos_cambios(request):
+    """
+    Sincronización incremental del catálogo.
+    Sin ?desde devuelve la URL del snapshot completo; con ?desde=<version>
+    devuelve solo los productos modificados y los IDs eliminados desde entonces.
+    """
+    desde = request.GET.get('desde', '').strip()
+
+    if not desde:
+        ruta = snapshot_actual() or generar_snapshot()[0]
+        return JsonResponse({"snapshot": default_storage.url(ruta)})
+
+    if not desde.isdigit():
+        return JsonResponse({"error": "El parámetro desde debe ser una versión numérica"}, status=400)
+
+    modificados, eliminados, version = cambios_desde(int(desde))
+    return JsonResponse({
+        "version": version,
+        "productos": [datos_producto(p, request) for p in modificados],
+        "eliminados": eliminados,
+    })
+
 # Nueva función para eliminar producto desde la lista
 @require_POST
 @login_required_admin
@@ -394,8 +539,122 @@ def admin_delete(request, id):
     
     try:
         producto.delete()
+        invalidar_catalogo()
         # Redirigir con un mensaje de éxito (opcional)
         return redirect('admin_products')
     except Exception as e:
         # En caso de error, redirigir con un mensaje de error
-        return redirect('admin_products')
\ No newline at end of file
+        return redirect('admin_products')
+
+@login_required_admin
+def admin_cache_estadisticas(request):
+    """Contadores de aciertos/fallos de la caché del storefront"""
+    return JsonResponse(estadisticas())
+
+@login_required_admin
+def admin_rendimiento(request):
+    """Endpoints más lentos (p95) de los últimos RENDIMIENTO_VENTANA_MINUTOS en este proceso"""
+    return JsonResponse({
+        "ventana_minutos": settings.RENDIMIENTO_VENTANA_MINUTOS,
+        "umbral_lento_ms": settings.REQUEST_LENTO_MS,
+        "endpoints": peores_endpoints(),
+    })
+
+@login_required_admin
+def admin_tareas(request):
+    """Estado de la cola de tareas en segundo plano (ver core/tareas.py)"""
+    return JsonResponse(estado_cola())
+
+@login_required_admin
+@require_POST
+def admin_tarea_reintentar(request, id):
+    """Vuelve a encolar una tarea fallida"""
+    if not reintentar(id):
+        return JsonResponse({"error": "La tarea no está fallida o ya hay una pendiente con la misma clave"}, status=409)
+    return JsonResponse({"ok": True})
+
+@login_required_admin
+def admin_exportar(request):
+    """Descarga del catálogo (?formato=csv|jsonl|json) generada fila por fila"""
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACION:
+        formato = 'csv'
+    tipos = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson', 'json': 'application/json'}
+    response = StreamingHttpResponse(exportar(formato), content_type=f"{tipos[formato]}; charset=utf-8")
+    response['Content-Disposition'] = f'attachment; filename="catalogo.{formato}"'
+    return response
+
+@login_required_admin
+@require_POST
+def admin_precios_masivos(request):
+    """
+    Cambio masivo de precios/descuentos (ver core/precios.py).
+    Con simular=1 solo devuelve cuántos productos se modificarían.
+    """
+    ids = [int(i) for i in request.POST.get('ids', '').split(',') if i.strip().isdigit()]
+    try:
+        productos = productos_alcance(
+            request.POST.get('alcance', ''),
+            categoria=request.POST.get('categoria', ''),
+            query=request.POST.get('q', ''),
+            ids=ids,
+        )
+        accion = request.POST.get('accion', '')
+        valor = request.POST.get('valor', '')
+        # Validar la acción también en la vista previa
+        cambios_accion(accion, valor)
+        if request.POST.get('simular') == '1':
+            return JsonResponse({"simulado": True, "afectados": productos.count()})
+        return JsonResponse({"simulado": False, "afectados": aplicar_accion(productos, accion, valor)})
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+def _json_body(request):
+    """
+    Cuerpo JSON de un POST del carrito. Exigir application/json hace que un
+    formulario de otro sitio no pueda enviarlo sin preflight CORS: por eso
+    estas vistas no usan el token CSRF (home.html se cachea entera y no lo lleva).
+    """
+    if request.content_type != 'application/json':
+        raise ValueError("Se esperaba Content-Type: application/json")
+    try:
+        return json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("JSON no válido")
+
+@csrf_exempt
+@never_cache
+@require_POST
+def api_carrito_cotizar(request):
+    """
+    Precios actuales de todo el carrito en una consulta:
+    POST {"items": [{"id", "cantidad", "esFraccionado", "precio"}]}
+    """
+    try:
+        datos = _json_body(request)
+        return JsonResponse(cotizar(datos.get('items') if isinstance(datos, dict) else None))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+@csrf_exempt
+@never_cache
+@require_POST
+def api_pedidos(request):
+    """
+    Registra un pedido con los precios del servidor y devuelve el resumen para
+    el mensaje de WhatsApp: POST {"cliente": {...}, "items": [...]}
+    """
+    try:
+        datos = _json_body(request)
+        if not isinstance(datos, dict):
+            raise ValueError("JSON no válido")
+        pedido, cotizacion = registrar_pedido(datos.get('cliente'), datos.get('items'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse({
+        "pedido": pedido.id,
+        "total": cotizacion["total"],
+        "resumen": resumen_pedido(cotizacion["lineas"]),
+        "lineas": cotizacion["lineas"],
+        "no_disponibles": cotizacion["no_disponibles"],
+    }, status=201)
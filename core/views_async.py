@@ -0,0 +1,85 @@
+"""
+Vistas async del storefront (home y API de producto) para servir con ASGI.
+Usan el ORM async de Django (aget, acount, async for) y la caché async, así
+un worker no queda bloqueado mientras espera la base de datos. Se activan con
+VISTAS_ASYNC=True (ver core/urls.py); el admin sigue usando las vistas sync.
+"""
+from asgiref.sync import sync_to_async
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .busqueda import fts_disponible
+from .cache_catalogo import aclave_pagina, aguardar_pagina, aobtener_pagina
+from .facetas import facetas
+from .models import Producto
+from .paginacion import apaginar
+from .serializacion import datos_producto, etag_producto
+from .revalidacion import revalidar_catalogo
+from .views import consultas_home, parametros_home, partes_clave_home, partes_etag_home, render_home
+
+
+async def _datos_producto(p, request=None):
+    """
+    datos_producto sin bloquear el event loop. Con FileSystemStorage las URLs
+    se arman sin I/O; con otros storages (S3, etc.) se llama en un hilo.
+    """
+    if isinstance(default_storage, FileSystemStorage):
+        return datos_producto(p, request)
+    return await sync_to_async(datos_producto)(p, request)
+
+
+@revalidar_catalogo('home', partes_etag_home)
+async def home_async(request):
+    f = parametros_home(request)
+
+    clave = await aclave_pagina('home', *partes_clave_home(f))
+    contenido = await aobtener_pagina(clave)
+    if contenido is not None:
+        response = HttpResponse(contenido)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    # buscar() consulta una vez si existe la tabla FTS: hacerlo fuera del event loop
+    if f['query']:
+        await sync_to_async(fts_disponible)()
+
+    productos_list, productos_con_descuento, paginacion = consultas_home(f)
+    productos = await apaginar(productos_list, 20, **paginacion)
+    productos_con_descuento = [p async for p in productos_con_descuento]
+    conteos = await sync_to_async(facetas)(f['query'])
+
+    if isinstance(default_storage, FileSystemStorage):
+        response = render_home(request, f, productos, productos_con_descuento, conteos)
+    else:
+        response = await sync_to_async(render_home)(request, f, productos, productos_con_descuento, conteos)
+    await aguardar_pagina(clave, response.content)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+async def api_producto_async(request, id):
+    # Mismo ETag/Last-Modified que api_producto (condition() solo admite funciones sync)
+    fila = await Producto.objects.filter(id=id).values_list('id', 'fecha_actualizacion').afirst()
+    if fila is None:
+        raise Http404("Producto no encontrado")
+
+    # Sin fecha (datos viejos) no hay ETag ni Last-Modified, igual que en la vista sync
+    fecha = fila[1]
+    etag = quote_etag(etag_producto(id, fecha)) if fecha else None
+    ultima_modificacion = int(fecha.timestamp()) if fecha else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=ultima_modificacion)
+    if response is None:
+        try:
+            p = await Producto.objects.con_galeria().aget(id=id)
+        except Producto.DoesNotExist:
+            raise Http404("Producto no encontrado")
+        response = JsonResponse(await _datos_producto(p, request))
+
+    if fecha and request.method in ("GET", "HEAD"):
+        response.headers.setdefault("ETag", etag)
+        if not response.has_header("Last-Modified"):
+            response.headers["Last-Modified"] = http_date(ultima_modificacion)
+    return response
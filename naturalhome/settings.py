@@ -53,6 +53,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para que el tiempo total incluya al resto de los middlewares
+    'core.instrumentacion.InstrumentacionMiddleware',
+    # Comprime el cuerpo final: por encima del resto (ver core/compresion.py)
+    'core.compresion.CompresionMiddleware',
+    # Antes de SessionMiddleware para ver su Vary: Cookie (ver core/revalidacion.py)
+    'core.revalidacion.PoliticaCacheMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,13 +92,69 @@ WSGI_APPLICATION = 'naturalhome.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Perfil de base de datos (ver docs/base_de_datos.md):
+#   sqlite:     WAL, synchronous=NORMAL, busy_timeout y caché/mmap por conexión
+#   postgresql: conexiones persistentes o pool de psycopg 3, con health checks
+def base_de_datos(prefijo):
+    motor = config(f'{prefijo}MOTOR', default='sqlite')
+    if motor == 'postgresql':
+        pool = config(f'{prefijo}POOL', default=False, cast=bool)
+        opciones = {}
+        if pool:
+            opciones['pool'] = {
+                'min_size': config(f'{prefijo}POOL_MIN', default=2, cast=int),
+                'max_size': config(f'{prefijo}POOL_MAX', default=10, cast=int),
+                'timeout': config(f'{prefijo}POOL_TIMEOUT', default=10, cast=int),
+            }
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config(f'{prefijo}NOMBRE', default='naturalhome'),
+            'USER': config(f'{prefijo}USUARIO', default='naturalhome'),
+            'PASSWORD': config(f'{prefijo}CLAVE', default=''),
+            'HOST': config(f'{prefijo}HOST', default='localhost'),
+            'PORT': config(f'{prefijo}PUERTO', default='5432'),
+            # Con pool las conexiones vuelven al pool al final de cada request
+            'CONN_MAX_AGE': 0 if pool else config(f'{prefijo}CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': opciones,
+        }
+    if motor != 'sqlite':
+        raise ValueError(f"{prefijo}MOTOR debe ser sqlite o postgresql")
+
+    pragmas = [
+        # Lectores y un escritor en paralelo: el storefront no espera a los guardados del admin
+        'PRAGMA journal_mode=WAL',
+        # Con WAL, NORMAL no arriesga la integridad (solo la última transacción ante un corte de luz)
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={config(f'{prefijo}SQLITE_MMAP_MB', default=128, cast=int) * 1024 * 1024}",
+        # Negativo: tamaño en KiB en lugar de páginas
+        f"PRAGMA cache_size=-{config(f'{prefijo}SQLITE_CACHE_MB', default=32, cast=int) * 1024}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+    return {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': config(f'{prefijo}NOMBRE', default=str(BASE_DIR / 'db.sqlite3')),
+        'CONN_MAX_AGE': config(f'{prefijo}CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': '; '.join(pragmas),
+            # busy_timeout: segundos que una escritura espera el lock antes de "database is locked"
+            'timeout': config(f'{prefijo}SQLITE_TIMEOUT', default=20, cast=int),
+            # Las transacciones toman el lock de escritura al empezar: sin esto, dos
+            # transacciones que leen y después escriben fallan sin esperar el timeout
+            'transaction_mode': 'IMMEDIATE',
+        },
     }
+
+
+DATABASES = {
+    'default': base_de_datos('DB_'),
 }
 
+# Base de destino para copiar_base_de_datos (solo si se configura)
+if config('DB_DESTINO_MOTOR', default=''):
+    DATABASES['destino'] = base_de_datos('DB_DESTINO_')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -140,12 +202,160 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Pipeline de estáticos (core/estaticos.py): bundles minificados por página,
+# nombres con hash, hermanos .gz/.br y caché inmutable de un año.
+# Requiere ejecutar collectstatic en cada deploy.
+ESTATICOS_OPTIMIZADOS = config('ESTATICOS_OPTIMIZADOS', default=not DEBUG, cast=bool)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'core.estaticos.AlmacenamientoEstaticos' if ESTATICOS_OPTIMIZADOS
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Entrega de archivos subidos (core/medios.py). MEDIA_SERVIDOR:
+#   django     -> FileResponse con Range y GET condicional (sin proxy delante)
+#   x-accel    -> Django valida y nginx envía el archivo (X-Accel-Redirect)
+#   x-sendfile -> ídem con Apache mod_xsendfile / lighttpd (X-Sendfile)
+#   proxy      -> el proxy sirve MEDIA_ROOT por su cuenta; Django no enruta /media/
+MEDIA_SERVIDOR = config('MEDIA_SERVIDOR', default='django')
+# Location interna de nginx que apunta a MEDIA_ROOT (solo para x-accel)
+MEDIA_ACCEL_PREFIJO = config('MEDIA_ACCEL_PREFIJO', default='/media-interna/')
+# Caché de imágenes originales; los derivados y snapshots con hash son inmutables
+MEDIA_CACHE_SEGUNDOS = config('MEDIA_CACHE_SEGUNDOS', default=86400, cast=int)
+
+
+# Caché
+# LocMemCache es por proceso: con varios workers usar una caché compartida
+# (p. ej. CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache)
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='naturalhome'),
+    },
+    # Sesiones (SESSION_MODO=cached_db): mismo backend que default, con otro prefijo.
+    # Con LocMemCache cada proceso tiene su copia y un logout en un worker no invalida
+    # la sesión cacheada en los demás: cached_db + LocMemCache supone un solo proceso
+    'sesiones': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='naturalhome'),
+        'KEY_PREFIX': 'sesiones',
+    },
+}
+CACHE_HOME_SEGUNDOS = config('CACHE_HOME_SEGUNDOS', default=600, cast=int)
+
+# Total de productos cacheado para la paginación por número (puede estar un poco desactualizado)
+CONTEO_CACHE_SEGUNDOS = config('CONTEO_CACHE_SEGUNDOS', default=300, cast=int)
+
+# Caché de cada tarjeta del catálogo y de cada grid (clave: id + fecha de actualización)
+CACHE_TARJETAS_SEGUNDOS = config('CACHE_TARJETAS_SEGUNDOS', default=86400, cast=int)
+
+# Embeber en home.html los datos de los productos de la página (JSON)
+EMBEBER_PRODUCTOS_HOME = config('EMBEBER_PRODUCTOS_HOME', default=True, cast=bool)
+
+
+# Snapshot del catálogo (media/catalogo/catalog.<hash>.json)
+CATALOGO_SNAPSHOT_AUTOMATICO = config('CATALOGO_SNAPSHOT_AUTOMATICO', default=True, cast=bool)
+CATALOGO_SNAPSHOTS_CONSERVAR = 3
+
+
+# Subida de imágenes
+# Todos los archivos se escriben a disco por partes y se validan en streaming
+FILE_UPLOAD_HANDLERS = ['core.uploads.ImagenUploadHandler']
+MAX_TAMANO_IMAGEN = config('MAX_TAMANO_IMAGEN', default=5 * 1024 * 1024, cast=int)  # 5MB por archivo
+MAX_IMAGENES_ADICIONALES = 5
+
+
+# Carrito y pedidos (/api/carrito/cotizar/, /api/pedidos/)
+MAX_ITEMS_PEDIDO = 100
+
+
+# Tareas en segundo plano (core/tareas.py, python manage.py procesar_tareas)
+# True: se ejecutan en el mismo proceso al terminar el request (sin worker)
+TAREAS_INMEDIATAS = config('TAREAS_INMEDIATAS', default=False, cast=bool)
+TAREAS_HILOS = config('TAREAS_HILOS', default=2, cast=int)
+TAREAS_MAX_INTENTOS = config('TAREAS_MAX_INTENTOS', default=5, cast=int)
+# Espera antes del primer reintento (segundos); se duplica en cada intento
+TAREAS_ESPERA_BASE = config('TAREAS_ESPERA_BASE', default=10, cast=int)
+# Una tarea en curso por más tiempo se da por abandonada (segundos)
+TAREAS_TIEMPO_MAXIMO = config('TAREAS_TIEMPO_MAXIMO', default=900, cast=int)
+TAREAS_CONSERVAR_DIAS = config('TAREAS_CONSERVAR_DIAS', default=7, cast=int)
+
+
+# Vistas async para home y /api/producto/<id>/ (usar con un servidor ASGI:
+# uvicorn naturalhome.asgi:application). Con WSGI conviene dejarlas en False.
+VISTAS_ASYNC = config('VISTAS_ASYNC', default=False, cast=bool)
+
+
+# Caché HTTP del storefront (ver core/revalidacion.py): las páginas y la API pública
+# llevan ETag; el navegador revalida tras max-age y un CDN puede guardarlas s-maxage
+CACHE_NAVEGADOR_SEGUNDOS = config('CACHE_NAVEGADOR_SEGUNDOS', default=0, cast=int)
+CACHE_CDN_SEGUNDOS = config('CACHE_CDN_SEGUNDOS', default=60, cast=int)
+# Compresión gzip/brotli de HTML y JSON (desactivar si ya comprime el proxy)
+COMPRESION_ACTIVA = config('COMPRESION_ACTIVA', default=True, cast=bool)
+if not COMPRESION_ACTIVA:
+    MIDDLEWARE.remove('core.compresion.CompresionMiddleware')
+
+
+# Instrumentación (Server-Timing, log de requests lentos y /admin/rendimiento/)
+INSTRUMENTACION_ACTIVA = config('INSTRUMENTACION_ACTIVA', default=True, cast=bool)
+REQUEST_LENTO_MS = config('REQUEST_LENTO_MS', default=500, cast=int)
+RENDIMIENTO_VENTANA_MINUTOS = config('RENDIMIENTO_VENTANA_MINUTOS', default=15, cast=int)
+if not INSTRUMENTACION_ACTIVA:
+    MIDDLEWARE.remove('core.instrumentacion.InstrumentacionMiddleware')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Una línea JSON por request lento
+        'core.lento': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+LOG_REQUESTS_LENTOS = config('LOG_REQUESTS_LENTOS', default='')
+if LOG_REQUESTS_LENTOS:
+    LOGGING['handlers']['archivo_lentos'] = {
+        'class': 'logging.handlers.RotatingFileHandler',
+        'filename': LOG_REQUESTS_LENTOS,
+        'maxBytes': 5 * 1024 * 1024,
+        'backupCount': 3,
+    }
+    LOGGING['loggers']['core.lento']['handlers'].append('archivo_lentos')
+
 
 # Configuración de sesiones
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Base de datos
+# SESSION_MODO:
+#   cached_db      -> lectura desde la caché 'sesiones', la base solo se escribe al iniciar/cerrar sesión
+#                     (con varios procesos requiere un CACHE_BACKEND compartido, ver CACHES)
+#   signed_cookies -> la sesión viaja firmada en la cookie (sin tocar la base)
+#   db             -> todo en la base de datos (comportamiento anterior)
+MODOS_SESION = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_MODO = config('SESSION_MODO', default='cached_db')
+SESSION_ENGINE = MODOS_SESION.get(SESSION_MODO, MODOS_SESION['cached_db'])
+SESSION_CACHE_ALIAS = 'sesiones'
+# El worker de tareas (procesar_tareas) borra las sesiones vencidas como mucho una vez
+# cada N segundos (0 = desactivado). Sin worker: python manage.py clearsessions en un cron
+SESSION_PURGA_SEGUNDOS = config('SESSION_PURGA_SEGUNDOS', default=6 * 3600, cast=int)
 SESSION_COOKIE_AGE = 3600  # 1 hora en segundos
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = False  # Cambiar a True en producción con HTTPS
@@ -1,8 +1,24 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core.estaticos import servir_estatico
+from core.medios import servir_medio
 
 urlpatterns = [
     path("", include("core.urls")),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Archivos subidos: Django valida la ruta y fija la caché; los bytes los envía
+# FileResponse o el proxy (X-Accel-Redirect / X-Sendfile) según MEDIA_SERVIDOR
+if settings.MEDIA_SERVIDOR != "proxy":
+    urlpatterns.append(
+        re_path(r"^%s(?P<path>.*)$" % settings.MEDIA_URL.lstrip("/"), servir_medio)
+    )
+
+# Estáticos con hash: caché inmutable y versiones .br/.gz precomprimidas
+# (si un proxy sirve STATIC_ROOT directamente, esta ruta no se usa)
+if settings.ESTATICOS_OPTIMIZADOS:
+    urlpatterns.append(
+        re_path(r"^%s(?P<path>.*)$" % settings.STATIC_URL.lstrip("/"), servir_estatico)
+    )